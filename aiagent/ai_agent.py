@@ -23,6 +23,8 @@ import numpy as np
 from collections import defaultdict, deque
 import hashlib
 
+from log_template_miner import compact_logs
+
 class LogPattern:
     """Represents a detected log pattern with metadata."""
     
@@ -82,8 +84,14 @@ class AIAgent:
             'pattern_confidence_threshold': 0.7,
             'severity_escalation_threshold': 0.8,
             'max_log_batch_size': 10000,
+            'template_mining_enabled': True,
+            'template_depth': 4,
+            'template_similarity': 0.4,
         }
         
+        # Template mining stats for the most recent preprocess_logs call
+        self.last_log_compression = None
+        
         # Load existing patterns and history
         self._load_agent_state()
     
@@ -423,22 +431,40 @@ class AIAgent:
         processed = re.sub(r'\n\s*\n', '\n', log_content)
         processed = re.sub(r' +', ' ', processed)
         
-        # Extract and normalize timestamps
-        timestamp_patterns = [
-            r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}',
-            r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}',
-            r'\w{3} \d{1,2} \d{2}:\d{2}:\d{2}'
-        ]
-        
-        for pattern in timestamp_patterns:
-            processed = re.sub(pattern, '[TIMESTAMP]', processed)
-        
-        # Normalize IP addresses
-        processed = re.sub(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', '[IP_ADDRESS]', processed)
-        
-        # Normalize file paths
-        processed = re.sub(r'[A-Za-z]:\\[^\s]+', '[FILE_PATH]', processed)
-        processed = re.sub(r'/[^\s]+', '[FILE_PATH]', processed)
+        self.last_log_compression = None
+        if self.config.get('template_mining_enabled', True):
+            # Collapse repetitive lines into templates with counts, example
+            # variable values and first/last timestamps
+            processed, self.last_log_compression = compact_logs(
+                processed,
+                depth=self.config.get('template_depth', 4),
+                similarity=self.config.get('template_similarity', 0.4)
+            )
+            self.last_log_compression['input_chars'] = len(log_content)
+            if processed:
+                self.last_log_compression['compression_ratio'] = round(len(log_content) / len(processed), 2)
+            self.logger.info(
+                f"Template mining: {self.last_log_compression.get('input_lines', 0)} lines -> "
+                f"{self.last_log_compression.get('templates', 0)} templates "
+                f"({self.last_log_compression['compression_ratio']}x)"
+            )
+        else:
+            # Extract and normalize timestamps
+            timestamp_patterns = [
+                r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}',
+                r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}',
+                r'\w{3} \d{1,2} \d{2}:\d{2}:\d{2}'
+            ]
+            
+            for pattern in timestamp_patterns:
+                processed = re.sub(pattern, '[TIMESTAMP]', processed)
+            
+            # Normalize IP addresses
+            processed = re.sub(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', '[IP_ADDRESS]', processed)
+            
+            # Normalize file paths
+            processed = re.sub(r'[A-Za-z]:\\[^\s]+', '[FILE_PATH]', processed)
+            processed = re.sub(r'/[^\s]+', '[FILE_PATH]', processed)
         
         # Highlight security-relevant keywords
         security_keywords = [
@@ -544,12 +570,13 @@ class AIAgent:
         
         return recommendations
     
-    async def enhanced_analysis(self, log_content: str) -> Dict[str, Any]:
+    async def enhanced_analysis(self, log_content: str, session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Perform enhanced analysis with AI agent capabilities.
         
         Args:
             log_content: Raw log content to analyze
+            session_id: Monitoring session the logs belong to
             
         Returns:
             Enhanced analysis result with AI insights
@@ -560,8 +587,14 @@ class AIAgent:
         # Extract patterns before API call
         patterns = self.extract_log_patterns(log_content)
         
-        # Send to API for standard analysis
-        api_result = await self.cli.send_logs(processed_logs, enhance_with_ai=True)
+        # Send to API for standard analysis; the pattern severity lets the server prioritize it
+        pattern_context = self.analyze_patterns_threat_context(patterns)
+        api_result = await self.cli.send_logs(
+            processed_logs,
+            enhance_with_ai=True,
+            session_id=session_id,
+            severity_score=pattern_context.severity_score if patterns else None
+        )
         
         if not api_result:
             return None
@@ -596,6 +629,7 @@ class AIAgent:
         enhanced_result.update({
             'ai_agent_analysis': {
                 'detected_patterns': patterns,
+                'log_compression': self.last_log_compression,
                 'threat_context': {
                     'severity_score': threat_context.severity_score,
                     'confidence_score': threat_context.confidence_score,
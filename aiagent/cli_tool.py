@@ -28,7 +28,7 @@ import logging
 import schedule
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 import requests
 import aiohttp
 import aiofiles
@@ -38,6 +38,8 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 import hashlib
 import getpass
+import gzip
+import zlib
 
 # Rich imports for colorful CLI
 from rich.console import Console
@@ -73,6 +75,9 @@ CONFIG_FILE = DEFAULT_CONFIG_DIR / "config.json"
 CREDENTIALS_FILE = DEFAULT_CONFIG_DIR / "credentials.enc"
 LOGS_CACHE = DEFAULT_CONFIG_DIR / "logs_cache"
 
+# Request bodies at least this large are gzip-compressed when the server accepts it
+COMPRESSION_MIN_SIZE = 1024
+
 def print_banner():
     """Display ForensIQ CLI banner."""
     banner_text = """
@@ -146,6 +151,14 @@ class ForensIQCLI:
         self.encryption_key = None
         self.logger = self._setup_logging()
         
+        # Bytes before/after compression for API traffic in this process
+        self.compression_stats = {
+            'request_bytes': 0,
+            'request_wire_bytes': 0,
+            'response_bytes': 0,
+            'response_wire_bytes': 0
+        }
+        
         # Initialize AI Agent
         self.ai_agent = None
         
@@ -471,13 +484,63 @@ class ForensIQCLI:
             'Content-Type': 'application/json'
         }
     
-    async def send_logs(self, log_content: str, enhance_with_ai: bool = True) -> Optional[Dict[str, Any]]:
+    async def _post_json(self, session: aiohttp.ClientSession, url: str, payload: Dict[str, Any],
+                         headers: Dict[str, str]) -> Tuple[int, str, Dict[str, int]]:
+        """
+        POST JSON with negotiated compression.
+        
+        Bodies of at least COMPRESSION_MIN_SIZE bytes are sent gzip-compressed
+        unless the server rejected a compressed request before (415, remembered
+        in the config), in which case the request is retried uncompressed.
+        Responses are requested gzip-compressed. The session must be created
+        with ``auto_decompress=False`` so wire sizes can be measured.
+        
+        Returns:
+            Tuple of status code, decoded response text and byte counts
+        """
+        body = json.dumps(payload).encode('utf-8')
+        compress = self.config.get('request_compression', True) and len(body) >= COMPRESSION_MIN_SIZE
+        
+        while True:
+            request_headers = dict(headers, **{'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+            data = body
+            if compress:
+                data = gzip.compress(body, compresslevel=6)
+                request_headers['Content-Encoding'] = 'gzip'
+            
+            async with session.post(url, data=data, headers=request_headers) as response:
+                raw = await response.read()
+                if response.status == 415 and compress:
+                    warning_message("Server does not accept compressed requests, sending uncompressed")
+                    self.config['request_compression'] = False
+                    self._save_config()
+                    compress = False
+                    continue
+                
+                content = gzip.decompress(raw) if response.headers.get('Content-Encoding') == 'gzip' else raw
+                transfer = {
+                    'request_bytes': len(body),
+                    'request_wire_bytes': len(data),
+                    'response_bytes': len(content),
+                    'response_wire_bytes': len(raw)
+                }
+                for key, value in transfer.items():
+                    self.compression_stats[key] += value
+                return response.status, content.decode('utf-8', errors='replace'), transfer
+
+    async def send_logs(self, log_content: str, enhance_with_ai: bool = True,
+                        session_id: Optional[str] = None,
+                        severity_score: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """
         Send logs to the ForensIQ analysis endpoint.
         
         Args:
             log_content: The log content to analyze
             enhance_with_ai: Whether to use AI enhancement
+            session_id: Monitoring session the logs belong to; the server then
+                only analyzes activity new to the session
+            severity_score: Local threat estimate (0-1); high scores are
+                scheduled ahead of other analyses on the server
             
         Returns:
             Analysis results or None if failed
@@ -496,6 +559,10 @@ class ForensIQCLI:
                 'enhance_with_ai': enhance_with_ai,
                 'max_results': self.config.get('max_results', 5)
             }
+            if session_id:
+                request_data['session_id'] = session_id
+            if severity_score is not None:
+                request_data['severity_score'] = round(min(max(severity_score, 0.0), 1.0), 3)
             
             info_message(f"Sending {len(log_content):,} characters of logs for analysis")
             
@@ -508,30 +575,114 @@ class ForensIQCLI:
             ) as progress:
                 task = progress.add_task("Analyzing logs...", total=100)
                 
-                async with aiohttp.ClientSession() as session:
+                async with aiohttp.ClientSession(auto_decompress=False) as session:
                     progress.update(task, advance=30)
+                    status, response_text, transfer = await self._post_json(
+                        session,
+                        f"{api_url}/api/v1/analyze",
+                        request_data,
+                        headers
+                    )
+                    progress.update(task, advance=40)
+                    if status == 200:
+                        result = json.loads(response_text)
+                        progress.update(task, advance=30, completed=100)
+                        self.logger.info(f"Analysis completed successfully")
+                    else:
+                        self.logger.error(f"Analysis failed: {status} - {response_text}")
+                        return None
+            
+            raw_bytes = transfer['request_bytes'] + transfer['response_bytes']
+            wire_bytes = transfer['request_wire_bytes'] + transfer['response_wire_bytes']
+            if wire_bytes < raw_bytes:
+                info_message(
+                    f"Compression saved {raw_bytes - wire_bytes:,} bytes "
+                    f"({(raw_bytes - wire_bytes) / raw_bytes:.0%} of {raw_bytes:,})"
+                )
+            
+            # Store analysis result in cache
+            await self._cache_analysis_result(log_content, result)
+            
+            return result
+                            
+        except Exception as e:
+            self.logger.error(f"Error sending logs: {e}")
+            return None
+
+    async def upload_log_file(self, file_path: str, enhance_with_ai: bool = True,
+                              chunk_size: int = 1024 * 1024) -> Optional[Dict[str, Any]]:
+        """
+        Stream a log file of any size to the upload endpoint, gzip-compressed.
+        
+        The file is read and compressed chunk by chunk, so it is never held in
+        memory or truncated.
+        
+        Args:
+            file_path: Path to the log file
+            enhance_with_ai: Whether to use AI enhancement
+            chunk_size: Bytes read from the file per chunk
+            
+        Returns:
+            Analysis results or None if failed
+        """
+        if not self.session_token:
+            error_message("No valid authentication token. Please login first.")
+            return None
+        
+        api_url = self.config.get('api_url', 'http://localhost:8000')
+        headers = {
+            'Authorization': f'Bearer {self.session_token}',
+            'Content-Type': 'application/octet-stream',
+            'Content-Encoding': 'gzip'
+        }
+        params = {
+            'enhance_with_ai': str(enhance_with_ai).lower(),
+            'max_results': str(self.config.get('max_results', 5))
+        }
+        
+        async def compressed_chunks():
+            compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            async with aiofiles.open(file_path, 'rb') as f:
+                while True:
+                    chunk = await f.read(chunk_size)
+                    if not chunk:
+                        break
+                    data = compressor.compress(chunk)
+                    if data:
+                        yield data
+            yield compressor.flush()
+        
+        try:
+            file_size = os.path.getsize(file_path)
+            info_message(f"Uploading {file_size:,} bytes of logs (gzip, streamed) for analysis")
+            
+            with console.status("[bold green]Uploading and analyzing logs..."):
+                timeout = aiohttp.ClientTimeout(total=None, sock_read=600)
+                async with aiohttp.ClientSession(timeout=timeout) as session:
                     async with session.post(
-                        f"{api_url}/api/v1/analyze", 
-                        json=request_data, 
+                        f"{api_url}/api/v1/analyze/upload",
+                        data=compressed_chunks(),
+                        params=params,
                         headers=headers
                     ) as response:
-                        progress.update(task, advance=40)
-                        if response.status == 200:
-                            result = await response.json()
-                            progress.update(task, advance=30, completed=100)
-                            self.logger.info(f"Analysis completed successfully")
-                            
-                            # Store analysis result in cache
-                            await self._cache_analysis_result(log_content, result)
-                            
-                            return result
-                        else:
+                        if response.status != 200:
                             error_detail = await response.text()
-                            self.logger.error(f"Analysis failed: {response.status} - {error_detail}")
+                            self.logger.error(f"Upload analysis failed: {response.status} - {error_detail}")
                             return None
-                            
+                        result = await response.json()
+            
+            upload = result.get('upload') or {}
+            if upload:
+                info_message(
+                    f"Uploaded {upload.get('compressed_bytes', 0):,} compressed bytes "
+                    f"({upload.get('compression_ratio', 1.0)}x), {upload.get('lines', 0):,} lines "
+                    f"parsed at {upload.get('parse_mb_per_second', 0)} MB/s"
+                )
+            self.logger.info("Upload analysis completed successfully")
+            return result
+            
         except Exception as e:
-            self.logger.error(f"Error sending logs: {e}")
+            self.logger.error(f"Error uploading log file: {e}")
             return None
 
     async def _cache_analysis_result(self, log_content: str, result: Dict[str, Any]) -> None:
@@ -623,21 +774,21 @@ class ForensIQCLI:
     async def send_log_file(self, file_path: str, enhance_with_ai: bool = True, use_ai_agent: bool = True) -> Optional[Dict[str, Any]]:
         """Send log file for analysis with optional AI agent enhancement."""
         try:
-            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                log_content = await f.read()
-            
-            # Limit log size to 50KB as per API constraints
-            if len(log_content) > 50000:
-                warning_message("Log file too large, truncating to 50KB")
-                log_content = log_content[:50000]
-            
-            # Use AI agent for enhanced analysis if available and enabled
-            if use_ai_agent and self.ai_agent:
-                info_message("Using AI Agent for enhanced analysis")
-                result = await self.ai_agent.enhanced_analysis(log_content)
+            # Files above the JSON API's 50KB limit are streamed to the upload endpoint
+            if os.path.getsize(file_path) > 50000:
+                info_message("Large log file, using streaming upload")
+                result = await self.upload_log_file(file_path, enhance_with_ai)
             else:
-                info_message("Using standard API analysis")
-                result = await self.send_logs(log_content, enhance_with_ai)
+                async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                    log_content = await f.read()
+                
+                # Use AI agent for enhanced analysis if available and enabled
+                if use_ai_agent and self.ai_agent:
+                    info_message("Using AI Agent for enhanced analysis")
+                    result = await self.ai_agent.enhanced_analysis(log_content)
+                else:
+                    info_message("Using standard API analysis")
+                    result = await self.send_logs(log_content, enhance_with_ai)
             
             if result:
                 # Save result to cache
@@ -1743,9 +1894,9 @@ class ForensIQCLI:
         try:
             # Use AI agent for enhanced analysis if available
             if self.ai_agent:
-                result = await self.ai_agent.enhanced_analysis(log_content)
+                result = await self.ai_agent.enhanced_analysis(log_content, session_id=session_id)
             else:
-                result = await self.send_logs(log_content, enhance_with_ai=True)
+                result = await self.send_logs(log_content, enhance_with_ai=True, session_id=session_id)
             
             if result:
                 # Add dynamic extraction metadata if applicable
@@ -2270,6 +2421,13 @@ def main():
                 )
                 console.print(ai_panel)
                 
+                compression = ai_analysis.get('log_compression')
+                if compression and compression.get('applied'):
+                    info_message(
+                        f"Log compression: {compression.get('input_lines', 0)} lines -> "
+                        f"{compression.get('templates', 0)} templates ({compression.get('compression_ratio', 1.0)}x smaller)"
+                    )
+                
                 # Show recommendations
                 recommendations = ai_analysis.get('recommendations', [])
                 if recommendations:
@@ -346,6 +346,8 @@ from typing import Dict, List, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 import json
 import hashlib
+import base64
+from bson import ObjectId
 
 class MongoDBService:
     """Service for handling MongoDB operations with your existing database."""
@@ -509,37 +511,82 @@ class MongoDBService:
             self.logger.error(f"Failed to update monitoring session: {e}")
     
     async def get_analysis_results(self, username: str = None, limit: int = 50, 
-                                 skip: int = 0) -> List[Dict[str, Any]]:
+                                 skip: int = 0, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Retrieve analysis results from MongoDB.
         
         Args:
             username: Filter by username (optional)
             limit: Maximum number of results
-            skip: Number of results to skip
+            skip: Number of results to skip (ignored with a cursor)
+            cursor: Continuation token from get_analysis_results_page
             
         Returns:
             List of analysis results
         """
+        page = await self.get_analysis_results_page(username, limit, cursor=cursor, skip=skip)
+        return page["results"]
+    
+    async def get_analysis_results_page(self, username: str = None, limit: int = 50,
+                                        cursor: Optional[str] = None, skip: int = 0) -> Dict[str, Any]:
+        """
+        Retrieve one page of analysis results, newest first.
+        
+        Pages are keyed on (created_at, _id), so each page is an index range
+        scan however deep the caller pages; ``skip`` remains for callers that
+        page by offset.
+        
+        Args:
+            username: Filter by username (optional)
+            limit: Maximum number of results
+            cursor: ``next_cursor`` of the previous page
+            skip: Number of results to skip (ignored with a cursor)
+            
+        Returns:
+            Dictionary with ``results`` and ``next_cursor`` (None on the last page)
+        """
         try:
             query = {}
             if username:
                 query["username"] = username
-            
-            cursor = self.analysis_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-            results = []
-            
-            async for document in cursor:
+            if cursor:
+                created_at, last_id = self._decode_cursor(cursor)
+                query = {"$and": [query, {"$or": [
+                    {"created_at": {"$lt": created_at}},
+                    {"created_at": created_at, "_id": {"$lt": last_id}}
+                ]}]}
+            
+            find = self.analysis_collection.find(query).sort([("created_at", -1), ("_id", -1)])
+            if skip and not cursor:
+                find = find.skip(skip)
+            documents = await find.limit(limit + 1).to_list(limit + 1)
+            
+            next_cursor = None
+            if len(documents) > limit:
+                documents = documents[:limit]
+                if documents[-1].get("created_at"):
+                    next_cursor = self._encode_cursor(documents[-1]["created_at"], documents[-1]["_id"])
+            
+            for document in documents:
                 # Convert ObjectId to string for JSON serialization
                 document["_id"] = str(document["_id"])
-                results.append(document)
             
-            self.logger.info(f"Retrieved {len(results)} analysis results")
-            return results
+            self.logger.info(f"Retrieved {len(documents)} analysis results")
+            return {"results": documents, "next_cursor": next_cursor}
             
         except Exception as e:
             self.logger.error(f"Failed to retrieve analysis results: {e}")
-            return []
+            return {"results": [], "next_cursor": None}
+    
+    @staticmethod
+    def _encode_cursor(created_at: datetime, document_id) -> str:
+        key = json.dumps({"t": created_at.isoformat(), "i": str(document_id)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+    
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(key["t"]), ObjectId(key["i"])
     
     async def get_monitoring_sessions(self, username: str = None, 
                                     active_only: bool = False) -> List[Dict[str, Any]]:
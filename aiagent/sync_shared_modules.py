@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Keep the modules the CLI shares with the server in sync.
+
+The CLI is packaged on its own and can't import from the server, so it ships
+copies of a few server modules. The server module is the canonical source:
+change it, then run this script to refresh the copies. With ``--check`` the
+copies are only compared, and the exit status is 1 if any has drifted.
+
+Usage:
+    python sync_shared_modules.py [--check]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+AIAGENT_DIR = Path(__file__).resolve().parent
+SERVER_DIR = AIAGENT_DIR.parent / "server"
+
+# CLI copy -> canonical module, relative to the server directory
+SHARED_MODULES = {
+    "log_template_miner.py": "services/log_template_miner.py",
+}
+
+HEADER = (
+    "# Copy of server/{source}; do not edit it here.\n"
+    "# Change the server module and run aiagent/sync_shared_modules.py.\n"
+)
+
+
+def expected_copy(source: str) -> str:
+    return HEADER.format(source=source) + (SERVER_DIR / source).read_text(encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the CLI's copies of shared server modules")
+    parser.add_argument("--check", action="store_true", help="Only report copies that differ from the server")
+    args = parser.parse_args()
+
+    drifted = []
+    for copy, source in SHARED_MODULES.items():
+        path = AIAGENT_DIR / copy
+        expected = expected_copy(source)
+        if path.exists() and path.read_text(encoding="utf-8") == expected:
+            continue
+        drifted.append(copy)
+        if not args.check:
+            path.write_text(expected, encoding="utf-8")
+            print(f"Updated {copy} from server/{source}")
+
+    if args.check and drifted:
+        print(f"Out of sync with the server: {', '.join(drifted)}; run sync_shared_modules.py")
+        sys.exit(1)
+    if not drifted:
+        print("Shared modules are in sync")
+
+
+if __name__ == "__main__":
+    main()
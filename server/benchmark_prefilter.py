@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the local security prefilter.
+
+Compares the single combined keyword regex used by SecurityPrefilter with a
+naive per-line, per-keyword substring scan on synthetic syslog/auth data.
+
+Usage:
+    python benchmark_prefilter.py --lines 200000 --suspicious-rate 0.02
+"""
+
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from services.security_prefilter import DEFAULT_KEYWORDS, SecurityPrefilter
+
+BENIGN = [
+    "{ts} web01 CRON[{pid}]: pam_unix(cron:session): session opened for user root by (uid=0)",
+    "{ts} web01 systemd[1]: Started Session {pid} of user deploy.",
+    "{ts} web01 nginx[{pid}]: 10.0.{a}.{b} - - \"GET /api/health HTTP/1.1\" 200 17",
+    "{ts} web01 kernel: [{pid}.{a}] eth0: link up, 1000Mbps, full-duplex",
+    "{ts} web01 dhclient[{pid}]: bound to 10.0.{a}.{b} -- renewal in 1800 seconds.",
+]
+SUSPICIOUS = [
+    "{ts} web01 sshd[{pid}]: Failed password for invalid user admin from 203.0.113.{b} port {port} ssh2",
+    "{ts} web01 sudo: www-data : user NOT in sudoers ; TTY=pts/0 ; COMMAND=/bin/cat /etc/shadow",
+    "{ts} web01 kernel: [UFW BLOCK] IN=eth0 SRC=198.51.100.{b} DST=10.0.0.5 PROTO=TCP DPT={port}",
+]
+
+
+def generate_logs(lines: int, suspicious_rate: float, seed: int) -> str:
+    rng = random.Random(seed)
+    output = []
+    for i in range(lines):
+        template = rng.choice(SUSPICIOUS) if rng.random() < suspicious_rate else rng.choice(BENIGN)
+        output.append(template.format(
+            ts=f"Oct 10 10:{i // 60 % 60:02d}:{i % 60:02d}",
+            pid=rng.randint(1000, 99999),
+            a=rng.randint(0, 255),
+            b=rng.randint(1, 254),
+            port=rng.randint(1024, 65535)
+        ))
+    return "\n".join(output)
+
+
+def naive_scan(logs: str, keywords) -> int:
+    matched = 0
+    for line in logs.splitlines():
+        lowered = line.lower()
+        if any(keyword in lowered for keyword in keywords):
+            matched += 1
+    return matched
+
+
+def run(label: str, func, logs: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    mb = len(logs) / 1e6
+    print(f"{label:<28} {best * 1000:9.1f} ms  {mb / best:8.1f} MB/s  {logs.count(chr(10)) / best / 1e6:6.2f} M lines/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the security prefilter keyword matcher")
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--suspicious-rate", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logs = generate_logs(args.lines, args.suspicious_rate, args.seed)
+    prefilter = SecurityPrefilter(keywords=DEFAULT_KEYWORDS)
+    print(f"{args.lines} lines, {len(logs) / 1e6:.1f} MB, {len(DEFAULT_KEYWORDS)} keywords\n")
+
+    run("naive per-keyword scan", lambda: naive_scan(logs, DEFAULT_KEYWORDS), logs, args.repeat)
+    run("combined regex (finditer)", lambda: sum(1 for _ in prefilter.pattern.finditer(logs.lower())), logs, args.repeat)
+    run("full prefilter scan", lambda: prefilter.scan(logs), logs, args.repeat)
+
+    result = prefilter.scan(logs)
+    print(f"\nverdict={result['verdict']} kept {result['kept_lines']}/{result['total_lines']} lines "
+          f"({len(result['filtered_logs']) / len(logs):.1%} of input), "
+          f"{result['suspicious_windows']}/{result['windows']} suspicious windows")
+
+
+if __name__ == "__main__":
+    main()
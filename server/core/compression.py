@@ -0,0 +1,337 @@
+"""
+HTTP body compression.
+
+Incremental gzip/zstd decoders with bounded output per call, shared by the
+streaming upload endpoint, and an ASGI middleware that transparently
+decompresses ``Content-Encoding`` request bodies and compresses responses
+above a size threshold for clients that send ``Accept-Encoding``.
+"""
+
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is only offered/accepted when installed
+    zstandard = None
+
+# Decompressed bytes produced per decompress call (bounds memory on highly compressible input)
+MAX_OUTPUT_PER_CALL = 1024 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class DecompressionError(ValueError):
+    """Raised for corrupt compressed input."""
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Content codings this server can decode and produce."""
+    return ("gzip", "zstd") if zstandard is not None else ("gzip",)
+
+
+class GzipDecoder:
+    """Incremental gzip decoder supporting concatenated members (e.g. from ``cat a.gz b.gz``)."""
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+    def decode(self, data: bytes) -> Iterator[bytes]:
+        try:
+            while data:
+                yield self._decompressor.decompress(data, MAX_OUTPUT_PER_CALL)
+                if self._decompressor.eof:
+                    # The remaining input starts the next member
+                    data = self._decompressor.unused_data
+                    self._decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+                else:
+                    data = self._decompressor.unconsumed_tail
+        except zlib.error as e:
+            raise DecompressionError(f"Corrupt gzip data: {e}")
+
+    def flush(self) -> Iterator[bytes]:
+        yield self._decompressor.flush()
+
+
+class ZstdDecoder:
+    # zstd's decompressobj has no output limit, so input is fed in small slices
+    INPUT_SLICE = 16 * 1024
+
+    def __init__(self):
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj(read_across_frames=True)
+
+    def decode(self, data: bytes) -> Iterator[bytes]:
+        try:
+            for start in range(0, len(data), self.INPUT_SLICE):
+                yield self._decompressor.decompress(data[start:start + self.INPUT_SLICE])
+        except zstandard.ZstdError as e:
+            raise DecompressionError(f"Corrupt zstd data: {e}")
+
+    def flush(self) -> Iterator[bytes]:
+        yield self._decompressor.flush()
+
+
+class IdentityDecoder:
+    def decode(self, data: bytes) -> Iterator[bytes]:
+        yield data
+
+    def flush(self) -> Iterator[bytes]:
+        return iter(())
+
+
+def make_decoder(encoding: Optional[str]):
+    """
+    Build an incremental decoder for a ``Content-Encoding`` value.
+
+    Raises:
+        ValueError: If the encoding is not supported
+    """
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return IdentityDecoder()
+    if encoding == "gzip":
+        return GzipDecoder()
+    if encoding == "zstd" and zstandard is not None:
+        return ZstdDecoder()
+    raise ValueError(f"Unsupported Content-Encoding '{encoding}' (use {', '.join(supported_encodings())} or identity)")
+
+
+class _Encoder:
+    """Streaming response encoder; ``compress`` flushes so each chunk is decodable on arrival."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.compress(data)
+        if final:
+            return output + self._compressor.flush()
+        if self.encoding == "zstd":
+            return output + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return output + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported coding from an Accept-Encoding header (zstd preferred on ties)."""
+    preferences: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            preferences[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in ("zstd", "gzip"):
+        if coding not in supported_encodings():
+            continue
+        quality = preferences.get(coding, preferences.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def _header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+class CompressionStats:
+    """Compressed vs uncompressed byte counters for requests and responses."""
+
+    def __init__(self):
+        self._metrics = {
+            "requests_decompressed": 0,
+            "request_bytes_compressed": 0,
+            "request_bytes_decompressed": 0,
+            "responses_compressed": 0,
+            "response_bytes_uncompressed": 0,
+            "response_bytes_compressed": 0
+        }
+
+    def record(self, **counters: int) -> None:
+        for name, value in counters.items():
+            self._metrics[name] += value
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = dict(self._metrics)
+        metrics["request_bytes_saved"] = metrics["request_bytes_decompressed"] - metrics["request_bytes_compressed"]
+        metrics["response_bytes_saved"] = metrics["response_bytes_uncompressed"] - metrics["response_bytes_compressed"]
+        return metrics
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware for request decompression and response compression.
+
+    Request bodies with ``Content-Encoding: gzip``/``zstd`` are decompressed
+    (up to ``max_request_bytes``) before the route sees them, except on
+    ``exclude_paths`` that stream-decode the body themselves. JSON, NDJSON and
+    text responses of at least ``minimum_size`` bytes are compressed with the
+    client's preferred coding; streamed responses are compressed chunk by
+    chunk with a sync flush so each item still arrives immediately.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, level: int = 6, max_request_bytes: int = 10 * 1024 * 1024,
+                 exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.max_request_bytes = max_request_bytes
+        self.exclude_paths = tuple(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = scope["headers"]
+        if not (self.exclude_paths and scope["path"].startswith(self.exclude_paths)):
+            content_encoding = _header(headers, b"content-encoding")
+            if content_encoding and content_encoding.strip().lower() != "identity":
+                result = await self._decompress_request(scope, receive, send, content_encoding)
+                if result is None:
+                    return
+                scope, receive = result
+
+        accept_encoding = _header(headers, b"accept-encoding")
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _ResponseCompressor(self, send, encoding))
+
+    async def _decompress_request(self, scope, receive, send, content_encoding: str):
+        try:
+            decoder = make_decoder(content_encoding)
+        except ValueError as e:
+            await _send_error(send, 415, str(e), [(b"accept-encoding", ", ".join(supported_encodings()).encode())])
+            return None
+
+        body: List[bytes] = []
+        size = compressed = 0
+        try:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return None
+                chunk = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                compressed += len(chunk)
+                outputs = list(decoder.decode(chunk)) if chunk else []
+                for output in outputs + (list(decoder.flush()) if not more_body else []):
+                    size += len(output)
+                    if size > self.max_request_bytes:
+                        await _send_error(send, 413, f"Request body exceeds {self.max_request_bytes} bytes decompressed")
+                        return None
+                    body.append(output)
+        except DecompressionError as e:
+            await _send_error(send, 400, str(e))
+            return None
+
+        compression_stats.record(
+            requests_decompressed=1, request_bytes_compressed=compressed, request_bytes_decompressed=size
+        )
+
+        headers = [(k, v) for k, v in scope["headers"] if k.lower() not in (b"content-encoding", b"content-length")]
+        headers.append((b"content-length", str(size).encode()))
+        scope = dict(scope, headers=headers)
+        payload = b"".join(body)
+        sent = False
+
+        async def replay_receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            return await receive()
+
+        return scope, replay_receive
+
+
+class _ResponseCompressor:
+    """``send`` wrapper that decides on compression once the response start and first body chunk are known."""
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str):
+        self.middleware = middleware
+        self.send = send
+        self.encoding = encoding
+        self.start_message: Optional[Dict[str, Any]] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = message.get("headers", [])
+            content_type = _header(headers, b"content-type") or ""
+            self.passthrough = (
+                _header(headers, b"content-encoding") is not None
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or message["status"] < 200 or message["status"] in (204, 304)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.encoder = _Encoder(self.encoding, self.middleware.level)
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in (b"content-length", b"content-encoding")]
+            headers.append((b"content-encoding", self.encoding.encode()))
+            headers.append((b"vary", b"Accept-Encoding"))
+            compressed = self.encoder.compress(body, final=not more_body)
+            if not more_body:
+                headers.append((b"content-length", str(len(compressed)).encode()))
+            compression_stats.record(
+                responses_compressed=1, response_bytes_uncompressed=len(body), response_bytes_compressed=len(compressed)
+            )
+            await self.send(dict(start, headers=headers))
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        compressed = self.encoder.compress(body, final=not more_body)
+        compression_stats.record(response_bytes_uncompressed=len(body), response_bytes_compressed=len(compressed))
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+
+async def _send_error(send, status: int, detail: str, extra_headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                   + (extra_headers or [])
+    })
+    await send({"type": "http.response.body", "body": body})
+
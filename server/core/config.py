@@ -22,14 +22,127 @@ class Settings(BaseSettings):
   MAX_LOG_LENGTH: str = "10000"
   MAX_RESULTS: str = "5"
   
+  # Chunked (map-reduce) summarization for logs larger than MAX_LOG_LENGTH
+  SUMMARY_CHUNKING_ENABLED: str = "True"
+  SUMMARY_CHUNK_TOKENS: str = "2500"
+  SUMMARY_MAX_CONCURRENCY: str = "8"
+  
+  # Local keyword prefilter: skip the LLM for windows without security signal
+  # PREFILTER_NO_FINDINGS_ACTION: "analyze" (send the whole window to the LLM) or "skip"
+  # (cheap no-findings result; only safe with keywords tuned for these logs)
+  # PREFILTER_KEYWORDS: optional "keyword[:weight],..." list replacing the defaults
+  PREFILTER_ENABLED: str = "True"
+  PREFILTER_NO_FINDINGS_ACTION: str = "analyze"
+  PREFILTER_KEYWORDS: str = ""
+  PREFILTER_WINDOW_LINES: str = "50"
+  PREFILTER_CONTEXT_LINES: str = "2"
+  PREFILTER_MIN_SCORE: str = "3"
+  
+  # Drain-style template mining of logs before summarization
+  LOG_TEMPLATE_MINING_ENABLED: str = "True"
+  LOG_TEMPLATE_DEPTH: str = "4"
+  LOG_TEMPLATE_SIMILARITY: str = "0.4"
+  
+  # Indicator of compromise extraction (IPs, domains, URLs, hashes, paths, registry keys)
+  IOC_EXTRACTION_ENABLED: str = "True"
+  IOC_MAX_PER_TYPE: str = "500"
+  
+  # Rolling per-session state for incremental monitoring analysis (requests with a session_id)
+  SESSION_STATE_ENABLED: str = "True"
+  SESSION_STATE_MAX_SESSIONS: str = "1000"
+  SESSION_STATE_TTL_SECONDS: str = "86400"
+  SESSION_STATE_MAX_TEMPLATES: str = "5000"
+  SESSION_STATE_MAX_TECHNIQUES: str = "20"
+  SESSION_STATE_TECHNIQUE_WINDOWS: str = "12"
+  SESSION_STATE_DIGEST_CHARS: str = "2000"
+  
+  # Opt-in micro-batching of enhance_threat_analysis calls
+  ENHANCEMENT_BATCHING_ENABLED: str = "False"
+  ENHANCEMENT_BATCH_WINDOW_MS: str = "50"
+  ENHANCEMENT_BATCH_MAX_SIZE: str = "16"
+  
+  # Return a stored result for identical logs resubmitted by the same user within the window
+  DEDUP_ENABLED: str = "True"
+  DEDUP_WINDOW_SECONDS: str = "3600"
+  
+  # Asynchronous analysis job queue
+  ANALYSIS_WORKERS: str = "4"
+  ANALYSIS_QUEUE_SIZE: str = "100"
+  ANALYSIS_JOB_TIMEOUT_SECONDS: str = "300"
+  
+  # Priority lanes (urgent, interactive, monitoring, backfill) served by weighted fair queuing
+  # ANALYSIS_LANE_WEIGHTS: optional "lane:weight,..." overrides of the default 8/4/2/1 weights
+  ANALYSIS_LANE_WEIGHTS: str = ""
+  ANALYSIS_LANE_MAX_WAIT_SECONDS: str = "60"
+  ANALYSIS_URGENT_SEVERITY: str = "0.8"
+  
+  # Background, batched persistence of analysis results
+  RESULT_WRITER_BATCH_SIZE: str = "50"
+  RESULT_WRITER_FLUSH_MS: str = "500"
+  RESULT_WRITER_MAX_PENDING: str = "1000"
+  RESULT_WRITER_SPILL_DIR: str = "./analysis_spill"
+  
+  # Analysis result retention: TTL on analysis_timestamp (0 keeps results forever)
+  # and the batch size and pause of on-demand cleanups
+  ANALYSIS_RETENTION_DAYS: str = "0"
+  ANALYSIS_CLEANUP_BATCH_SIZE: str = "500"
+  ANALYSIS_CLEANUP_PAUSE_MS: str = "200"
+  
+  # Batch retrieval of full analyses (history export/compare): decrypt threads and IDs per request
+  ANALYSIS_DECRYPT_WORKERS: str = "4"
+  ANALYSIS_BATCH_MAX_IDS: str = "200"
+  
+  # Bulk (NDJSON / multi-file) analysis endpoint
+  BULK_ANALYSIS_CONCURRENCY: str = "4"
+  BULK_MAX_ITEMS: str = "1000"
+  BULK_MAX_ITEM_BYTES: str = "262144"
+  
+  # Streaming (gzip/zstd) log file uploads: decompressed size cap, prefilter block size
+  # and longest line kept (longer lines are truncated)
+  UPLOAD_MAX_BYTES: str = "2147483648"
+  UPLOAD_BLOCK_LINES: str = "5000"
+  UPLOAD_MAX_LINE_CHARS: str = "65536"
+  
+  # Transparent gzip/zstd request decompression and response compression
+  COMPRESSION_ENABLED: str = "True"
+  COMPRESSION_MIN_SIZE: str = "1024"
+  COMPRESSION_LEVEL: str = "6"
+  COMPRESSION_MAX_REQUEST_BYTES: str = "10485760"
+  
   # AWS settings (optional)
   AWS_ACCESS_KEY_ID: str = ""
   AWS_SECRET_ACCESS_KEY: str = ""
   AWS_REGION: str = "us-east-1"
   AWS_SESSION_TOKEN: str = ""
   
+  # Bedrock knowledge base used by the single-call orchestrator pipeline
+  KNOWLEDGE_BASE_ID: str = ""
+  BEDROCK_KB_MODEL_ID: str = "amazon.titan-text-lite-v1"
+  
+  # Local LLM/embedding stand-in (llm_standin_server.py) for offline load testing
+  LLM_STANDIN_URL: str = ""
+  
+  # Shared MongoDB client, created in the app lifespan: connection pool bounds,
+  # timeouts (0 = no limit) and wire compressors ("zstd,snappy,zlib" in order of
+  # preference; zstd and snappy need the zstandard / python-snappy packages)
+  MONGO_DATABASE: str = "Forensiq"
+  MONGO_MAX_POOL_SIZE: str = "100"
+  MONGO_MIN_POOL_SIZE: str = "0"
+  MONGO_MAX_IDLE_TIME_MS: str = "0"
+  MONGO_COMPRESSORS: str = ""
+  MONGO_CONNECT_TIMEOUT_MS: str = "20000"
+  MONGO_SERVER_SELECTION_TIMEOUT_MS: str = "30000"
+  MONGO_SOCKET_TIMEOUT_MS: str = "0"
+  MONGO_WAIT_QUEUE_TIMEOUT_MS: str = "0"
+  
+  # Run explain() on the hot MongoDB queries at startup and warn about collection scans
+  INDEX_PLAN_CHECK_ON_STARTUP: str = "True"
+  
   # Encryption settings
   ENCRYPTION_MASTER_KEY: str = "default-encryption-key-change-in-production"
+  # In-memory cache of derived per-user keys (0 disables)
+  ENCRYPTION_KEY_CACHE_SIZE: str = "1024"
+  ENCRYPTION_KEY_CACHE_TTL_SECONDS: str = "900"
   
   model_config = SettingsConfigDict(env_file=".env")
 
@@ -49,10 +162,93 @@ class Config:
     MAX_LOG_LENGTH = int(settings.MAX_LOG_LENGTH)
     MAX_RESULTS = int(settings.MAX_RESULTS)
     
+    SUMMARY_CHUNKING_ENABLED = settings.SUMMARY_CHUNKING_ENABLED.lower() == "true"
+    SUMMARY_CHUNK_TOKENS = int(settings.SUMMARY_CHUNK_TOKENS)
+    SUMMARY_MAX_CONCURRENCY = int(settings.SUMMARY_MAX_CONCURRENCY)
+    
+    PREFILTER_ENABLED = settings.PREFILTER_ENABLED.lower() == "true"
+    PREFILTER_NO_FINDINGS_ACTION = settings.PREFILTER_NO_FINDINGS_ACTION.lower()
+    PREFILTER_KEYWORDS = settings.PREFILTER_KEYWORDS
+    PREFILTER_WINDOW_LINES = int(settings.PREFILTER_WINDOW_LINES)
+    PREFILTER_CONTEXT_LINES = int(settings.PREFILTER_CONTEXT_LINES)
+    PREFILTER_MIN_SCORE = int(settings.PREFILTER_MIN_SCORE)
+    
+    LOG_TEMPLATE_MINING_ENABLED = settings.LOG_TEMPLATE_MINING_ENABLED.lower() == "true"
+    LOG_TEMPLATE_DEPTH = int(settings.LOG_TEMPLATE_DEPTH)
+    LOG_TEMPLATE_SIMILARITY = float(settings.LOG_TEMPLATE_SIMILARITY)
+    
+    IOC_EXTRACTION_ENABLED = settings.IOC_EXTRACTION_ENABLED.lower() == "true"
+    IOC_MAX_PER_TYPE = int(settings.IOC_MAX_PER_TYPE)
+    
+    SESSION_STATE_ENABLED = settings.SESSION_STATE_ENABLED.lower() == "true"
+    SESSION_STATE_MAX_SESSIONS = int(settings.SESSION_STATE_MAX_SESSIONS)
+    SESSION_STATE_TTL_SECONDS = int(settings.SESSION_STATE_TTL_SECONDS)
+    SESSION_STATE_MAX_TEMPLATES = int(settings.SESSION_STATE_MAX_TEMPLATES)
+    SESSION_STATE_MAX_TECHNIQUES = int(settings.SESSION_STATE_MAX_TECHNIQUES)
+    SESSION_STATE_TECHNIQUE_WINDOWS = int(settings.SESSION_STATE_TECHNIQUE_WINDOWS)
+    SESSION_STATE_DIGEST_CHARS = int(settings.SESSION_STATE_DIGEST_CHARS)
+    
+    ENHANCEMENT_BATCHING_ENABLED = settings.ENHANCEMENT_BATCHING_ENABLED.lower() == "true"
+    ENHANCEMENT_BATCH_WINDOW_MS = int(settings.ENHANCEMENT_BATCH_WINDOW_MS)
+    ENHANCEMENT_BATCH_MAX_SIZE = int(settings.ENHANCEMENT_BATCH_MAX_SIZE)
+    
+    DEDUP_ENABLED = settings.DEDUP_ENABLED.lower() == "true"
+    DEDUP_WINDOW_SECONDS = int(settings.DEDUP_WINDOW_SECONDS)
+    
+    ANALYSIS_WORKERS = int(settings.ANALYSIS_WORKERS)
+    ANALYSIS_QUEUE_SIZE = int(settings.ANALYSIS_QUEUE_SIZE)
+    ANALYSIS_JOB_TIMEOUT_SECONDS = int(settings.ANALYSIS_JOB_TIMEOUT_SECONDS)
+    ANALYSIS_LANE_WEIGHTS = settings.ANALYSIS_LANE_WEIGHTS
+    ANALYSIS_LANE_MAX_WAIT_SECONDS = float(settings.ANALYSIS_LANE_MAX_WAIT_SECONDS)
+    ANALYSIS_URGENT_SEVERITY = float(settings.ANALYSIS_URGENT_SEVERITY)
+    
+    RESULT_WRITER_BATCH_SIZE = int(settings.RESULT_WRITER_BATCH_SIZE)
+    RESULT_WRITER_FLUSH_MS = int(settings.RESULT_WRITER_FLUSH_MS)
+    RESULT_WRITER_MAX_PENDING = int(settings.RESULT_WRITER_MAX_PENDING)
+    RESULT_WRITER_SPILL_DIR = settings.RESULT_WRITER_SPILL_DIR
+    
+    ANALYSIS_RETENTION_DAYS = int(settings.ANALYSIS_RETENTION_DAYS)
+    ANALYSIS_CLEANUP_BATCH_SIZE = int(settings.ANALYSIS_CLEANUP_BATCH_SIZE)
+    ANALYSIS_CLEANUP_PAUSE_MS = int(settings.ANALYSIS_CLEANUP_PAUSE_MS)
+    ANALYSIS_DECRYPT_WORKERS = int(settings.ANALYSIS_DECRYPT_WORKERS)
+    ANALYSIS_BATCH_MAX_IDS = int(settings.ANALYSIS_BATCH_MAX_IDS)
+    
+    BULK_ANALYSIS_CONCURRENCY = int(settings.BULK_ANALYSIS_CONCURRENCY)
+    BULK_MAX_ITEMS = int(settings.BULK_MAX_ITEMS)
+    BULK_MAX_ITEM_BYTES = int(settings.BULK_MAX_ITEM_BYTES)
+    
+    UPLOAD_MAX_BYTES = int(settings.UPLOAD_MAX_BYTES)
+    UPLOAD_BLOCK_LINES = int(settings.UPLOAD_BLOCK_LINES)
+    UPLOAD_MAX_LINE_CHARS = int(settings.UPLOAD_MAX_LINE_CHARS)
+    
+    COMPRESSION_ENABLED = settings.COMPRESSION_ENABLED.lower() == "true"
+    COMPRESSION_MIN_SIZE = int(settings.COMPRESSION_MIN_SIZE)
+    COMPRESSION_LEVEL = int(settings.COMPRESSION_LEVEL)
+    COMPRESSION_MAX_REQUEST_BYTES = int(settings.COMPRESSION_MAX_REQUEST_BYTES)
+    
     AWS_REGION = settings.AWS_REGION
     AWS_ACCESS_KEY_ID = settings.AWS_ACCESS_KEY_ID
     AWS_SECRET_ACCESS_KEY = settings.AWS_SECRET_ACCESS_KEY
     AWS_SESSION_TOKEN = settings.AWS_SESSION_TOKEN
+    
+    KNOWLEDGE_BASE_ID = settings.KNOWLEDGE_BASE_ID
+    BEDROCK_KB_MODEL_ID = settings.BEDROCK_KB_MODEL_ID
+    
+    LLM_STANDIN_URL = settings.LLM_STANDIN_URL
+    
+    MONGO_DATABASE = settings.MONGO_DATABASE
+    MONGO_MAX_POOL_SIZE = int(settings.MONGO_MAX_POOL_SIZE)
+    MONGO_MIN_POOL_SIZE = int(settings.MONGO_MIN_POOL_SIZE)
+    MONGO_MAX_IDLE_TIME_MS = int(settings.MONGO_MAX_IDLE_TIME_MS)
+    MONGO_COMPRESSORS = [c.strip() for c in settings.MONGO_COMPRESSORS.split(",") if c.strip()]
+    MONGO_CONNECT_TIMEOUT_MS = int(settings.MONGO_CONNECT_TIMEOUT_MS)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(settings.MONGO_SERVER_SELECTION_TIMEOUT_MS)
+    MONGO_SOCKET_TIMEOUT_MS = int(settings.MONGO_SOCKET_TIMEOUT_MS)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(settings.MONGO_WAIT_QUEUE_TIMEOUT_MS)
+    
+    INDEX_PLAN_CHECK_ON_STARTUP = settings.INDEX_PLAN_CHECK_ON_STARTUP.lower() == "true"
+    ENCRYPTION_KEY_CACHE_SIZE = int(settings.ENCRYPTION_KEY_CACHE_SIZE)
+    ENCRYPTION_KEY_CACHE_TTL_SECONDS = int(settings.ENCRYPTION_KEY_CACHE_TTL_SECONDS)
 
 logging.basicConfig(
     level=getattr(logging, Config.LOG_LEVEL),
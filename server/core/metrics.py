@@ -0,0 +1,21 @@
+"""
+Summary statistics shared by the /metrics reporters.
+"""
+
+import math
+from typing import Dict, Iterable
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentiles(values: Iterable[float], points: Iterable[int] = PERCENTILES) -> Dict[str, float]:
+    """Nearest-rank percentiles plus count, mean and max."""
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    result = {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 3)}
+    for point in points:
+        rank = max(1, math.ceil(point / 100 * len(ordered)))
+        result[f"p{point}"] = round(ordered[rank - 1], 3)
+    result["max"] = round(ordered[-1], 3)
+    return result
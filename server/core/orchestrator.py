@@ -1,8 +1,8 @@
 from services import ai_clients, ioc_extractor
+from .config import Config
 import uuid
-import os
 
-KNOWLEDGE_BASE_ID = os.getenv("KNOWLEDGE_BASE_ID")
+KNOWLEDGE_BASE_ID = Config.KNOWLEDGE_BASE_ID
 
 def run_analysis_pipeline(processed_log: dict):
     """
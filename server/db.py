@@ -1,8 +1,250 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+"""
+Shared MongoDB client.
+
+One AsyncIOMotorClient serves the whole process. The app lifespan creates it
+with ``mongo.connect()`` (pool bounds, timeouts and wire compression from
+Config) and closes it on shutdown; scripts that never run the lifespan get it
+on first use. ``database`` and the collection handles below can be imported
+and stored at import time: they resolve against the current client on every
+use, so module-level singletons never hold a client of their own.
+
+A pymongo connection pool listener counts open, checked-out and waiting
+connections and samples how long checkouts wait for a free connection.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+
+from core import Config, logger
 from core.config import settings
+from core.metrics import percentiles
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool utilisation and checkout wait times, from pool events."""
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._pools: Set[Any] = set()
+        self._waits_ms: Deque[float] = deque(maxlen=max_samples)
+        self._failures: Counter = Counter()
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.peak_in_use = 0
+        self.peak_waiting = 0
+        self.checkouts = 0
+        self.created = 0
+        self.closed = 0
+        self.cleared = 0
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pools.add(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.cleared += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.discard(event.address)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+            self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+            self.closed += 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self._failures[event.reason] += 1
+            self._waits_ms.append(event.duration * 1000)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self._waits_ms.append(event.duration * 1000)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def get_metrics(self, max_pool_size: int) -> Dict[str, Any]:
+        with self._lock:
+            capacity = max_pool_size * len(self._pools) if max_pool_size else 0
+            return {
+                "pools": len(self._pools),
+                "open": self.open,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "peak_in_use": self.peak_in_use,
+                "peak_waiting": self.peak_waiting,
+                "utilisation": round(self.in_use / capacity, 3) if capacity else None,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self._failures),
+                "checkout_wait_ms": percentiles(self._waits_ms),
+                "connections_created": self.created,
+                "connections_closed": self.closed,
+                "pool_cleared": self.cleared
+            }
+
+
+class MongoConnection:
+    """Owns the process-wide client and its pool statistics."""
+
+    def __init__(self, url: str, database_name: str):
+        self.url = url
+        self.database_name = database_name
+        self.pool_stats = PoolStats()
+        self._lock = threading.Lock()
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._database: Optional[AsyncIOMotorDatabase] = None
+        self._connected_at: Optional[float] = None
+
+    def client_options(self) -> Dict[str, Any]:
+        """Pool, timeout and compression options for the client."""
+        options = {
+            "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+            "connectTimeoutMS": Config.MONGO_CONNECT_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            # pymongo takes None for "no limit"
+            "socketTimeoutMS": Config.MONGO_SOCKET_TIMEOUT_MS or None,
+            "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+            "maxIdleTimeMS": Config.MONGO_MAX_IDLE_TIME_MS or None,
+            "event_listeners": [self.pool_stats]
+        }
+        if Config.MONGO_COMPRESSORS:
+            options["compressors"] = ",".join(Config.MONGO_COMPRESSORS)
+        return options
+
+    def connect(self) -> AsyncIOMotorDatabase:
+        """
+        Create the client if there is none yet.
+
+        Returns:
+            AsyncIOMotorDatabase: The application database
+        """
+        with self._lock:
+            if self._client is None:
+                self.pool_stats = PoolStats()
+                options = self.client_options()
+                self._client = AsyncIOMotorClient(self.url, **options)
+                self._database = self._client.get_database(self.database_name)
+                self._connected_at = time.time()
+                logger.info(f"MongoDB client created (maxPoolSize={options['maxPoolSize']}, "
+                            f"minPoolSize={options['minPoolSize']}, "
+                            f"compressors={options.get('compressors') or 'none'})")
+            return self._database
+
+    def close(self) -> None:
+        """Close the client; the next use creates a new one."""
+        with self._lock:
+            client, self._client, self._database = self._client, None, None
+            self._connected_at = None
+        if client is not None:
+            client.close()
+            logger.info("MongoDB client closed")
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        self.connect()
+        return self._client
+
+    @property
+    def database(self) -> AsyncIOMotorDatabase:
+        return self._database if self._database is not None else self.connect()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Client settings and connection pool statistics."""
+        return {
+            "connected": self._client is not None,
+            "uptime_seconds": round(time.time() - self._connected_at, 1) if self._connected_at else None,
+            "max_pool_size": Config.MONGO_MAX_POOL_SIZE,
+            "min_pool_size": Config.MONGO_MIN_POOL_SIZE,
+            "compressors": Config.MONGO_COMPRESSORS,
+            **self.pool_stats.get_metrics(Config.MONGO_MAX_POOL_SIZE)
+        }
+
+
+class CollectionHandle:
+    """A collection of the shared client, resolved on every use."""
+
+    def __init__(self, connection: MongoConnection, name: str):
+        self._connection = connection
+        self.name = name
+        self._database = None
+        self._collection = None
+
+    def _resolve(self):
+        database = self._connection.database
+        if database is not self._database:
+            self._collection = database.get_collection(self.name)
+            self._database = database
+        return self._collection
+
+    def __getattr__(self, attr: str):
+        return getattr(self._resolve(), attr)
+
+    def __repr__(self) -> str:
+        return f"CollectionHandle({self.name!r})"
+
+
+class DatabaseHandle:
+    """
+    The application database of the shared client, resolved on every use.
+
+    ``get_collection(name)``, ``database[name]`` and attribute access to a
+    collection (``database.user_collection``) return CollectionHandles; other
+    attributes (``command``, ``list_collection_names``...) are the database's.
+    """
+
+    def __init__(self, connection: MongoConnection):
+        self._connection = connection
+        self._collections: Dict[str, CollectionHandle] = {}
+
+    def get_collection(self, name: str) -> CollectionHandle:
+        if name not in self._collections:
+            self._collections[name] = CollectionHandle(self._connection, name)
+        return self._collections[name]
+
+    def __getitem__(self, name: str) -> CollectionHandle:
+        return self.get_collection(name)
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("_") or hasattr(AsyncIOMotorDatabase, attr):
+            return getattr(self._connection.database, attr)
+        return self.get_collection(attr)
+
 
-client = AsyncIOMotorClient(settings.MONGO_URL)
-database = client.Forensiq
+mongo = MongoConnection(settings.MONGO_URL, Config.MONGO_DATABASE)
+database = DatabaseHandle(mongo)
 user_collection = database.get_collection("users")
 analysis_collection = database.get_collection("analysis_results")
-monitoring_collection = database.get_collection("monitoring_sessions")
\ No newline at end of file
+monitoring_collection = database.get_collection("monitoring_sessions")
+analysis_jobs_collection = database.get_collection("analysis_jobs")
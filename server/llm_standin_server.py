@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini and AWS Bedrock APIs used by ForensIQ.
+
+Implements just enough of the wire protocols for offline load testing:
+
+- Gemini REST ``POST /v1beta/models/{model}:generateContent`` (GeminiService)
+- Bedrock runtime ``POST /model/{modelId}/invoke`` for Titan text embeddings
+  and Titan text generation (AWSBedrockService, aiclient)
+
+Point the server at it with ``LLM_STANDIN_URL=http://localhost:8090``.
+
+Usage:
+    python llm_standin_server.py --port 8090 \\
+        --generate-latency lognormal:800:0.4 --embed-latency uniform:20:60 \\
+        --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+DEFAULT_EMBEDDING_DIMENSION = 1024
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_.\-]+")
+
+
+class LatencyModel:
+    """
+    Latency distribution parsed from a spec string (all values in milliseconds):
+
+    - ``fixed:MS``
+    - ``uniform:LOW:HIGH``
+    - ``normal:MEAN:STDDEV``
+    - ``lognormal:MEDIAN:SIGMA``
+    """
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.spec = spec
+        self.rng = rng
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+
+    def sample_seconds(self) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            ms = self.rng.gauss(self.params[0], self.params[1])
+        else:
+            ms = self.params[0] * math.exp(self.rng.gauss(0.0, self.params[1]))
+        return max(0.0, ms) / 1000.0
+
+
+def hash_embedding(text: str, dimension: int = DEFAULT_EMBEDDING_DIMENSION, normalize: bool = True) -> List[float]:
+    """
+    Deterministic feature-hashed embedding.
+
+    Each token is hashed (blake2b, stable across processes) to a signed bucket,
+    so texts sharing vocabulary land close together and RAG search results
+    stay meaningful and reproducible under load.
+    """
+    vector = [0.0] * dimension
+    tokens = TOKEN_PATTERN.findall(text.lower()) or [text]
+    for token in tokens:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimension
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    if normalize:
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        vector = [v / norm for v in vector]
+    return vector
+
+
+def canned_text(prompt: str) -> str:
+    """Deterministic, prompt-dependent generation output."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    ips = sorted(set(re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", prompt)))[:5]
+    return (
+        f"**Security Events**: Stand-in analysis {digest} of {len(prompt)} prompt characters.\n"
+        f"**System Activities**: Routine activity observed.\n"
+        f"**Network Activities**: Addresses observed: {', '.join(ips) if ips else 'none'}.\n"
+        f"**Error Patterns**: None significant.\n"
+        f"**Timeline**: Events in input order.\n"
+        f"**Potential Threats**: Low confidence indicators only."
+    )
+
+
+def canned_batch_text(prompt: str) -> str:
+    """Answer a micro-batched enhancement prompt using its per-item markers."""
+    items = re.split(r"=== ITEM \d+ ===", prompt)[1:]
+    return "\n".join(
+        f"<<<ITEM {index}>>>\n{canned_text(item)}\n<<<END ITEM {index}>>>"
+        for index, item in enumerate(items, start=1)
+    )
+
+
+def canned_structured_json() -> str:
+    return json.dumps({
+        "summary": "Stand-in structured response.",
+        "priority": "low",
+        "detection_strategies": [],
+        "mitigation_recommendations": [],
+        "related_techniques": [],
+        "references": [],
+        "notes": "Generated by the local LLM stand-in."
+    })
+
+
+def create_app(generate_latency: str = "fixed:0", embed_latency: str = "fixed:0",
+               error_rate: float = 0.0, error_statuses: str = "429,500,503",
+               seed: int = 0) -> FastAPI:
+    """Build the stand-in application with the given latency and error settings."""
+    rng = random.Random(seed)
+    latencies = {
+        "generate": LatencyModel(generate_latency, rng),
+        "embed": LatencyModel(embed_latency, rng),
+    }
+    statuses = [int(s) for s in error_statuses.split(",") if s.strip()]
+    stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"requests": 0, "errors": 0})
+
+    app = FastAPI(title="ForensIQ LLM stand-in", docs_url=None, redoc_url=None)
+
+    async def simulate(kind: str) -> int:
+        """Sleep for a sampled latency and decide whether to inject an error."""
+        stats[kind]["requests"] += 1
+        await asyncio.sleep(latencies[kind].sample_seconds())
+        if error_rate > 0 and statuses and rng.random() < error_rate:
+            stats[kind]["errors"] += 1
+            return rng.choice(statuses)
+        return 0
+
+    def gemini_error(status: int) -> JSONResponse:
+        names = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+        return JSONResponse(status_code=status, content={"error": {
+            "code": status,
+            "message": "Injected error from LLM stand-in",
+            "status": names.get(status, "UNKNOWN")
+        }})
+
+    def bedrock_error(status: int) -> JSONResponse:
+        names = {429: "ThrottlingException", 500: "InternalServerException", 503: "ServiceUnavailableException"}
+        error_type = names.get(status, "InternalServerException")
+        return JSONResponse(
+            status_code=status,
+            content={"message": "Injected error from LLM stand-in"},
+            headers={"x-amzn-ErrorType": f"{error_type}:"}
+        )
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def gemini_generate_content(model: str, request: Request):
+        body = await request.json()
+        status = await simulate("generate")
+        if status:
+            return gemini_error(status)
+
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = canned_batch_text(prompt) if "<<<END ITEM n>>>" in prompt else canned_text(prompt)
+        return {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0
+            }],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4
+            },
+            "modelVersion": model
+        }
+
+    @app.post("/model/{model_id}/invoke")
+    async def bedrock_invoke_model(model_id: str, request: Request):
+        body = json.loads(await request.body() or b"{}")
+        is_embedding = "embed" in model_id
+        status = await simulate("embed" if is_embedding else "generate")
+        if status:
+            return bedrock_error(status)
+
+        input_text = body.get("inputText", "")
+        if is_embedding:
+            return {
+                "embedding": hash_embedding(
+                    input_text,
+                    dimension=int(body.get("dimensions", DEFAULT_EMBEDDING_DIMENSION)),
+                    normalize=bool(body.get("normalize", True))
+                ),
+                "inputTextTokenCount": len(input_text) // 4
+            }
+
+        if "Return ONLY one JSON object" in input_text:
+            output = canned_structured_json()
+        else:
+            output = canned_text(input_text)
+        return {
+            "inputTextTokenCount": len(input_text) // 4,
+            "results": [{
+                "tokenCount": len(output) // 4,
+                "outputText": output,
+                "completionReason": "FINISH"
+            }]
+        }
+
+    @app.get("/__standin/stats")
+    async def standin_stats() -> Dict[str, Any]:
+        return {
+            "latency": {kind: model.spec for kind, model in latencies.items()},
+            "error_rate": error_rate,
+            "routes": dict(stats),
+            "timestamp": time.time()
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini/Bedrock stand-in for offline load testing")
+    parser.add_argument("--host", default=os.getenv("STANDIN_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("STANDIN_PORT", 8090)))
+    parser.add_argument("--generate-latency", default=os.getenv("STANDIN_GENERATE_LATENCY", "lognormal:800:0.4"),
+                        help="Latency spec for text generation, e.g. fixed:500, uniform:200:900, lognormal:800:0.4")
+    parser.add_argument("--embed-latency", default=os.getenv("STANDIN_EMBED_LATENCY", "uniform:20:60"),
+                        help="Latency spec for embeddings")
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("STANDIN_ERROR_RATE", 0.0)),
+                        help="Fraction of requests (0-1) answered with an injected error")
+    parser.add_argument("--error-statuses", default=os.getenv("STANDIN_ERROR_STATUSES", "429,500,503"),
+                        help="Comma-separated HTTP statuses to inject")
+    parser.add_argument("--seed", type=int, default=int(os.getenv("STANDIN_SEED", 0)))
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(
+        generate_latency=args.generate_latency,
+        embed_latency=args.embed_latency,
+        error_rate=args.error_rate,
+        error_statuses=args.error_statuses,
+        seed=args.seed
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,22 @@ from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from datetime import datetime
 from core import Config, logger
+from db import mongo
+from core.compression import CompressionMiddleware, compression_stats
 from services import GeminiService, ChromaDBService, AWSBedrockService
 from routers import auth, users, analysis_router, mitre
 from routers import monitoring
-from routers.analysis import set_services
+from routers.analysis import set_services, process_analysis_job
+from services.analysis_job_queue import analysis_job_queue
+from services.analysis_session_state import analysis_session_store
+from services.security_prefilter import security_prefilter
+from services.ioc_extractor import ioc_extraction_stats
+from services.encryption_service import encryption_service
+from services.stage_timings import stage_timing_stats
+from services.analysis_result_writer import analysis_result_writer
+from services.index_manager import index_manager
+from services.analytics_rollups import analytics_rollups
+from services.keyset_pagination import NEXT_CURSOR_HEADER
 from routers.mitre import set_mitre_services
 from model import HealthCheck, ErrorResponse, DatabaseStats
 
@@ -21,6 +33,8 @@ async def lifespan(app: FastAPI):
     logger.info("Starting ForensIQ API server...")
     try:
         global gemini_service, chromadb_service, aws_bedrock_service
+        logger.info("Connecting to MongoDB...")
+        mongo.connect()
         logger.info("Initializing Gemini AI service...")
         gemini_service = GeminiService()
         logger.info("Initializing ChromaDB service...")
@@ -35,12 +49,21 @@ async def lifespan(app: FastAPI):
         # Set services for routers
         set_services(gemini_service, chromadb_service)
         set_mitre_services(aws_bedrock_service, chromadb_service, gemini_service)
+        await index_manager.ensure_indexes()
+        if Config.INDEX_PLAN_CHECK_ON_STARTUP:
+            await index_manager.explain_hot_queries()
+        await analysis_result_writer.start()
+        logger.info("Starting analysis job workers...")
+        await analysis_job_queue.start(process_analysis_job)
         logger.info("All services initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize services: {str(e)}")
         raise
     yield
     logger.info("Shutting down ForensIQ API server...")
+    await analysis_job_queue.stop()
+    await analysis_result_writer.stop()
+    mongo.close()
 
 app = FastAPI(
     title="ForensIQ - MITRE ATT&CK Log Analysis API",
@@ -51,12 +74,23 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Added first so CORS wraps it and its own 400/413/415 responses carry CORS headers
+if Config.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=Config.COMPRESSION_MIN_SIZE,
+        level=Config.COMPRESSION_LEVEL,
+        max_request_bytes=Config.COMPRESSION_MAX_REQUEST_BYTES,
+        exclude_paths=["/api/v1/analyze/upload"]  # decodes its own streaming body
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*","localhost:3000"],  # Configure appropriately for production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -128,6 +162,31 @@ async def health_check():
             services={"error": str(e)}
         )
 
+@app.get("/metrics", response_model=dict)
+async def service_metrics():
+    """Runtime performance metrics collected by the AI services."""
+    return {
+        "gemini": gemini_service.get_metrics() if gemini_service else {},
+        "aws_bedrock": aws_bedrock_service.get_metrics() if aws_bedrock_service else {},
+        "analysis_jobs": analysis_job_queue.get_metrics(),
+        "prefilter": security_prefilter.get_metrics(),
+        "ioc_extractor": ioc_extraction_stats.get_metrics(),
+        "analysis_sessions": analysis_session_store.get_metrics(),
+        "stage_timings": stage_timing_stats.get_metrics(),
+        "result_writer": analysis_result_writer.get_metrics(),
+        "compression": compression_stats.get_metrics(),
+        "encryption_key_cache": encryption_service.key_cache.get_metrics(),
+        "indexes": index_manager.get_metrics(),
+        "analytics_rollups": analytics_rollups.get_metrics(),
+        "mongo": mongo.get_metrics(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/metrics/query-plans", response_model=dict)
+async def query_plans():
+    """Explain the hot MongoDB queries and list any that scan a whole collection."""
+    return await index_manager.explain_hot_queries()
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler for unhandled errors."""
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Re-encrypt stored analysis results into the binary envelope format.
+
+Analyses written before the envelope format hold one Fernet token per field;
+this rewrites them in batches as a single AES-GCM envelope. Safe to interrupt
+and rerun, and to run while the API is serving.
+
+Usage:
+    python migrate_encryption.py --batch-size 200 [--user USER] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the server directory to Python path
+server_dir = Path(__file__).parent
+sys.path.insert(0, str(server_dir))
+
+from db import mongo
+from services.analysis_storage_service import analysis_storage_service
+from core import logger
+
+async def migrate(batch_size: int, user_id: str, dry_run: bool):
+    """Run the migration and return its counts, or None on error."""
+    try:
+        counts = await analysis_storage_service.migrate_encryption_format(
+            batch_size=batch_size, user_id=user_id, dry_run=dry_run
+        )
+        logger.info(f"Encryption migration finished: {counts}")
+        return counts
+    except Exception as e:
+        logger.error(f"Encryption migration failed: {str(e)}")
+        return None
+    finally:
+        mongo.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-encrypt analysis results into the binary envelope format")
+    parser.add_argument("--batch-size", type=int, default=200, help="Documents per bulk write")
+    parser.add_argument("--user", default=None, help="Only migrate this user's analyses")
+    parser.add_argument("--dry-run", action="store_true", help="Re-encrypt without writing")
+    args = parser.parse_args()
+
+    counts = asyncio.run(migrate(args.batch_size, args.user, args.dry_run))
+    if counts is None:
+        print("❌ Encryption migration failed")
+        sys.exit(1)
+    verb = "would be migrated" if args.dry_run else "migrated"
+    print(f"✅ {counts['migrated']} of {counts['scanned']} analyses {verb}, {counts['failed']} undecryptable")
+    sys.exit(1 if counts["failed"] else 0)
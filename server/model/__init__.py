@@ -1,4 +1,4 @@
-from .logs_model import HealthCheck, ErrorResponse, DatabaseStats, LogAnalysisResponse
+from .logs_model import HealthCheck, ErrorResponse, DatabaseStats, LogAnalysisResponse, AnalysisJobStatus
 from .users import UserBase, UserCreate, UserUpdate, PasswordChange, UserInDB, Token, TokenData
 
-__all__ = ["HealthCheck", "ErrorResponse", "DatabaseStats", "LogAnalysisResponse", "UserBase", "UserCreate", "UserUpdate", "PasswordChange", "UserInDB", "Token", "TokenData"]          
\ No newline at end of file
+__all__ = ["HealthCheck", "ErrorResponse", "DatabaseStats", "LogAnalysisResponse", "AnalysisJobStatus", "UserBase", "UserCreate", "UserUpdate", "PasswordChange", "UserInDB", "Token", "TokenData"]          
\ No newline at end of file
@@ -28,9 +28,11 @@ class AnalysisResult(BaseModel):
     request_data: StoredAnalysisRequest = Field(..., description="Original request data")
     
     # Results (encrypted)
-    encrypted_summary: str = Field(..., description="Encrypted AI-generated summary")
-    encrypted_techniques: str = Field(..., description="Encrypted matched techniques JSON")
-    encrypted_enhanced_analysis: Optional[str] = Field(None, description="Encrypted enhanced analysis")
+    encrypted_payload: Optional[bytes] = Field(None, description="Binary envelope of all results (format 2)")
+    encryption_version: int = Field(default=1, description="Storage format of the encrypted results")
+    encrypted_summary: Optional[str] = Field(None, description="Encrypted AI-generated summary (format 1)")
+    encrypted_techniques: Optional[str] = Field(None, description="Encrypted matched techniques JSON (format 1)")
+    encrypted_enhanced_analysis: Optional[str] = Field(None, description="Encrypted enhanced analysis (format 1)")
     
     # Metadata (not encrypted)
     analysis_timestamp: datetime = Field(default_factory=datetime.utcnow, description="Analysis timestamp")
@@ -55,6 +57,10 @@ class AnalysisHistoryItem(BaseModel):
     techniques_count: int = Field(..., description="Number of matched techniques")
     logs_preview: str = Field(..., description="First 100 characters of logs")
 
+class AnalysisBatchRequest(BaseModel):
+    """Model for retrieving several full analyses at once (export, comparison)."""
+    analysis_ids: List[str] = Field(..., min_length=1, description="Analysis IDs, results are returned in this order")
+
 class UserAnalyticsStats(BaseModel):
     """Model for user analytics statistics."""
     total_analyses: int = Field(..., description="Total number of analyses performed")
@@ -52,3 +52,4 @@ class AnalysisStats(BaseModel):
     active_sessions: int = Field(..., description="Number of active monitoring sessions")
     top_techniques: List[Dict[str, Any]] = Field(default_factory=list, description="Most frequently detected techniques")
     average_processing_time: float = Field(..., description="Average processing time in milliseconds")
+    stage_timings: Dict[str, Dict[str, float]] = Field(default_factory=dict, description="Per-stage timing percentiles in milliseconds")
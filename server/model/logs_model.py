@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 class LogAnalysisRequest(BaseModel):
@@ -7,6 +7,9 @@ class LogAnalysisRequest(BaseModel):
     logs: str = Field(..., description="System logs to analyze", max_length=50000)
     enhance_with_ai: bool = Field(default=True, description="Whether to enhance analysis with AI")
     max_results: Optional[int] = Field(default=5, description="Maximum number of ATT&CK techniques to return", ge=1, le=20)
+    session_id: Optional[str] = Field(default=None, description="Monitoring session the logs belong to; only activity new to the session is analyzed", max_length=128, pattern=r"^[\w.:-]+$")
+    request_type: Optional[Literal["interactive", "monitoring", "backfill"]] = Field(default=None, description="Scheduling class; defaults to monitoring with a session_id, interactive otherwise")
+    severity_score: Optional[float] = Field(default=None, description="Client-side severity estimate (e.g. the CLI agent's threat score); high scores are scheduled in the urgent lane", ge=0, le=1)
 
 class AttackTechnique(BaseModel):
     """Model for MITRE ATT&CK technique."""
@@ -19,11 +22,32 @@ class AttackTechnique(BaseModel):
 
 class LogAnalysisResponse(BaseModel):
     """Response model for log analysis."""
+    analysis_id: Optional[str] = Field(None, description="ID under which the result is stored")
     summary: str = Field(..., description="AI-generated summary of the logs")
     matched_techniques: List[AttackTechnique] = Field(default_factory=list, description="Matching MITRE ATT&CK techniques")
     enhanced_analysis: Optional[str] = Field(None, description="Enhanced AI analysis with threat intelligence")
     analysis_timestamp: datetime = Field(default_factory=datetime.utcnow, description="When the analysis was performed")
     processing_time_ms: Optional[float] = Field(None, description="Processing time in milliseconds")
+    timings: Optional[Dict[str, float]] = Field(None, description="Per-stage timings in milliseconds (auth_lookup, queue_wait, preprocess, summarize, search, enhance; encrypt and store run in the background)")
+    dedup_hit: bool = Field(default=False, description="True when this is a stored result for identical logs analyzed recently")
+    dedup_of: Optional[str] = Field(None, description="ID of the stored analysis returned for a dedup hit")
+    prefilter: Optional[Dict[str, Any]] = Field(None, description="Local security prefilter verdict and scores")
+    log_compression: Optional[Dict[str, Any]] = Field(None, description="Template mining stats for the summarized input (lines, templates, compression ratio)")
+    upload: Optional[Dict[str, Any]] = Field(None, description="Streaming upload stats (encoding, compressed/uncompressed bytes, lines, parse throughput)")
+    iocs: Optional[Dict[str, List[str]]] = Field(None, description="Indicators of compromise found in the logs, by type (ipv4, ipv6, domains, urls, emails, md5, sha1, sha256, file_paths, registry_keys)")
+    session: Optional[Dict[str, Any]] = Field(None, description="Monitoring session state after this window (window number, new/known lines and templates, active techniques)")
+
+class AnalysisJobStatus(BaseModel):
+    """Status of an asynchronous log analysis job."""
+    job_id: str = Field(..., description="Analysis job identifier")
+    status: str = Field(..., description="Job status: queued, running, completed, failed")
+    created_at: datetime = Field(..., description="When the job was submitted")
+    started_at: Optional[datetime] = Field(None, description="When a worker started the job")
+    completed_at: Optional[datetime] = Field(None, description="When the job finished")
+    attempts: int = Field(default=0, description="Number of times a worker picked up the job")
+    lane: Optional[str] = Field(None, description="Priority lane the job was scheduled in: urgent, interactive, monitoring, backfill")
+    result: Optional[LogAnalysisResponse] = Field(None, description="Analysis result once completed")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
 
 class DatabaseStats(BaseModel):
     """Model for database statistics."""
@@ -1,13 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, List
-import time, re
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import UploadFile
+from starlette.requests import ClientDisconnect
+from typing import Dict, Any, List, Optional, AsyncIterator
+from contextlib import nullcontext
+import asyncio, json, time, re
 from pydantic import BaseModel
-from model.logs_model import LogAnalysisRequest, LogAnalysisResponse, AttackTechnique
-from model.analysis_model import AnalysisHistoryItem, UserAnalyticsStats
+from model.logs_model import LogAnalysisRequest, LogAnalysisResponse, AnalysisJobStatus
+from model.analysis_model import AnalysisBatchRequest, AnalysisHistoryItem, UserAnalyticsStats
 from services import GeminiService, ChromaDBService
 from services.analysis_storage_service import analysis_storage_service
+from services.analysis_pipeline import run_log_analysis
+from services.analysis_job_queue import analysis_job_queue, QueueFullError
+from services.analysis_session_state import analysis_session_store
+from services.stage_timings import StageTimer, stage_timing_stats
+from services.keyset_pagination import NEXT_CURSOR_HEADER
+from services.bulk_analysis import (
+    BulkItem, BulkStreamingResponse, build_item, iter_ndjson_items, run_bulk_analysis, until_exhausted
+)
+from services.log_upload import LogUploadIngestor, UploadError, ingest_log_stream
 from routers.auth import get_current_user
-from core import logger
+from core import Config, logger
 
 router = APIRouter(prefix="/api/v1", tags=["Log Analysis"])
 
@@ -21,8 +34,141 @@ def set_services(gemini: GeminiService, chromadb: ChromaDBService):
     gemini_service = gemini
     chromadb_service = chromadb
 
+async def _find_duplicate_analysis(user_id: str, request: LogAnalysisRequest,
+                                   timings: Optional[Dict[str, float]] = None) -> Optional[LogAnalysisResponse]:
+    """Return the stored result for identical logs analyzed within Config.DEDUP_WINDOW_SECONDS."""
+    # A session window's result depends on the session state, not only on the logs
+    if not Config.DEDUP_ENABLED or request.session_id:
+        return None
+    
+    started = time.perf_counter()
+    try:
+        duplicate = await analysis_storage_service.find_duplicate_analysis(
+            user_id, request, Config.DEDUP_WINDOW_SECONDS
+        )
+    except Exception as e:
+        logger.error(f"Dedup lookup failed, analyzing normally: {str(e)}")
+        return None
+    if not duplicate:
+        return None
+    
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    logger.info(f"Dedup hit for user {user_id}: returning stored analysis {duplicate['analysis_id']}")
+    return LogAnalysisResponse(
+        summary=duplicate["summary"],
+        matched_techniques=duplicate["matched_techniques"],
+        enhanced_analysis=duplicate["enhanced_analysis"],
+        iocs=duplicate.get("iocs"),
+        analysis_timestamp=duplicate["analysis_timestamp"],
+        processing_time_ms=elapsed_ms,
+        timings={**(timings or {}), "dedup_lookup": elapsed_ms},
+        analysis_id=duplicate["analysis_id"],
+        dedup_hit=True,
+        dedup_of=duplicate["analysis_id"]
+    )
+
+async def process_analysis_job(user_id: str, request: LogAnalysisRequest,
+                               timings: Optional[Dict[str, float]] = None) -> LogAnalysisResponse:
+    """Job runner: run the analysis pipeline and queue the result for encrypted storage."""
+    # Jobs submitted directly to /analyze/jobs haven't been checked yet
+    duplicate = await _find_duplicate_analysis(user_id, request, timings)
+    if duplicate:
+        return duplicate
+    
+    # Monitoring windows with a session_id are analyzed against the session's rolling state
+    session_scope = nullcontext()
+    if request.session_id and Config.SESSION_STATE_ENABLED:
+        session_scope = analysis_session_store.session(user_id, request.session_id)
+    async with session_scope as session:
+        response = await run_log_analysis(
+            gemini_service,
+            chromadb_service,
+            logs=request.logs,
+            enhance_with_ai=request.enhance_with_ai,
+            max_results=request.max_results,
+            timings=timings,
+            session=session
+        )
+    
+    # Store the analysis result in encrypted format (in the background, ID assigned now)
+    try:
+        response.analysis_id = await analysis_storage_service.queue_analysis_result(
+            user_id=user_id,
+            request=request,
+            response=response
+        )
+        logger.info(f"Queued analysis result {response.analysis_id} for storage for user {user_id}")
+    except Exception as e:
+        logger.error(f"Failed to queue analysis result for storage: {str(e)}")
+        # Continue without failing the request - storage is not critical for the response
+    
+    stage_timing_stats.record(response.timings)
+    return response
+
+def _request_timings(http_request: Request) -> Dict[str, float]:
+    """Stage timings measured before the handler ran (auth lookup)."""
+    auth_lookup_ms = getattr(http_request.state, "auth_lookup_ms", None)
+    return {"auth_lookup": auth_lookup_ms} if auth_lookup_ms is not None else {}
+
+async def _submit_analysis_job(request: LogAnalysisRequest, user_id: str,
+                               timings: Optional[Dict[str, float]] = None) -> AnalysisJobStatus:
+    """Admit a job to the queue, translating backpressure into 429 responses."""
+    if not gemini_service or not chromadb_service:
+        raise HTTPException(
+            status_code=500,
+            detail="Services not properly initialized"
+        )
+    
+    try:
+        return await analysis_job_queue.submit(user_id, request, timings=timings)
+    except QueueFullError as e:
+        logger.warning(f"Rejected analysis for user {user_id}: queue full")
+        raise HTTPException(
+            status_code=429,
+            detail="Analysis queue is full, please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def _analyze_and_wait(request: LogAnalysisRequest, user_id: str,
+                            timings: Optional[Dict[str, float]] = None,
+                            retry_when_full: bool = False) -> LogAnalysisResponse:
+    """
+    Dedup check, queue the job and wait for its result.
+    
+    With ``retry_when_full`` a full queue is waited out (honouring Retry-After)
+    instead of surfacing a 429, which suits bulk requests.
+    """
+    duplicate = await _find_duplicate_analysis(user_id, request, timings)
+    if duplicate:
+        return duplicate
+    
+    while True:
+        try:
+            job = await _submit_analysis_job(request, user_id, timings)
+            break
+        except HTTPException as e:
+            if not retry_when_full or e.status_code != 429:
+                raise
+            await asyncio.sleep(min(int(e.headers["Retry-After"]), 5))
+    
+    job = await analysis_job_queue.get_job(
+        user_id, job.job_id, wait_seconds=Config.ANALYSIS_JOB_TIMEOUT_SECONDS
+    )
+    
+    if job and job.status == "completed" and job.result:
+        return job.result
+    if job and job.status == "failed":
+        raise HTTPException(
+            status_code=500,
+            detail=job.error or "Analysis failed"
+        )
+    raise HTTPException(
+        status_code=504,
+        detail="Analysis did not complete in time"
+    )
+
 @router.post("/analyze", response_model=LogAnalysisResponse)
-async def analyze_logs(request: LogAnalysisRequest, current_user: dict = Depends(get_current_user)) -> LogAnalysisResponse:
+async def analyze_logs(request: LogAnalysisRequest, http_request: Request, current_user: dict = Depends(get_current_user)) -> LogAnalysisResponse:
     """
     Analyze system logs using AI summarization and MITRE ATT&CK technique matching.
     
@@ -31,102 +177,262 @@ async def analyze_logs(request: LogAnalysisRequest, current_user: dict = Depends
     2. Searches the ChromaDB vector database for matching MITRE ATT&CK techniques
     3. Optionally enhances the analysis with additional AI insights
     
+    It is a synchronous wrapper over the job API: the analysis is queued and
+    the request waits for the job to finish. Identical logs analyzed by the
+    same user within Config.DEDUP_WINDOW_SECONDS return the stored result
+    without queueing (``dedup_hit`` is set).
+    
     Args:
         request: LogAnalysisRequest containing logs and analysis parameters
         
     Returns:
         LogAnalysisResponse with summary, matched techniques, and enhanced analysis
     """
-    start_time = time.time()
-    
     try:
-        if not gemini_service or not chromadb_service:
-            raise HTTPException(
-                status_code=500,
-                detail="Services not properly initialized"
-            )
-        
-        logger.info(f"Starting log analysis for {len(request.logs)} characters of logs")
+        return await _analyze_and_wait(request, current_user["username"], _request_timings(http_request))
         
-        # Step 1: Summarize logs with Gemini AI
-        logger.info("Generating log summary with Gemini AI")
-        summary = await gemini_service.summarize_logs(request.logs)
-        
-        if not summary:
-            logger.error("Failed to generate summary: empty response")
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to generate log summary: empty response"
-            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in log analysis: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+async def _iter_uploaded_files(form, defaults: Dict[str, Any]) -> AsyncIterator[BulkItem]:
+    """One bulk item per uploaded file; the filename is used as the item id."""
+    uploads = [value for _, value in form.multi_items() if isinstance(value, UploadFile)]
+    for index, upload in enumerate(uploads[:Config.BULK_MAX_ITEMS]):
+        content = await upload.read(Config.BULK_MAX_ITEM_BYTES + 1)
+        if len(content) > Config.BULK_MAX_ITEM_BYTES:
+            yield BulkItem(index, upload.filename, error=f"file exceeds {Config.BULK_MAX_ITEM_BYTES} bytes")
+            continue
+        yield build_item(index, {"logs": content.decode("utf-8", errors="replace")}, defaults,
+                         len(content), item_id=upload.filename)
+
+@router.post("/analyze/bulk")
+async def analyze_logs_bulk(
+    http_request: Request,
+    enhance_with_ai: bool = Query(True, description="Default for items that don't set enhance_with_ai"),
+    max_results: int = Query(5, ge=1, le=20, description="Default for items that don't set max_results"),
+    current_user: dict = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Analyze many log items in one request, streaming each result as it completes.
+    
+    The body is either newline-delimited JSON (``application/x-ndjson``), one
+    LogAnalysisRequest object per line with an optional ``id``, or
+    ``multipart/form-data`` with one or more log files. Items run through the
+    regular job queue, at most Config.BULK_ANALYSIS_CONCURRENCY at a time.
+    NDJSON bodies are parsed line by line while results stream back, so the
+    first results arrive before the body has been fully sent. Uploaded files
+    are spooled by the multipart parser and read one at a time.
+    
+    The response is NDJSON: one ``{"type": "result", "index", "id", "status",
+    "result" | "error"}`` line per item in completion order, then a
+    ``{"type": "summary"}`` line with counts and throughput. A failing item
+    doesn't fail the request.
+    
+    Args:
+        enhance_with_ai: Default applied to items that don't set it
+        max_results: Default applied to items that don't set it
+        current_user: Current authenticated user
         
-        # Clean the summary - remove any error prefixes that might be mistaken for actual errors
-        if summary.startswith("Error generating summary:"):
-            logger.error(f"Failed to generate summary: {summary}")
+    Returns:
+        StreamingResponse of NDJSON result lines
+    """
+    if not gemini_service or not chromadb_service:
+        raise HTTPException(
+            status_code=500,
+            detail="Services not properly initialized"
+        )
+    
+    user_id = current_user["username"]
+    timings = _request_timings(http_request)
+    # Bulk items are scheduled in the backfill lane unless they set request_type themselves
+    defaults = {"enhance_with_ai": enhance_with_ai, "max_results": max_results, "request_type": "backfill"}
+    
+    body_read = asyncio.Event()
+    form = None
+    content_type = http_request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        try:
+            form = await http_request.form(max_files=Config.BULK_MAX_ITEMS)
+        except Exception as e:
             raise HTTPException(
-                status_code=500,
-                detail=f"Failed to generate log summary: {summary}"
+                status_code=400,
+                detail=f"Invalid multipart body: {str(e)}"
             )
-        
-        # Step 2: Search for matching MITRE ATT&CK techniques
-        logger.info("Searching for matching ATT&CK techniques")
-        techniques_data = await chromadb_service.search_techniques(
-            query=summary,
-            n_results=request.max_results
+        items = _iter_uploaded_files(form, defaults)
+    else:
+        items = iter_ndjson_items(
+            http_request.stream(), defaults, Config.BULK_MAX_ITEMS, Config.BULK_MAX_ITEM_BYTES
         )
+    
+    async def analyze(request: LogAnalysisRequest) -> LogAnalysisResponse:
+        return await _analyze_and_wait(request, user_id, dict(timings), retry_when_full=True)
+    
+    async def stream():
+        try:
+            async for record in run_bulk_analysis(until_exhausted(items, body_read), analyze,
+                                                  Config.BULK_ANALYSIS_CONCURRENCY):
+                if record["type"] == "summary":
+                    logger.info(f"Bulk analysis for user {user_id}: {record['completed']}/{record['items']} completed "
+                                f"in {record['elapsed_ms']:.0f}ms ({record['items_per_second']} items/s)")
+                yield json.dumps(record) + "\n"
+        except ClientDisconnect:
+            logger.info(f"Bulk analysis for user {user_id}: client disconnected while sending items")
+        finally:
+            if form is not None:
+                await form.close()
+    
+    return BulkStreamingResponse(stream(), body_read, media_type="application/x-ndjson")
+
+@router.post("/analyze/upload", response_model=LogAnalysisResponse)
+async def analyze_log_upload(
+    http_request: Request,
+    enhance_with_ai: bool = Query(True, description="Whether to enhance analysis with AI"),
+    max_results: int = Query(5, ge=1, le=20, description="Maximum number of ATT&CK techniques to return"),
+    current_user: dict = Depends(get_current_user)
+) -> LogAnalysisResponse:
+    """
+    Analyze a log file of any size sent as the raw request body.
+    
+    The body may be compressed (``Content-Encoding: gzip`` or ``zstd``). It is
+    decompressed and mined into templates as it streams in, with bounded
+    memory, and the compacted result goes through the (chunked) analysis
+    pipeline. Upload and parse statistics are returned in ``upload``.
+    
+    Args:
+        enhance_with_ai: Whether to enhance analysis with AI
+        max_results: Maximum number of ATT&CK techniques to return
+        current_user: Current authenticated user
         
-        # Convert to response models
-        matched_techniques = [
-            AttackTechnique(
-                technique_id=tech['technique_id'],
-                name=tech['name'],
-                description=tech['description'],
-                kill_chain_phases=tech['kill_chain_phases'],
-                platforms=tech['platforms'],
-                relevance_score=tech['relevance_score']
+    Returns:
+        LogAnalysisResponse with summary, matched techniques and upload stats
+    """
+    if not gemini_service or not chromadb_service:
+        raise HTTPException(
+            status_code=500,
+            detail="Services not properly initialized"
+        )
+    
+    user_id = current_user["username"]
+    timings = _request_timings(http_request)
+    timer = StageTimer(timings)
+    try:
+        ingestor = LogUploadIngestor(http_request.headers.get("content-encoding", "identity"))
+        with timer.stage("ingest"):
+            logs, upload_stats = await ingest_log_stream(http_request.stream(), ingestor)
+    except UploadError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e)
+        )
+    
+    if not logs.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Uploaded log file is empty"
+        )
+    logger.info(
+        f"Ingested upload for user {user_id}: {upload_stats['compressed_bytes']} -> "
+        f"{upload_stats['uncompressed_bytes']} bytes, {upload_stats['lines']} lines at "
+        f"{upload_stats['parse_mb_per_second']} MB/s"
+    )
+    
+    # The compacted text can exceed LogAnalysisRequest's max_length, so it is
+    # analyzed inline rather than through the job queue
+    request = LogAnalysisRequest.model_construct(logs=logs, enhance_with_ai=enhance_with_ai, max_results=max_results)
+    try:
+        response = await _find_duplicate_analysis(user_id, request, timings)
+        if response is None:
+            response = await run_log_analysis(
+                gemini_service,
+                chromadb_service,
+                logs=logs,
+                enhance_with_ai=enhance_with_ai,
+                max_results=max_results,
+                timings=timings,
+                iocs=ingestor.iocs()
             )
-            for tech in techniques_data
-        ]
-        
-        # Step 3: Enhanced analysis (if requested)
-        enhanced_analysis = None
-        if request.enhance_with_ai and matched_techniques:
-            logger.info("Generating enhanced threat analysis")
-            enhanced_analysis = await gemini_service.enhance_threat_analysis(
-                summary, techniques_data
+            response.upload = upload_stats
+            response.analysis_id = await analysis_storage_service.queue_analysis_result(
+                user_id=user_id,
+                request=request,
+                response=response
             )
+            stage_timing_stats.record(response.timings)
+        else:
+            response.upload = upload_stats
+    except Exception as e:
+        logger.error(f"Error analyzing uploaded logs: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+    
+    return response
+
+@router.post("/analyze/jobs", response_model=AnalysisJobStatus, status_code=202)
+async def submit_analysis_job(request: LogAnalysisRequest, http_request: Request, current_user: dict = Depends(get_current_user)) -> AnalysisJobStatus:
+    """
+    Submit logs for asynchronous analysis.
+    
+    Returns a job ID immediately. Returns 429 with a Retry-After header when
+    the analysis queue is full.
+    
+    Args:
+        request: LogAnalysisRequest containing logs and analysis parameters
         
-        processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-        
-        logger.info(f"Analysis completed in {processing_time:.2f}ms with {len(matched_techniques)} matches")
-        
-        response = LogAnalysisResponse(
-            summary=summary,
-            matched_techniques=matched_techniques,
-            enhanced_analysis=enhanced_analysis,
-            processing_time_ms=processing_time
+    Returns:
+        AnalysisJobStatus for the queued job
+    """
+    try:
+        return await _submit_analysis_job(request, current_user["username"], _request_timings(http_request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to submit analysis job: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to submit analysis job: {str(e)}"
         )
+
+@router.get("/analyze/jobs/{job_id}", response_model=AnalysisJobStatus)
+async def get_analysis_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to long-poll for completion"),
+    current_user: dict = Depends(get_current_user)
+) -> AnalysisJobStatus:
+    """
+    Get the status of an analysis job, including its result once completed.
+    
+    Args:
+        job_id: The job ID returned on submission
+        wait: Seconds to wait for the job to finish before returning (long-polling)
+        current_user: Current authenticated user
         
-        # Store the analysis result in encrypted format
-        try:
-            analysis_id = await analysis_storage_service.store_analysis_result(
-                user_id=current_user["username"],
-                request=request,
-                response=response
+    Returns:
+        AnalysisJobStatus
+    """
+    try:
+        job = await analysis_job_queue.get_job(current_user["username"], job_id, wait_seconds=wait)
+        if not job:
+            raise HTTPException(
+                status_code=404,
+                detail="Analysis job not found"
             )
-            logger.info(f"Stored analysis result with ID {analysis_id} for user {current_user['username']}")
-        except Exception as e:
-            logger.error(f"Failed to store analysis result: {str(e)}")
-            # Continue without failing the request - storage is not critical for the response
-        
-        return response
+        return job
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in log analysis: {str(e)}")
+        logger.error(f"Error getting analysis job {job_id}: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Internal server error: {str(e)}"
+            detail=f"Failed to get analysis job: {str(e)}"
         )
 
 @router.post("/search-techniques")
@@ -185,16 +491,23 @@ async def get_database_stats() -> Dict[str, Any]:
 
 @router.get("/history", response_model=List[AnalysisHistoryItem])
 async def get_analysis_history(
+    response: Response,
     limit: int = 10, 
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ) -> List[AnalysisHistoryItem]:
     """
     Get user's analysis history.
     
+    Pages are keyed on (analysis_timestamp, id): pass the X-Next-Cursor
+    header of a response as ``cursor`` to get the page after it. The header
+    is absent on the last page. ``offset`` still works without a cursor.
+    
     Args:
         limit: Maximum number of results to return (default: 10, max: 50)
         offset: Number of results to skip for pagination (default: 0)
+        cursor: Continuation token from the previous page
         current_user: Current authenticated user
         
     Returns:
@@ -209,15 +522,20 @@ async def get_analysis_history(
         if offset < 0:
             offset = 0
             
-        history = await analysis_storage_service.get_user_analysis_history(
+        history, next_cursor = await analysis_storage_service.get_user_analysis_history_page(
             user_id=current_user["username"],
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         logger.info(f"Retrieved {len(history)} history items for user {current_user['username']}")
         return history
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting analysis history: {str(e)}")
         raise HTTPException(
@@ -225,6 +543,58 @@ async def get_analysis_history(
             detail=f"Failed to get analysis history: {str(e)}"
         )
 
+@router.post("/history/batch")
+async def get_analysis_results_batch(
+    batch: AnalysisBatchRequest,
+    current_user: dict = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Get several complete analysis results, e.g. for export or comparison.
+    
+    The analyses are fetched with one query and decrypted in parallel. The
+    response is NDJSON: one ``{"type": "result", "index", "analysis_id",
+    "status", "result"}`` line per requested ID in request order, with
+    status ``not_found`` (and no result) for IDs that don't exist for this
+    user, then a ``{"type": "summary"}`` line.
+    
+    Args:
+        batch: Analysis IDs to retrieve (at most Config.ANALYSIS_BATCH_MAX_IDS)
+        current_user: Current authenticated user
+        
+    Returns:
+        StreamingResponse of NDJSON result lines
+    """
+    if len(batch.analysis_ids) > Config.ANALYSIS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {Config.ANALYSIS_BATCH_MAX_IDS} analyses can be retrieved at once"
+        )
+    user_id = current_user["username"]
+    
+    async def stream():
+        started = time.perf_counter()
+        found = 0
+        try:
+            index = 0
+            async for analysis_id, result in analysis_storage_service.iter_analysis_results(user_id, batch.analysis_ids):
+                record = {"type": "result", "index": index, "analysis_id": analysis_id,
+                          "status": "ok" if result else "not_found"}
+                index += 1
+                if result:
+                    found += 1
+                    record["result"] = result
+                yield json.dumps(record, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Error retrieving analysis batch for user {user_id}: {str(e)}")
+            yield json.dumps({"type": "error", "error": f"Failed to get analysis results: {str(e)}"}) + "\n"
+            return
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(f"Retrieved {found}/{len(batch.analysis_ids)} analyses for user {user_id} in {elapsed_ms:.0f}ms")
+        yield json.dumps({"type": "summary", "requested": len(batch.analysis_ids), "found": found,
+                          "elapsed_ms": elapsed_ms}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.get("/history/{analysis_id}", response_model=LogAnalysisResponse)
 async def get_analysis_result(
     analysis_id: str,
@@ -305,12 +675,14 @@ async def delete_analysis_result(
 
 @router.get("/analytics", response_model=UserAnalyticsStats)
 async def get_user_analytics(
+    days: int = Query(30, ge=1, le=366),
     current_user: dict = Depends(get_current_user)
 ) -> UserAnalyticsStats:
     """
     Get user analytics and statistics.
     
     Args:
+        days: Days of activity in the timeline (default: 30)
         current_user: Current authenticated user
         
     Returns:
@@ -318,7 +690,8 @@ async def get_user_analytics(
     """
     try:
         analytics = await analysis_storage_service.get_user_analytics(
-            user_id=current_user["username"]
+            user_id=current_user["username"],
+            days=days
         )
         
         logger.info(f"Retrieved analytics for user {current_user['username']}")
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer,OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from core import  security
@@ -11,7 +12,8 @@ router = APIRouter(tags=["Authentication"])
 # Updated tokenUrl to match the OAuth2 token endpoint for Swagger UI
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    started = time.perf_counter()
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -28,6 +30,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     user = await database.user_collection.find_one({"username": token_data.username})
     if user is None:
         raise credentials_exception
+    # Exposed to handlers that report per-stage timings
+    request.state.auth_lookup_ms = round((time.perf_counter() - started) * 1000, 3)
     return user
 
 @router.post("/register", response_model=UserBase)
@@ -2,21 +2,20 @@
 API endpoints for monitoring and analysis storage.
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from routers.auth import get_current_user
-from services.analysis_storage_service import AnalysisStorageService
+from services.analysis_storage_service import analysis_storage_service as storage_service
+from services.analysis_session_state import analysis_session_store
+from services.keyset_pagination import NEXT_CURSOR_HEADER
 from model.analysis_storage import StoredAnalysis, MonitoringSession, AnalysisStats
 from core import logger
 
 router = APIRouter(prefix="/api/v1", tags=["Monitoring & Storage"])
 
-# Initialize storage service
-storage_service = AnalysisStorageService()
-
 # Request/Response models
 class CreateSessionRequest(BaseModel):
     """Request model for creating monitoring session."""
@@ -82,6 +81,8 @@ async def stop_monitoring_session(
         success = await storage_service.stop_monitoring_session(session_id)
         
         if success:
+            # The rolling analysis state of a stopped session is no longer needed
+            await analysis_session_store.delete(current_user.get('username'), session_id)
             logger.info(f"Stopped monitoring session {session_id}")
             return SessionResponse(
                 session_id=session_id,
@@ -99,22 +100,31 @@ async def stop_monitoring_session(
 
 @router.get("/monitoring/sessions", response_model=List[Dict[str, Any]])
 async def get_monitoring_sessions(
+    response: Response,
     active_only: bool = True,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get monitoring sessions for the current user."""
+    """
+    Get monitoring sessions for the current user, newest first.
+    
+    Pass the X-Next-Cursor response header as ``cursor`` for the next page.
+    """
     try:
         username = current_user.get('username')
         
-        if active_only:
-            sessions = await storage_service.get_active_sessions(username)
-        else:
-            # For now, only return active sessions
-            # Can be extended to include historical sessions
-            sessions = await storage_service.get_active_sessions(username)
+        sessions, next_cursor = await storage_service.get_sessions_page(
+            username, active_only=active_only, limit=min(max(limit, 1), 200), offset=max(offset, 0), cursor=cursor
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return sessions
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to retrieve monitoring sessions: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve monitoring sessions")
@@ -203,6 +213,20 @@ async def store_analysis_result(
         logger.error(f"Failed to store analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/analysis/stats", response_model=AnalysisStats)
+async def get_analysis_statistics(
+    days: int = 30,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get analysis statistics for the system, including per-stage timing percentiles."""
+    try:
+        stats = await storage_service.get_analysis_stats(days)
+        return stats
+        
+    except Exception as e:
+        logger.error(f"Failed to retrieve analysis statistics: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve statistics")
+
 @router.get("/analysis/{analysis_id}", response_model=Dict[str, Any])
 async def get_analysis_result(
     analysis_id: str,
@@ -227,51 +251,64 @@ async def get_analysis_result(
 
 @router.get("/analysis/user/history", response_model=List[Dict[str, Any]])
 async def get_user_analysis_history(
+    response: Response,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get analysis history for the current user."""
+    """
+    Get analysis history for the current user.
+    
+    Pass the X-Next-Cursor response header as ``cursor`` for the next page.
+    """
     try:
         user_id = current_user.get('username')
-        analyses = await storage_service.get_user_analysis_history(user_id, limit, offset)
+        analyses, next_cursor = await storage_service.get_user_analysis_history_page(
+            user_id, min(max(limit, 1), 200), offset=max(offset, 0), cursor=cursor
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return analyses
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to retrieve user analysis history: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve analysis history")
 
-@router.get("/analysis/stats", response_model=AnalysisStats)
-async def get_analysis_statistics(
-    days: int = 30,
-    current_user: dict = Depends(get_current_user)
-):
-    """Get analysis statistics for the system."""
-    try:
-        stats = await storage_service.get_analysis_stats(days)
-        return stats
-        
-    except Exception as e:
-        logger.error(f"Failed to retrieve analysis statistics: {e}")
-        raise HTTPException(status_code=500, detail="Failed to retrieve statistics")
-
 @router.delete("/analysis/cleanup")
 async def cleanup_old_analyses(
-    days: int = 90,
+    days: int = Query(90, ge=1),
     current_user: dict = Depends(get_current_user)
 ):
-    """Clean up old analysis records (admin only)."""
+    """
+    Start deleting the current user's analysis records older than ``days``.
+    
+    The deletion runs in the background in bounded batches; poll
+    GET /analysis/cleanup/status for its progress. A cleanup of the user's
+    records already running is reported instead of starting another.
+    """
     try:
-        # Note: In a real implementation, you'd check for admin privileges
-        deleted_count = await storage_service.cleanup_old_analyses(days)
+        progress = storage_service.start_cleanup(current_user.get('username'), days)
         
         return {
-            "status": "success",
-            "message": f"Cleaned up {deleted_count} old analysis records",
-            "deleted_count": deleted_count
+            "status": "running" if progress.get("running") else "finished",
+            "message": f"Cleaning up analysis records older than {progress.get('days')} days",
+            **progress
         }
         
     except Exception as e:
         logger.error(f"Failed to cleanup old analyses: {e}")
         raise HTTPException(status_code=500, detail="Failed to cleanup old analyses")
+
+@router.get("/analysis/cleanup/status")
+async def get_cleanup_progress(
+    current_user: dict = Depends(get_current_user)
+):
+    """Progress of the current user's current or last analysis cleanup."""
+    progress = storage_service.cleanup_progress.get(current_user.get('username'))
+    if progress is None:
+        return {"status": "idle"}
+    return {"status": "running" if progress.get("running") else "finished", **progress}
@@ -0,0 +1,87 @@
+"""
+Bedrock knowledge base client for the single-call orchestrator pipeline.
+
+``get_bedrock_analysis`` sends a log message to a Bedrock knowledge base of
+ATT&CK technique documents with ``retrieve_and_generate`` and returns the
+generated summary together with the documents it cited.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import boto3
+
+from core import Config, logger
+
+ANALYSIS_PROMPT = (
+    "You are a security analyst. Summarize the following log entry in two or three sentences, "
+    "explain why it may be malicious and name the MITRE ATT&CK technique it most likely maps to.\n\n"
+    "Log entry:\n{log_message}"
+)
+
+try:
+    bedrock_agent_runtime = boto3.client(
+        "bedrock-agent-runtime",
+        region_name=Config.AWS_REGION,
+        aws_access_key_id=Config.AWS_ACCESS_KEY_ID or None,
+        aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY or None,
+        aws_session_token=Config.AWS_SESSION_TOKEN or None
+    )
+except Exception as e:
+    logger.error(f"Error creating Bedrock agent runtime client: {str(e)}")
+    bedrock_agent_runtime = None
+
+
+def _cited_sources(response: Dict[str, Any]) -> List[str]:
+    """Distinct file names of the knowledge base documents cited, in citation order."""
+    sources: List[str] = []
+    for citation in response.get("citations", []):
+        for reference in citation.get("retrievedReferences", []):
+            location = reference.get("location", {})
+            uri = location.get("s3Location", {}).get("uri") or location.get("webLocation", {}).get("url")
+            if uri:
+                name = uri.rstrip("/").rsplit("/", 1)[-1]
+                if name not in sources:
+                    sources.append(name)
+    return sources
+
+
+def get_bedrock_analysis(log_message: str, knowledge_base_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Summarize a log message and map it to ATT&CK documents in one Bedrock call.
+
+    Args:
+        log_message (str): Log entry to analyze
+        knowledge_base_id (str): Bedrock knowledge base holding one document per
+            technique (e.g. ``T1059_001.txt``)
+
+    Returns:
+        Optional[Dict[str, Any]]: ``ai_summary`` and ``mapped_sources`` (cited
+        document names, most relevant first), or None if the call failed
+    """
+    if not bedrock_agent_runtime:
+        logger.error("Bedrock agent runtime client not initialized. Check AWS credentials.")
+        return None
+    if not knowledge_base_id:
+        logger.error("KNOWLEDGE_BASE_ID is not configured")
+        return None
+
+    model_arn = f"arn:aws:bedrock:{Config.AWS_REGION}::foundation-model/{Config.BEDROCK_KB_MODEL_ID}"
+    try:
+        response = bedrock_agent_runtime.retrieve_and_generate(
+            input={"text": ANALYSIS_PROMPT.format(log_message=log_message)},
+            retrieveAndGenerateConfiguration={
+                "type": "KNOWLEDGE_BASE",
+                "knowledgeBaseConfiguration": {
+                    "knowledgeBaseId": knowledge_base_id,
+                    "modelArn": model_arn
+                }
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error getting Bedrock knowledge base analysis: {str(e)}")
+        return None
+
+    return {
+        "ai_summary": response.get("output", {}).get("text", ""),
+        "mapped_sources": _cited_sources(response)
+    }
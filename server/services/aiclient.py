@@ -6,7 +6,8 @@ import os
 try:
   bedrock_runtime = boto3.client(
     service_name = "bedrock-runtime",
-    region_name = os.getenv("AWS_REGION")
+    region_name = os.getenv("AWS_REGION"),
+    endpoint_url = os.getenv("LLM_STANDIN_URL") or None
   )
 
 except Exception as e:
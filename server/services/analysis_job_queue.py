@@ -0,0 +1,393 @@
+"""
+Asynchronous log analysis job queue.
+
+Submitting a job returns immediately with a job ID; a bounded pool of workers
+runs the analysis pipeline and results are fetched by polling or long-polling.
+Jobs are persisted (encrypted) in MongoDB so queued or interrupted work
+survives a worker restart: a periodic recovery pass enqueues persisted jobs
+this process doesn't hold, as capacity allows, including running jobs whose
+process stopped sending heartbeats. Queued jobs wait in priority lanes served by
+weighted fair queuing (see services.priority_lanes).
+"""
+
+import asyncio
+import math
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from pymongo import ReturnDocument
+
+from core import Config, logger
+from db import database
+from model.logs_model import AnalysisJobStatus, LogAnalysisRequest, LogAnalysisResponse
+from services.analysis_session_state import analysis_session_store
+from services.encryption_service import encryption_service
+from services.priority_lanes import LaneScheduler, classify_lane
+
+JobRunner = Callable[[str, LogAnalysisRequest, Dict[str, float]], Awaitable[LogAnalysisResponse]]
+
+
+class QueueFullError(Exception):
+    """Raised when the analysis queue cannot admit another job."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Analysis queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AnalysisJobQueue:
+    """Bounded in-process job queue backed by the analysis_jobs collection."""
+
+    TERMINAL_STATUSES = ("completed", "failed")
+    # Share of the capacity only urgent jobs may use, so a backlog can't lock them out
+    URGENT_RESERVED_SHARE = 0.1
+    RESULT_CACHE_SIZE = 256
+    POLL_INTERVAL_SECONDS = 1.0
+    # Running jobs are heartbeated and unfinished jobs recovered at this interval;
+    # a running job without a heartbeat for HEARTBEAT_TIMEOUT_SECONDS was orphaned
+    MAINTENANCE_INTERVAL_SECONDS = 10.0
+    HEARTBEAT_TIMEOUT_SECONDS = 60.0
+
+    def __init__(self, max_queue_size: Optional[int] = None, workers: Optional[int] = None):
+        self.collection = database.get_collection("analysis_jobs")
+        self.max_queue_size = max_queue_size or Config.ANALYSIS_QUEUE_SIZE
+        self.worker_count = workers or Config.ANALYSIS_WORKERS
+        self._queue: Optional[LaneScheduler] = None
+        self._reserved = 0
+        self._workers = []
+        self._maintenance: Optional[asyncio.Task] = None
+        self._running_jobs: Set[str] = set()
+        self._runner: Optional[JobRunner] = None
+        self._events: Dict[str, asyncio.Event] = {}
+        self._results: "OrderedDict[str, LogAnalysisResponse]" = OrderedDict()
+        self._avg_job_seconds = 10.0
+        self._running = 0
+        self._metrics = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "recovered": 0
+        }
+
+    async def start(self, runner: JobRunner) -> None:
+        """Start the worker pool and re-enqueue jobs left over from a previous run."""
+        self._runner = runner
+        self._queue = LaneScheduler()
+        await self._recover_jobs()
+        self._workers = [
+            asyncio.create_task(self._worker(index))
+            for index in range(self.worker_count)
+        ]
+        self._maintenance = asyncio.create_task(self._maintain())
+        logger.info(f"Analysis job queue started with {self.worker_count} workers (capacity {self.max_queue_size})")
+
+    async def stop(self) -> None:
+        """Stop the workers; interrupted jobs are returned to the queued state."""
+        tasks = self._workers + ([self._maintenance] if self._maintenance else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._maintenance = None
+        logger.info("Analysis job queue stopped")
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.MAINTENANCE_INTERVAL_SECONDS)
+            await self._heartbeat()
+            await self._recover_jobs()
+
+    async def _heartbeat(self) -> None:
+        """Mark the jobs this process is running as alive."""
+        if not self._running_jobs:
+            return
+        try:
+            await self.collection.update_many(
+                {"job_id": {"$in": list(self._running_jobs)}, "status": "running"},
+                {"$set": {"heartbeat_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            logger.error(f"Failed to record analysis job heartbeats: {e}")
+
+    async def _recover_jobs(self) -> int:
+        """
+        Enqueue unfinished jobs this process doesn't hold, oldest first, up to
+        the free capacity; the rest are picked up by later passes.
+
+        Returns:
+            int: Number of jobs enqueued
+        """
+        free = self.max_queue_size - self._queue.qsize() - self._reserved
+        if free <= 0:
+            return 0
+        recovered = 0
+        try:
+            now = datetime.utcnow()
+            query: Dict[str, Any] = {"$or": [
+                {"status": "queued"},
+                {"status": "running", "heartbeat_at": {"$lt": now - timedelta(seconds=self.HEARTBEAT_TIMEOUT_SECONDS)}},
+                # Claimed before heartbeats were recorded
+                {"status": "running", "heartbeat_at": None,
+                 "started_at": {"$lt": now - timedelta(seconds=Config.ANALYSIS_JOB_TIMEOUT_SECONDS)}}
+            ]}
+            if self._events:
+                # Queued or running here already
+                query["job_id"] = {"$nin": list(self._events)}
+            cursor = self.collection.find(
+                query, {"job_id": 1, "status": 1, "lane": 1, "heartbeat_at": 1}
+            ).sort("created_at", 1).limit(free)
+
+            async for doc in cursor:
+                if doc["status"] == "running":
+                    result = await self.collection.update_one(
+                        {"job_id": doc["job_id"], "status": "running", "heartbeat_at": doc.get("heartbeat_at")},
+                        {"$set": {"status": "queued", "started_at": None, "heartbeat_at": None}}
+                    )
+                    if not result.modified_count:
+                        # Its process is alive after all, or another one took it back
+                        continue
+                self._events[doc["job_id"]] = asyncio.Event()
+                self._queue.put_nowait(doc["job_id"], doc.get("lane") or "interactive")
+                recovered += 1
+        except Exception as e:
+            logger.error(f"Failed to recover analysis jobs: {e}")
+
+        if recovered:
+            self._metrics["recovered"] += recovered
+            logger.info(f"Recovered {recovered} unfinished analysis jobs")
+        return recovered
+
+    def estimate_retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        backlog = (self._queue.qsize() if self._queue else 0) + self._running
+        return max(1, math.ceil(backlog / max(1, self.worker_count) * self._avg_job_seconds))
+
+    async def submit(self, user_id: str, request: LogAnalysisRequest,
+                     timings: Optional[Dict[str, float]] = None) -> AnalysisJobStatus:
+        """
+        Persist and enqueue an analysis job.
+
+        Args:
+            user_id: Owner of the job
+            request: Analysis request
+            timings: Stage timings already spent on the request (e.g. auth_lookup)
+
+        Raises:
+            QueueFullError: If the queue is at capacity (for non-urgent jobs,
+                capacity minus the urgent reserve)
+        """
+        if self._queue is None:
+            raise RuntimeError("Analysis job queue not started")
+
+        session_severity = None
+        if request.session_id:
+            session_severity = analysis_session_store.cached_severity(user_id, request.session_id)
+        lane = classify_lane(request, session_severity)
+        capacity = self.max_queue_size
+        if lane != "urgent":
+            capacity -= math.ceil(self.max_queue_size * self.URGENT_RESERVED_SHARE)
+
+        # Reserve the slot before awaiting so concurrent submits can't overfill the queue
+        if self._queue.qsize() + self._reserved >= capacity:
+            self._metrics["rejected"] += 1
+            raise QueueFullError(self.estimate_retry_after())
+        self._reserved += 1
+
+        try:
+            job_id = str(uuid.uuid4())
+            encrypted_request, key_id = await asyncio.to_thread(
+                encryption_service.encrypt_data, request.model_dump(), user_id
+            )
+            document = {
+                "job_id": job_id,
+                "user_id": user_id,
+                "status": "queued",
+                "lane": lane,
+                "encrypted_request": encrypted_request,
+                "encryption_key_id": key_id,
+                "attempts": 0,
+                "timings": dict(timings or {}),
+                "created_at": datetime.utcnow(),
+                "started_at": None,
+                "completed_at": None,
+                "error": None
+            }
+            # Registered first so a concurrent recovery pass doesn't enqueue it too
+            self._events[job_id] = asyncio.Event()
+            try:
+                await self.collection.insert_one(document)
+            except Exception:
+                self._events.pop(job_id, None)
+                raise
+            self._queue.put_nowait(job_id, lane)
+        finally:
+            self._reserved -= 1
+
+        self._metrics["submitted"] += 1
+        logger.info(f"Queued analysis job {job_id} for user {user_id} in the {lane} lane")
+        return self._to_status(document, None)
+
+    async def get_job(self, user_id: str, job_id: str, wait_seconds: float = 0) -> Optional[AnalysisJobStatus]:
+        """
+        Fetch a job's status, optionally long-polling until it finishes.
+
+        Args:
+            user_id: Owner of the job
+            job_id: Job identifier
+            wait_seconds: Maximum time to wait for a terminal status
+
+        Returns:
+            AnalysisJobStatus, or None if the job doesn't exist for this user
+        """
+        deadline = time.monotonic() + max(0.0, wait_seconds)
+        while True:
+            doc = await self.collection.find_one(
+                {"job_id": job_id, "user_id": user_id},
+                {"encrypted_request": 0}
+            )
+            if not doc:
+                return None
+
+            remaining = deadline - time.monotonic()
+            if doc["status"] in self.TERMINAL_STATUSES or remaining <= 0:
+                break
+
+            event = self._events.get(job_id)
+            if event is not None:
+                # Processed by this process's workers: wake exactly when it finishes
+                try:
+                    async with asyncio.timeout(remaining):
+                        await event.wait()
+                except TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(remaining, self.POLL_INTERVAL_SECONDS))
+
+        result = None
+        if doc["status"] == "completed":
+            result = self._results.get(job_id)
+            if result is None and doc.get("encrypted_result"):
+                result_data = await asyncio.to_thread(
+                    encryption_service.decrypt_data, doc["encrypted_result"], user_id, doc.get("encryption_key_id")
+                )
+                result = LogAnalysisResponse(**result_data) if result_data else None
+        return self._to_status(doc, result)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id, _, _ = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Analysis worker {index} failed on job {job_id}: {e}")
+
+    async def _process(self, job_id: str) -> None:
+        now = datetime.utcnow()
+        doc = await self.collection.find_one_and_update(
+            {"job_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "started_at": now, "heartbeat_at": now}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            # Already claimed or removed
+            self._finish_event(job_id)
+            return
+
+        user_id = doc["user_id"]
+        started = time.monotonic()
+        self._running += 1
+        self._running_jobs.add(job_id)
+        try:
+            request_data = await asyncio.to_thread(
+                encryption_service.decrypt_data, doc["encrypted_request"], user_id, doc["encryption_key_id"]
+            )
+            if not request_data:
+                raise ValueError("Unable to decrypt job request")
+
+            timings = dict(doc.get("timings") or {})
+            timings["queue_wait"] = round((doc["started_at"] - doc["created_at"]).total_seconds() * 1000, 3)
+
+            async with asyncio.timeout(Config.ANALYSIS_JOB_TIMEOUT_SECONDS):
+                response = await self._runner(user_id, LogAnalysisRequest(**request_data), timings)
+
+            encrypted_result, _ = await asyncio.to_thread(
+                encryption_service.encrypt_data, response.model_dump(mode="json"), user_id
+            )
+            self._remember_result(job_id, response)
+            await self.collection.update_one(
+                {"job_id": job_id},
+                {"$set": {
+                    "status": "completed",
+                    "encrypted_result": encrypted_result,
+                    "completed_at": datetime.utcnow()
+                }}
+            )
+            self._metrics["completed"] += 1
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so it is picked up after restart
+            await self.collection.update_one(
+                {"job_id": job_id, "status": "running"},
+                {"$set": {"status": "queued", "started_at": None, "heartbeat_at": None}}
+            )
+            raise
+        except Exception as e:
+            error = "Analysis timed out" if isinstance(e, TimeoutError) else str(e)
+            logger.error(f"Analysis job {job_id} failed: {error}")
+            await self.collection.update_one(
+                {"job_id": job_id},
+                {"$set": {"status": "failed", "error": error, "completed_at": datetime.utcnow()}}
+            )
+            self._metrics["failed"] += 1
+        finally:
+            self._running -= 1
+            self._running_jobs.discard(job_id)
+            elapsed = time.monotonic() - started
+            self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+            self._finish_event(job_id)
+
+    def _finish_event(self, job_id: str) -> None:
+        event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def _remember_result(self, job_id: str, response: LogAnalysisResponse) -> None:
+        # Small in-memory cache so the synchronous wrapper avoids a decrypt round trip
+        self._results[job_id] = response
+        while len(self._results) > self.RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+
+    @staticmethod
+    def _to_status(doc: Dict[str, Any], result: Optional[LogAnalysisResponse]) -> AnalysisJobStatus:
+        return AnalysisJobStatus(
+            job_id=doc["job_id"],
+            status=doc["status"],
+            created_at=doc["created_at"],
+            started_at=doc.get("started_at"),
+            completed_at=doc.get("completed_at"),
+            attempts=doc.get("attempts", 0),
+            lane=doc.get("lane"),
+            result=result,
+            error=doc.get("error")
+        )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, worker utilisation and job outcome counters."""
+        metrics = dict(self._metrics)
+        metrics.update({
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "capacity": self.max_queue_size,
+            "workers": self.worker_count,
+            "avg_job_seconds": round(self._avg_job_seconds, 3),
+            "lanes": self._queue.get_metrics() if self._queue else {}
+        })
+        return metrics
+
+
+analysis_job_queue = AnalysisJobQueue()
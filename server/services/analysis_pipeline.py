@@ -0,0 +1,211 @@
+"""
+Log analysis pipeline: Gemini summarization, ATT&CK technique search and
+optional AI enhancement.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from model.logs_model import AttackTechnique, LogAnalysisResponse
+from core import Config, logger
+from services.analysis_session_state import SessionState
+from services.ioc_extractor import extract_iocs
+from services.log_template_miner import compact_logs
+from services.security_prefilter import security_prefilter
+from services.stage_timings import StageTimer
+
+
+class AnalysisPipelineError(Exception):
+    """Raised when the analysis pipeline cannot produce a result."""
+
+
+async def run_log_analysis(gemini_service, chromadb_service, logs: str,
+                           enhance_with_ai: bool = True, max_results: int = 5,
+                           timings: Optional[Dict[str, float]] = None,
+                           iocs: Optional[Dict[str, List[str]]] = None,
+                           session: Optional[SessionState] = None) -> LogAnalysisResponse:
+    """
+    Analyze system logs using AI summarization and MITRE ATT&CK technique matching.
+
+    0. Extracts indicators of compromise from the full logs (when
+       Config.IOC_EXTRACTION_ENABLED is set) and runs the local keyword
+       prefilter; windows without security signal get a cheap "no findings"
+       result when Config.PREFILTER_NO_FINDINGS_ACTION is "skip", otherwise
+       only suspicious lines (with context) are analyzed. For a monitoring
+       session, lines of templates already analyzed in earlier windows are
+       dropped; a window with nothing new is answered from the session state
+    1. Uses Gemini AI to summarize the provided logs (collapsed into mined
+       templates first when Config.LOG_TEMPLATE_MINING_ENABLED is set)
+    2. Searches the ChromaDB vector database for matching MITRE ATT&CK techniques
+    3. Optionally enhances the analysis with additional AI insights
+
+    Args:
+        gemini_service: Initialized GeminiService
+        chromadb_service: Initialized ChromaDBService
+        logs (str): Raw system logs
+        enhance_with_ai (bool): Whether to run the enhancement step
+        max_results (int): Maximum number of ATT&CK techniques to return
+        timings (dict): Stage timings recorded so far (e.g. auth_lookup); the
+            pipeline's own stages are added and returned in the response
+        iocs (dict): Indicators already extracted by the caller (e.g. while
+            streaming an upload); extraction is skipped when given
+        session (SessionState): Rolling state of the monitoring session the
+            logs belong to; updated in place with this window
+
+    Returns:
+        LogAnalysisResponse: Summary, matched techniques and enhanced analysis
+    """
+    start_time = time.time()
+    timer = StageTimer(timings)
+
+    if not gemini_service or not chromadb_service:
+        raise AnalysisPipelineError("Services not properly initialized")
+
+    logger.info(f"Starting log analysis for {len(logs)} characters of logs")
+
+    # Step 0: Indicators from the unfiltered logs, then the cheap local prefilter
+    if iocs is None and Config.IOC_EXTRACTION_ENABLED:
+        with timer.stage("preprocess"):
+            iocs = await asyncio.to_thread(extract_iocs, logs)
+
+    prefilter = None
+    if Config.PREFILTER_ENABLED:
+        with timer.stage("preprocess"):
+            prefilter = await asyncio.to_thread(security_prefilter.scan, logs)
+        filtered_logs = prefilter.pop("filtered_logs")
+        if prefilter["verdict"] == "suspicious":
+            logger.info(
+                f"Prefilter kept {prefilter['kept_lines']}/{prefilter['total_lines']} lines "
+                f"from {prefilter['suspicious_windows']} suspicious windows"
+            )
+            logs = filtered_logs
+        elif Config.PREFILTER_NO_FINDINGS_ACTION == "skip":
+            processing_time = (time.time() - start_time) * 1000
+            logger.info(f"Prefilter found no security signal in {prefilter['total_lines']} lines, skipping AI analysis")
+            if session is not None:
+                session.record_window([], None, [])
+            return LogAnalysisResponse(
+                summary=(
+                    f"No security-relevant activity detected by the local prefilter in "
+                    f"{prefilter['total_lines']} log lines (highest window score {prefilter['score']}, "
+                    f"threshold {security_prefilter.min_score}). AI analysis was skipped."
+                ),
+                matched_techniques=[],
+                enhanced_analysis=None,
+                processing_time_ms=processing_time,
+                prefilter=prefilter,
+                iocs=iocs or None,
+                session=session.describe(False, {}) if session else None,
+                timings=timer.timings
+            )
+    
+    # Step 0b: Only the activity this monitoring session hasn't seen yet
+    session_context = None
+    if session is not None:
+        with timer.stage("preprocess"):
+            logs, continuing, template_keys, session_activity = await asyncio.to_thread(
+                session.split_new_activity, logs
+            )
+        if session.window and not logs.strip():
+            session.record_window(template_keys, None, [])
+            processing_time = (time.time() - start_time) * 1000
+            logger.info(
+                f"No new log templates in window {session.window} of session {session.session_id}, "
+                f"skipping AI analysis"
+            )
+            return LogAnalysisResponse(
+                summary=(
+                    f"No new activity in window {session.window} of this monitoring session: all "
+                    f"{session_activity['known_lines']} log lines match templates analyzed in earlier windows. "
+                    f"Assessment so far:\n{session.summary_digest}"
+                ),
+                matched_techniques=[
+                    AttackTechnique(**{field: technique[field] for field in AttackTechnique.model_fields})
+                    for technique in session.active_techniques()
+                ],
+                enhanced_analysis=None,
+                processing_time_ms=processing_time,
+                prefilter=prefilter,
+                iocs=iocs or None,
+                session=session.describe(False, session_activity),
+                timings=timer.timings
+            )
+        if session.window:
+            session_context = session.context(continuing)
+
+    # Step 1: Collapse repetitive lines into templates, then summarize with Gemini AI
+    log_compression = None
+    summary_input = logs
+    if Config.LOG_TEMPLATE_MINING_ENABLED:
+        with timer.stage("preprocess"):
+            summary_input, log_compression = await asyncio.to_thread(
+                compact_logs, logs, Config.LOG_TEMPLATE_DEPTH, Config.LOG_TEMPLATE_SIMILARITY
+            )
+        if log_compression["applied"]:
+            logger.info(
+                f"Template mining reduced {log_compression['input_lines']} lines to "
+                f"{log_compression['templates']} templates ({log_compression['compression_ratio']}x)"
+            )
+
+    logger.info("Generating log summary with Gemini AI")
+    with timer.stage("summarize"):
+        summary = await gemini_service.summarize_logs(summary_input, context=session_context)
+
+    if not summary:
+        logger.error("Failed to generate summary: empty response")
+        raise AnalysisPipelineError("Failed to generate log summary: empty response")
+
+    # Clean the summary - remove any error prefixes that might be mistaken for actual errors
+    if summary.startswith("Error generating summary:"):
+        logger.error(f"Failed to generate summary: {summary}")
+        raise AnalysisPipelineError(f"Failed to generate log summary: {summary}")
+
+    # Step 2: Search for matching MITRE ATT&CK techniques
+    logger.info("Searching for matching ATT&CK techniques")
+    with timer.stage("search"):
+        techniques_data = await chromadb_service.search_techniques(
+            query=summary,
+            n_results=max_results
+        )
+
+    # Convert to response models
+    matched_techniques = [
+        AttackTechnique(
+            technique_id=tech['technique_id'],
+            name=tech['name'],
+            description=tech['description'],
+            kill_chain_phases=tech['kill_chain_phases'],
+            platforms=tech['platforms'],
+            relevance_score=tech['relevance_score']
+        )
+        for tech in techniques_data
+    ]
+
+    # Step 3: Enhanced analysis (if requested)
+    enhanced_analysis = None
+    if enhance_with_ai and matched_techniques:
+        logger.info("Generating enhanced threat analysis")
+        with timer.stage("enhance"):
+            enhanced_analysis = await gemini_service.enhance_threat_analysis(
+                summary, techniques_data
+            )
+
+    if session is not None:
+        session.record_window(template_keys, summary, techniques_data)
+    
+    processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+
+    logger.info(f"Analysis completed in {processing_time:.2f}ms with {len(matched_techniques)} matches")
+
+    return LogAnalysisResponse(
+        summary=summary,
+        matched_techniques=matched_techniques,
+        enhanced_analysis=enhanced_analysis,
+        processing_time_ms=processing_time,
+        prefilter=prefilter,
+        log_compression=log_compression,
+        iocs=iocs or None,
+        session=session.describe(True, session_activity) if session else None,
+        timings=timer.timings
+    )
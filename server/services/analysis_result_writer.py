@@ -0,0 +1,277 @@
+"""
+Background, batched persistence of analysis results.
+
+Results are handed to the writer with their analysis ID already assigned, so
+the API can respond as soon as the analysis is computed. A single background
+task builds (encrypts) the documents off the event loop and writes them with
+``insert_many`` once a batch fills up or the flush interval elapses, then
+applies the analytics rollup deltas of the documents actually written. If
+MongoDB is unavailable, encrypted batches (with their deltas) are spilled to
+JSONL files on disk and replayed once writes succeed again.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+from core import Config, logger
+from db import database
+from services.analytics_rollups import ROLLUP_DELTA_FIELD, analytics_rollups
+from services.stage_timings import stage_timing_stats
+
+DocumentBuilder = Callable[[], Dict[str, Any]]
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class AnalysisResultWriter:
+    """Write-behind buffer for the analysis_results collection."""
+
+    SPILL_REPLAY_INTERVAL_SECONDS = 30.0
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval_ms: Optional[int] = None,
+                 max_pending: Optional[int] = None, spill_dir: Optional[str] = None):
+        self.collection = database.get_collection("analysis_results")
+        self.batch_size = max(1, batch_size or Config.RESULT_WRITER_BATCH_SIZE)
+        self.flush_interval = (flush_interval_ms or Config.RESULT_WRITER_FLUSH_MS) / 1000.0
+        self.max_pending = max(1, max_pending or Config.RESULT_WRITER_MAX_PENDING)
+        self.spill_dir = Path(spill_dir or Config.RESULT_WRITER_SPILL_DIR)
+        self._incoming: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Results not yet confirmed written, for read-your-writes lookups:
+        # builders still queued and documents already built
+        self._pending: Dict[str, DocumentBuilder] = {}
+        self._unflushed: Dict[str, Dict[str, Any]] = {}
+        self._last_replay = 0.0
+        self._metrics = {
+            "submitted": 0,
+            "written": 0,
+            "batches": 0,
+            "build_failures": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "backpressure_waits": 0
+        }
+
+    async def start(self) -> None:
+        """Start the background writer and replay anything spilled by a previous run."""
+        self._incoming = asyncio.Queue(maxsize=self.max_pending)
+        await self._replay_spill()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Analysis result writer started (batch {self.batch_size}, flush {self.flush_interval * 1000:.0f}ms)")
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Flush everything still queued, then stop."""
+        if self._task is None:
+            return
+        await self._incoming.put(None)
+        try:
+            async with asyncio.timeout(timeout):
+                await self._task
+        except TimeoutError:
+            logger.error(f"Analysis result writer did not drain within {timeout}s; "
+                         f"{self._incoming.qsize()} results not persisted")
+            self._task.cancel()
+        self._task = None
+        logger.info("Analysis result writer stopped")
+
+    async def submit(self, analysis_id: str, build: DocumentBuilder) -> None:
+        """
+        Queue a result for persistence.
+
+        Args:
+            analysis_id: Pre-assigned ObjectId string used as the document _id
+            build: Blocking callable that builds the encrypted document; it runs
+                in a worker thread
+        """
+        if self._incoming is None:
+            raise RuntimeError("Analysis result writer not started")
+        self._metrics["submitted"] += 1
+        if self._incoming.full():
+            # Bounded memory: callers wait rather than growing the queue
+            self._metrics["backpressure_waits"] += 1
+        await self._incoming.put((analysis_id, build))
+        self._pending[analysis_id] = build
+
+    async def get_unflushed(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Return a result that has not been written yet, building it early if needed."""
+        document = self._unflushed.get(analysis_id)
+        if document is None and analysis_id in self._pending:
+            document = await self._build(analysis_id, self._pending[analysis_id])
+        return document
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._incoming.get()
+            if item is None:
+                break
+
+            # Collect a batch: up to batch_size items or until the flush interval elapses
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    async with asyncio.timeout(remaining):
+                        item = await self._incoming.get()
+                except TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            documents = await self._build_documents(batch)
+            if documents:
+                await self._write(documents)
+
+            if not stopping and loop.time() - self._last_replay > self.SPILL_REPLAY_INTERVAL_SECONDS:
+                await self._replay_spill()
+
+    async def _build(self, analysis_id: str, builder: DocumentBuilder) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            document = await asyncio.to_thread(builder)
+        except Exception as e:
+            self._metrics["build_failures"] += 1
+            self._pending.pop(analysis_id, None)
+            logger.error(f"Failed to prepare analysis {analysis_id} for storage: {e}")
+            return None
+        # A concurrent read may have built it first; keep a single copy
+        if analysis_id in self._unflushed:
+            return self._unflushed[analysis_id]
+        document["_id"] = ObjectId(analysis_id)
+        self._unflushed[analysis_id] = document
+        self._pending.pop(analysis_id, None)
+        stage_timing_stats.record({"encrypt": round((time.perf_counter() - started) * 1000, 3)})
+        return document
+
+    async def _build_documents(self, batch: List[Tuple[str, DocumentBuilder]]) -> List[Dict[str, Any]]:
+        async def build(analysis_id: str, builder: DocumentBuilder) -> Optional[Dict[str, Any]]:
+            return self._unflushed.get(analysis_id) or await self._build(analysis_id, builder)
+
+        # Key derivation and encryption run concurrently in the thread pool
+        documents = await asyncio.gather(*(build(analysis_id, builder) for analysis_id, builder in batch))
+        return [document for document in documents if document is not None]
+
+    async def _insert(self, documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        insert_many with the rollup deltas split off the documents.
+
+        Returns:
+            Tuple of the rollup deltas of the documents inserted and the
+            documents that failed (deltas restored, for spilling). Duplicates
+            are neither: they are already stored and counted.
+
+        Raises:
+            Exception: Anything but a BulkWriteError from insert_many; the
+                documents keep their deltas
+        """
+        deltas = [document.pop(ROLLUP_DELTA_FIELD, None) for document in documents]
+        errors: Dict[int, int] = {}
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = {error["index"]: error.get("code") for error in e.details.get("writeErrors", [])}
+        except Exception:
+            self._restore_deltas(documents, deltas)
+            raise
+
+        failed = [index for index, code in errors.items() if code != DUPLICATE_KEY_ERROR]
+        self._restore_deltas([documents[index] for index in failed], [deltas[index] for index in failed])
+        inserted = [delta for index, delta in enumerate(deltas) if index not in errors and delta is not None]
+        return inserted, [documents[index] for index in failed]
+
+    @staticmethod
+    def _restore_deltas(documents: List[Dict[str, Any]], deltas: List[Optional[Dict[str, Any]]]) -> None:
+        for document, delta in zip(documents, deltas):
+            if delta is not None:
+                document[ROLLUP_DELTA_FIELD] = delta
+
+    async def _write(self, documents: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        failed: List[Dict[str, Any]] = []
+        try:
+            # Duplicates mean the document is already stored (e.g. a replayed spill)
+            deltas, failed = await self._insert(documents)
+            await analytics_rollups.record(deltas)
+        except Exception as e:
+            logger.error(f"Failed to write {len(documents)} analysis results: {e}")
+            failed = documents
+
+        if failed:
+            await self._spill(failed)
+
+        written = len(documents) - len(failed)
+        self._metrics["written"] += written
+        self._metrics["batches"] += 1
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+        stage_timing_stats.record({"store": elapsed_ms})
+        for document in documents:
+            self._unflushed.pop(str(document["_id"]), None)
+        logger.info(f"Persisted {written}/{len(documents)} analysis results in {elapsed_ms:.1f}ms")
+
+    async def _spill(self, documents: List[Dict[str, Any]]) -> None:
+        """Write encrypted documents to a JSONL spill file for later replay."""
+        path = self.spill_dir / f"analysis-{time.time_ns()}-{uuid.uuid4().hex[:8]}.jsonl"
+
+        def write() -> None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for document in documents:
+                    f.write(json_util.dumps(document) + "\n")
+            os.replace(tmp_path, path)
+
+        try:
+            await asyncio.to_thread(write)
+            self._metrics["spilled"] += len(documents)
+            logger.warning(f"Spilled {len(documents)} analysis results to {path}")
+        except Exception as e:
+            logger.error(f"Failed to spill {len(documents)} analysis results, data lost: {e}")
+
+    async def _replay_spill(self) -> None:
+        """Insert spilled documents; files are removed once fully written."""
+        self._last_replay = asyncio.get_running_loop().time()
+        if not self.spill_dir.is_dir():
+            return
+
+        for path in sorted(self.spill_dir.glob("analysis-*.jsonl")):
+            try:
+                lines = await asyncio.to_thread(path.read_text, encoding="utf-8")
+                documents = [json_util.loads(line) for line in lines.splitlines() if line.strip()]
+                deltas, failed = await self._insert(documents) if documents else ([], [])
+                await analytics_rollups.record(deltas)
+                if failed:
+                    logger.warning(f"Spill replay of {path.name} incomplete ({len(failed)} not written), will retry")
+                    return
+            except Exception as e:
+                logger.warning(f"Spill replay of {path.name} failed, will retry: {e}")
+                return
+
+            path.unlink(missing_ok=True)
+            self._metrics["replayed"] += len(documents)
+            logger.info(f"Replayed {len(documents)} spilled analysis results from {path.name}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Write, batch, spill and backlog counters."""
+        metrics = dict(self._metrics)
+        batches = metrics["batches"]
+        metrics["avg_batch_size"] = round(metrics["written"] / batches, 2) if batches else 0.0
+        metrics["queued"] = self._incoming.qsize() if self._incoming else 0
+        metrics["unflushed"] = len(self._pending) + len(self._unflushed)
+        metrics["spill_files"] = len(list(self.spill_dir.glob("analysis-*.jsonl"))) if self.spill_dir.is_dir() else 0
+        return metrics
+
+
+analysis_result_writer = AnalysisResultWriter()
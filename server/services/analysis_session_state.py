@@ -0,0 +1,334 @@
+"""
+Rolling per-session state for incremental monitoring analysis.
+
+A monitoring client sends a fresh window of logs every cycle. With a
+``session_id`` the server keeps a bounded state per (user, session): a digest
+of the running assessment, the ATT&CK techniques active in recent windows and
+fingerprints of the log templates already analyzed. Each window is mined into
+templates, lines of templates seen in earlier windows are left out, and only
+the new activity is summarized, with the running assessment as context. A
+window with no new templates is answered from the state without an AI call.
+
+States live in an LRU cache (``SESSION_STATE_MAX_SESSIONS``) and are written
+through to the analysis_session_state collection after every window, so they
+survive worker restarts. The digest and techniques are stored encrypted;
+templates only as keyed fingerprints. Sessions idle for
+``SESSION_STATE_TTL_SECONDS`` are evicted from memory and expire in MongoDB
+through a TTL index.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from core import Config, logger
+from db import database
+from services.encryption_service import encryption_service
+from services.log_template_miner import LogTemplateMiner
+from services.priority_lanes import technique_severity
+
+# Known templates listed (by count) as continuing activity in the summary context
+MAX_CONTINUING_TEMPLATES = 20
+# Technique description kept in the state, enough to answer a window without new activity
+TECHNIQUE_DESCRIPTION_CHARS = 300
+
+
+class SessionState:
+    """Running assessment of one monitoring session."""
+
+    __slots__ = ("user_id", "session_id", "window", "summary_digest", "techniques", "templates",
+                 "updated_at")
+
+    def __init__(self, user_id: str, session_id: str):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.window = 0
+        self.summary_digest = ""
+        # technique_id -> technique fields plus hits / first_window / last_window
+        self.techniques: Dict[str, Dict[str, Any]] = {}
+        # template fingerprint -> last window it was seen in, least recently seen first
+        self.templates: Dict[str, int] = {}
+        self.updated_at = time.monotonic()
+
+    def _fingerprint(self, template: str) -> str:
+        return encryption_service.fingerprint_logs(template, self.user_id)[:24]
+
+    def split_new_activity(self, logs: str) -> Tuple[str, str, List[str], Dict[str, Any]]:
+        """
+        Separate lines of templates not seen in earlier windows from known ones.
+
+        Args:
+            logs (str): Log window
+
+        Returns:
+            Tuple[str, str, List[str], Dict[str, Any]]: The new lines, a
+            compact listing of known templates that occurred again
+            (``[xCOUNT] template``), fingerprints of all the window's templates
+            and counts of new/known lines and templates. Nothing is recorded in
+            the state until ``record_window``.
+        """
+        miner = LogTemplateMiner(depth=Config.LOG_TEMPLATE_DEPTH, similarity=Config.LOG_TEMPLATE_SIMILARITY)
+        assignments = [(line, miner.add_line(line)) for line in logs.splitlines()]
+        # Templates are final only after the whole window was mined
+        keys = {cluster.cluster_id: self._fingerprint(cluster.template_text()) for cluster in miner.clusters}
+
+        new_lines = []
+        known_counts: Dict[int, int] = {}
+        known_lines = 0
+        for line, cluster in assignments:
+            if cluster is None:
+                if line.strip():
+                    # Beyond the miner's cluster limit: treat as new rather than drop it
+                    new_lines.append(line)
+                continue
+            if keys[cluster.cluster_id] in self.templates:
+                known_lines += 1
+                known_counts[cluster.cluster_id] = known_counts.get(cluster.cluster_id, 0) + 1
+            else:
+                new_lines.append(line)
+
+        continuing = sorted(known_counts.items(), key=lambda item: item[1], reverse=True)
+        continuing_text = "\n".join(
+            f"[x{count}] {miner.clusters[cluster_id].template_text()}"
+            for cluster_id, count in continuing[:MAX_CONTINUING_TEMPLATES]
+        )
+        return "\n".join(new_lines), continuing_text, list(keys.values()), {
+            "new_lines": len(new_lines),
+            "known_lines": known_lines,
+            "new_templates": sum(1 for key in keys.values() if key not in self.templates),
+            "known_templates": len(known_counts)
+        }
+
+    def context(self, continuing: str = "") -> str:
+        """Running assessment handed to the summarizer as context for the next window."""
+        parts = [f"Monitoring session window {self.window + 1}; earlier windows were already analyzed."]
+        if self.summary_digest:
+            parts.append(f"Assessment so far:\n{self.summary_digest}")
+        if self.techniques:
+            parts.append("Active ATT&CK techniques: " + ", ".join(
+                f"{technique_id} {technique['name']}" for technique_id, technique in self.techniques.items()
+            ))
+        if continuing:
+            parts.append(f"Known activity that continued in this window:\n{continuing}")
+        return "\n\n".join(parts)
+
+    def record_window(self, template_keys: List[str], summary: Optional[str],
+                      techniques: List[Dict[str, Any]]) -> None:
+        """
+        Fold an analyzed window into the state.
+
+        Args:
+            template_keys: Fingerprints of all templates in the window
+            summary: Updated assessment (None keeps the previous digest)
+            techniques: Techniques matched for the window
+        """
+        self.window += 1
+        for key in template_keys:
+            self.templates.pop(key, None)
+            self.templates[key] = self.window
+        while len(self.templates) > Config.SESSION_STATE_MAX_TEMPLATES:
+            del self.templates[next(iter(self.templates))]
+
+        if summary:
+            self.summary_digest = summary[:Config.SESSION_STATE_DIGEST_CHARS]
+
+        for technique in techniques:
+            entry = self.techniques.pop(technique["technique_id"], None) or {
+                "hits": 0, "first_window": self.window
+            }
+            entry.update({
+                "name": technique.get("name", ""),
+                "description": (technique.get("description") or "")[:TECHNIQUE_DESCRIPTION_CHARS],
+                "kill_chain_phases": technique.get("kill_chain_phases", []),
+                "platforms": technique.get("platforms", []),
+                "relevance_score": technique.get("relevance_score", 0.0),
+                "hits": entry["hits"] + 1,
+                "last_window": self.window
+            })
+            self.techniques[technique["technique_id"]] = entry
+        # Techniques not matched for a while are no longer active
+        oldest = self.window - Config.SESSION_STATE_TECHNIQUE_WINDOWS
+        self.techniques = {
+            technique_id: entry for technique_id, entry in self.techniques.items()
+            if entry["last_window"] > oldest
+        }
+        while len(self.techniques) > Config.SESSION_STATE_MAX_TECHNIQUES:
+            least_recent = min(self.techniques, key=lambda technique_id: self.techniques[technique_id]["last_window"])
+            del self.techniques[least_recent]
+        self.updated_at = time.monotonic()
+
+    def severity_score(self) -> float:
+        """Severity of the techniques matched in the latest window (0-1)."""
+        return technique_severity(
+            technique for technique in self.techniques.values() if technique["last_window"] == self.window
+        )
+
+    def active_techniques(self) -> List[Dict[str, Any]]:
+        """Active techniques, most recently matched first."""
+        return [
+            {"technique_id": technique_id, **entry}
+            for technique_id, entry in sorted(
+                self.techniques.items(), key=lambda item: (item[1]["last_window"], item[1]["hits"]), reverse=True
+            )
+        ]
+
+    def describe(self, analyzed: bool, activity: Dict[str, Any]) -> Dict[str, Any]:
+        """Session block returned with the analysis response."""
+        return {
+            "session_id": self.session_id,
+            "window": self.window,
+            "analyzed": analyzed,
+            **activity,
+            "tracked_templates": len(self.templates),
+            "active_techniques": [
+                {key: technique[key] for key in ("technique_id", "name", "hits", "first_window", "last_window")}
+                for technique in self.active_techniques()
+            ]
+        }
+
+
+class AnalysisSessionStore:
+    """LRU cache of session states, written through to MongoDB."""
+
+    def __init__(self, max_sessions: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self.collection = database.get_collection("analysis_session_state")
+        self.max_sessions = max_sessions or Config.SESSION_STATE_MAX_SESSIONS
+        self.ttl_seconds = ttl_seconds or Config.SESSION_STATE_TTL_SECONDS
+        self._states: "OrderedDict[Tuple[str, str], SessionState]" = OrderedDict()
+        # One cycle at a time per session, so windows are folded in order
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._metrics = {
+            "cache_hits": 0,
+            "restored": 0,
+            "created": 0,
+            "evicted": 0,
+            "persist_failures": 0
+        }
+
+    @asynccontextmanager
+    async def session(self, user_id: str, session_id: str) -> AsyncIterator[SessionState]:
+        """
+        Hold a session's state for one analysis cycle.
+
+        The state is persisted when the block exits normally; if the analysis
+        raises, the window is not recorded and the next cycle sees it again.
+        """
+        key = (user_id, session_id)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            state = await self._load(user_id, session_id)
+            yield state
+            await self._save(state)
+
+    async def _load(self, user_id: str, session_id: str) -> SessionState:
+        key = (user_id, session_id)
+        state = self._states.get(key)
+        if state is not None and time.monotonic() - state.updated_at < self.ttl_seconds:
+            self._states.move_to_end(key)
+            self._metrics["cache_hits"] += 1
+            return state
+
+        try:
+            doc = await self.collection.find_one({"user_id": user_id, "session_id": session_id})
+            if doc and doc.get("expires_at", datetime.utcnow()) > datetime.utcnow():
+                state = await asyncio.to_thread(self._from_document, doc)
+                self._metrics["restored"] += 1
+                logger.info(f"Restored analysis session {session_id} for user {user_id} at window {state.window}")
+                return state
+        except Exception as e:
+            logger.error(f"Failed to restore analysis session {session_id}, starting fresh: {str(e)}")
+
+        self._metrics["created"] += 1
+        return SessionState(user_id, session_id)
+
+    async def _save(self, state: SessionState) -> None:
+        key = (state.user_id, state.session_id)
+        self._states[key] = state
+        self._states.move_to_end(key)
+        self._evict()
+        try:
+            document = await asyncio.to_thread(self._to_document, state)
+            await self.collection.replace_one(
+                {"user_id": state.user_id, "session_id": state.session_id}, document, upsert=True
+            )
+        except Exception as e:
+            # The cached state still serves this worker; only restart recovery is affected
+            self._metrics["persist_failures"] += 1
+            logger.error(f"Failed to persist analysis session {state.session_id}: {str(e)}")
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key, state in list(self._states.items()):
+            if len(self._states) <= self.max_sessions and now - state.updated_at < self.ttl_seconds:
+                break
+            del self._states[key]
+            lock = self._locks.get(key)
+            if lock is not None and not lock.locked():
+                del self._locks[key]
+            self._metrics["evicted"] += 1
+
+    def _to_document(self, state: SessionState) -> Dict[str, Any]:
+        encrypted_state, key_id = encryption_service.encrypt_data(
+            {"summary_digest": state.summary_digest, "techniques": state.techniques}, state.user_id
+        )
+        now = datetime.utcnow()
+        return {
+            "user_id": state.user_id,
+            "session_id": state.session_id,
+            "window": state.window,
+            "encrypted_state": encrypted_state,
+            "encryption_key_id": key_id,
+            # [fingerprint, last window] pairs, least recently seen first
+            "templates": [[template, window] for template, window in state.templates.items()],
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds)
+        }
+
+    @staticmethod
+    def _from_document(doc: Dict[str, Any]) -> SessionState:
+        state = SessionState(doc["user_id"], doc["session_id"])
+        state.window = doc.get("window", 0)
+        data = encryption_service.decrypt_data(doc["encrypted_state"], doc["user_id"], doc["encryption_key_id"])
+        if data is None:
+            raise ValueError("Unable to decrypt session state")
+        state.summary_digest = data.get("summary_digest", "")
+        state.techniques = data.get("techniques", {})
+        state.templates = {template: window for template, window in doc.get("templates", [])}
+        return state
+
+    def cached_severity(self, user_id: str, session_id: str) -> Optional[float]:
+        """Severity of a cached session's latest window, or None when it isn't cached."""
+        state = self._states.get((user_id, session_id))
+        return state.severity_score() if state is not None else None
+
+    async def delete(self, user_id: str, session_id: str) -> bool:
+        """
+        Drop a session's state when its monitoring session is stopped.
+
+        Waits for a running analysis cycle of the session, so it cannot
+        persist the state again afterwards.
+        """
+        key = (user_id, session_id)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            self._states.pop(key, None)
+            try:
+                result = await self.collection.delete_one({"user_id": user_id, "session_id": session_id})
+                return result.deleted_count > 0
+            except Exception as e:
+                logger.error(f"Failed to delete analysis session {session_id}: {str(e)}")
+                return False
+            finally:
+                self._locks.pop(key, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Cache size and load/persist counters."""
+        metrics = dict(self._metrics)
+        metrics["cached_sessions"] = len(self._states)
+        metrics["capacity"] = self.max_sessions
+        return metrics
+
+
+analysis_session_store = AnalysisSessionStore()
@@ -1,21 +1,40 @@
 """
 MongoDB service for storing and retrieving encrypted analysis data.
+
+Results are written in the binary envelope format (``encryption_version`` 2,
+see services.encryption_service) as a single BSON binary field; documents
+written before it keep one Fernet token per field and are still read.
+migrate_encryption_format re-encrypts them in place.
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Sequence, Tuple
 import uuid
-from bson import ObjectId
-from services.encryption_service import encryption_service
+from bson import Binary, ObjectId
+from pymongo import UpdateOne
+from services.encryption_service import ENVELOPE_VERSION, encryption_service
+from services.keyset_pagination import keyset_query, keyset_sort, page_cursor
+from services.stage_timings import StageTimer, aggregate_stage_timings
+from services.analysis_result_writer import analysis_result_writer
+from services.analytics_rollups import ROLLUP_DELTA_FIELD, analytics_rollups
 from db import database
-from core import logger
+from core import Config, logger
 
 class AnalysisStorageService:
     """Service for storing and retrieving encrypted analysis data in MongoDB."""
     
+    # Most recent analyses sampled for stage timing percentiles
+    TIMING_SAMPLE_LIMIT = 5000
+    
     def __init__(self):
         self.collection = database.get_collection("analysis_results")
         self.sessions_collection = database.get_collection("monitoring_sessions")
+        # Per-user progress of the current or last cleanup, and its task
+        self.cleanup_progress: Dict[str, Dict[str, Any]] = {}
+        self._cleanup_tasks: Dict[str, asyncio.Task] = {}
+        self._decrypt_pool: Optional[ThreadPoolExecutor] = None
     
     @staticmethod
     def convert_datetime_to_string(value):
@@ -24,73 +43,108 @@ class AnalysisStorageService:
             return value.isoformat()
         return value
     
-    async def store_analysis_result(self, user_id: str, request, response) -> str:
-        """Store encrypted analysis result."""
-        try:
-            # Helper function to convert datetime objects to strings recursively
-            def convert_datetimes_to_strings(obj):
-                if hasattr(obj, 'isoformat'):  # datetime object
-                    return obj.isoformat()
-                elif isinstance(obj, dict):
-                    return {key: convert_datetimes_to_strings(value) for key, value in obj.items()}
-                elif isinstance(obj, list):
-                    return [convert_datetimes_to_strings(item) for item in obj]
-                else:
-                    return obj
-            
-            # Debug what we received
-            logger.info(f"Processing {len(response.matched_techniques)} techniques for storage")
-            for i, tech in enumerate(response.matched_techniques):
-                logger.info(f"Technique {i}: {tech} (has model_dump: {hasattr(tech, 'model_dump')})")
-                if hasattr(tech, 'model_dump'):
-                    tech_data = tech.model_dump()
-                    logger.info(f"Technique {i} data: {tech_data}")
-            
-            # Convert techniques to serializable format
-            serializable_techniques = []
-            for tech in response.matched_techniques:
-                if hasattr(tech, 'model_dump'):
-                    tech_dict = tech.model_dump()
-                    serializable_tech = convert_datetimes_to_strings(tech_dict)
-                    serializable_techniques.append(serializable_tech)
-                    logger.info(f"Added technique to serializable list: {serializable_tech}")
-                else:
-                    logger.warning(f"Technique {tech} does not have model_dump method!")
-            
-            # Convert summary and enhanced_analysis if they contain datetime objects
-            clean_summary = convert_datetimes_to_strings(response.summary)
-            clean_enhanced_analysis = convert_datetimes_to_strings(response.enhanced_analysis) if response.enhanced_analysis else None
-            
-            logger.info(f"Final data for encryption:")
-            logger.info(f"  - Summary: '{clean_summary}' (len: {len(str(clean_summary))})")
-            logger.info(f"  - Techniques: {len(serializable_techniques)} items")
-            logger.info(f"  - Enhanced analysis: {clean_enhanced_analysis}")
-            
-            # Encrypt the analysis results
-            encrypted_results, key_id = encryption_service.encrypt_analysis_results(
+    def _build_document(self, user_id: str, request, response) -> Dict[str, Any]:
+        """
+        Build the encrypted analysis_results document (blocking: derives the
+        user key and encrypts). The persisted timings include the encrypt span.
+        """
+        timer = StageTimer(dict(getattr(response, 'timings', None) or {}))
+        
+        # Helper function to convert datetime objects to strings recursively
+        def convert_datetimes_to_strings(obj):
+            if hasattr(obj, 'isoformat'):  # datetime object
+                return obj.isoformat()
+            elif isinstance(obj, dict):
+                return {key: convert_datetimes_to_strings(value) for key, value in obj.items()}
+            elif isinstance(obj, list):
+                return [convert_datetimes_to_strings(item) for item in obj]
+            else:
+                return obj
+        
+        # Debug what we received
+        logger.info(f"Processing {len(response.matched_techniques)} techniques for storage")
+        for i, tech in enumerate(response.matched_techniques):
+            logger.info(f"Technique {i}: {tech} (has model_dump: {hasattr(tech, 'model_dump')})")
+            if hasattr(tech, 'model_dump'):
+                tech_data = tech.model_dump()
+                logger.info(f"Technique {i} data: {tech_data}")
+        
+        # Convert techniques to serializable format
+        serializable_techniques = []
+        for tech in response.matched_techniques:
+            if hasattr(tech, 'model_dump'):
+                tech_dict = tech.model_dump()
+                serializable_tech = convert_datetimes_to_strings(tech_dict)
+                serializable_techniques.append(serializable_tech)
+                logger.info(f"Added technique to serializable list: {serializable_tech}")
+            else:
+                logger.warning(f"Technique {tech} does not have model_dump method!")
+        
+        # Convert summary and enhanced_analysis if they contain datetime objects
+        clean_summary = convert_datetimes_to_strings(response.summary)
+        clean_enhanced_analysis = convert_datetimes_to_strings(response.enhanced_analysis) if response.enhanced_analysis else None
+        
+        logger.info(f"Final data for encryption:")
+        logger.info(f"  - Summary: '{clean_summary}' (len: {len(str(clean_summary))})")
+        logger.info(f"  - Techniques: {len(serializable_techniques)} items")
+        logger.info(f"  - Enhanced analysis: {clean_enhanced_analysis}")
+        
+        # Encrypt the analysis results
+        with timer.stage("encrypt"):
+            envelope, key_id = encryption_service.seal_analysis_results(
                 summary=clean_summary,
                 techniques=serializable_techniques,
                 enhanced_analysis=clean_enhanced_analysis,
-                user_id=user_id
+                user_id=user_id,
+                iocs=getattr(response, 'iocs', None)
             )
-            
-            # Create document
-            document = {
-                "user_id": user_id,
-                "encrypted_summary": encrypted_results['summary'],
-                "encrypted_techniques": encrypted_results['techniques'],
-                "encrypted_enhanced_analysis": encrypted_results.get('enhanced_analysis'),
-                "analysis_timestamp": datetime.utcnow(),
-                "processing_time_ms": getattr(response, 'processing_time_ms', 0),
-                "techniques_count": len(serializable_techniques),  # Use serializable_techniques count
-                "encryption_key_id": key_id
-            }
-            
-            logger.info(f"Document to store - techniques_count: {document['techniques_count']}")
-            
-            # Store in database
+        
+        logs = getattr(request, 'logs', None)
+        
+        # Create document
+        document = {
+            "user_id": user_id,
+            "logs_hmac": encryption_service.fingerprint_logs(logs, user_id) if logs else None,
+            "enhance_with_ai": getattr(request, 'enhance_with_ai', None),
+            "max_results": getattr(request, 'max_results', None),
+            "encrypted_payload": Binary(envelope),
+            "encryption_version": ENVELOPE_VERSION,
+            "analysis_timestamp": getattr(response, 'analysis_timestamp', None) or datetime.utcnow(),
+            "processing_time_ms": getattr(response, 'processing_time_ms', 0),
+            "timings": dict(timer.timings),
+            "upload": getattr(response, 'upload', None),
+            "techniques_count": len(serializable_techniques),  # Use serializable_techniques count
+            "encryption_key_id": key_id,
+            # Applied to the analytics rollups once the document is written
+            ROLLUP_DELTA_FIELD: analytics_rollups.build_delta(user_id, response)
+        }
+        
+        logger.info(f"Document to store - techniques_count: {document['techniques_count']}")
+        return document
+    
+    @staticmethod
+    def _decrypt_document(doc: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Decrypt a stored analysis in either storage format (blocking)."""
+        if doc.get("encryption_version") == ENVELOPE_VERSION:
+            return encryption_service.open_analysis_results(doc["encrypted_payload"], user_id)
+        return encryption_service.decrypt_analysis_results(
+            {
+                "summary": doc.get("encrypted_summary"),
+                "techniques": doc.get("encrypted_techniques"),
+                "enhanced_analysis": doc.get("encrypted_enhanced_analysis"),
+                "iocs": doc.get("encrypted_iocs")
+            },
+            user_id
+        )
+    
+    async def store_analysis_result(self, user_id: str, request, response) -> str:
+        """Encrypt and store an analysis result inline, returning its ID."""
+        try:
+            document = await asyncio.to_thread(self._build_document, user_id, request, response)
+            rollup_delta = document.pop(ROLLUP_DELTA_FIELD)
             result = await self.collection.insert_one(document)
             analysis_id = str(result.inserted_id)
+            await analytics_rollups.record([rollup_delta])
             
             logger.info(f"Stored encrypted analysis {analysis_id} for user {user_id}")
             return analysis_id
@@ -99,6 +153,21 @@ class AnalysisStorageService:
             logger.error(f"Failed to store analysis: {e}")
             raise
     
+    async def queue_analysis_result(self, user_id: str, request, response) -> str:
+        """
+        Hand an analysis result to the background writer.
+        
+        The analysis ID is assigned up front and returned immediately;
+        encryption, the (batched) insert and the analytics rollup update
+        happen in the background.
+        """
+        analysis_id = str(ObjectId())
+        await analysis_result_writer.submit(
+            analysis_id,
+            lambda: self._build_document(user_id, request, response)
+        )
+        return analysis_id
+    
     async def get_analysis_result(self, user_id: str, analysis_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve and decrypt analysis result."""
         try:
@@ -108,55 +177,273 @@ class AnalysisStorageService:
                 "_id": ObjectId(analysis_id)
             })
             
+            if not doc:
+                # Not flushed by the background writer yet
+                doc = await analysis_result_writer.get_unflushed(analysis_id)
+                if doc and doc.get("user_id") != user_id:
+                    doc = None
+            
             if not doc:
                 logger.warning(f"Analysis {analysis_id} not found for user {user_id}")
                 return None
             
             # Decrypt all data at once
-            encrypted_payload = {
-                "summary": doc.get("encrypted_summary"),
-                "techniques": doc.get("encrypted_techniques"),
-                "enhanced_analysis": doc.get("encrypted_enhanced_analysis")
-            }
-            
-            decrypted_data = encryption_service.decrypt_analysis_results(
-                encrypted_data=encrypted_payload,
-                user_id=user_id
-            )
-            
-            return {
-                "summary": decrypted_data.get("summary"),
-                "matched_techniques": decrypted_data.get("techniques"),
-                "enhanced_analysis": decrypted_data.get("enhanced_analysis"),
-                "analysis_timestamp": self.convert_datetime_to_string(doc.get("analysis_timestamp")),
-                "processing_time_ms": doc.get("processing_time_ms", 0)
-            }
+            decrypted_data = await asyncio.to_thread(self._decrypt_document, doc, user_id)
+            return self._format_result(doc, decrypted_data)
             
         except Exception as e:
             logger.error(f"Failed to decrypt analysis {analysis_id}: {e}")
             return None
     
-    async def get_user_analysis_history(self, user_id: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-        """Get user analysis history (metadata only)."""
-        try:
-            cursor = self.collection.find(
-                {"user_id": user_id}
-            ).sort("analysis_timestamp", -1).skip(offset).limit(limit)
+    def _format_result(self, doc: Dict[str, Any], decrypted_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "summary": decrypted_data.get("summary"),
+            "matched_techniques": decrypted_data.get("techniques"),
+            "enhanced_analysis": decrypted_data.get("enhanced_analysis"),
+            "iocs": decrypted_data.get("iocs"),
+            "analysis_timestamp": self.convert_datetime_to_string(doc.get("analysis_timestamp")),
+            "processing_time_ms": doc.get("processing_time_ms", 0),
+            "timings": doc.get("timings")
+        }
+    
+    async def iter_analysis_results(self, user_id: str,
+                                    analysis_ids: Sequence[str]) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Retrieve and decrypt many analysis results, streamed in request order.
+        
+        The documents are fetched with a single ``$in`` query (plus the
+        background writer's unflushed results) and decrypted in a dedicated
+        pool of Config.ANALYSIS_DECRYPT_WORKERS threads, all submitted up
+        front; each result is yielded as soon as it and those before it are
+        decrypted.
+        
+        Args:
+            user_id: User identifier
+            analysis_ids: Analysis IDs; duplicates are decrypted once
             
-            analyses = []
+        Yields:
+            Tuple of (analysis_id, result or None if it is missing, malformed
+            or owned by another user)
+        """
+        object_ids = {analysis_id: ObjectId(analysis_id) for analysis_id in analysis_ids if ObjectId.is_valid(analysis_id)}
+        docs: Dict[str, Dict[str, Any]] = {}
+        if object_ids:
+            cursor = self.collection.find({"user_id": user_id, "_id": {"$in": list(set(object_ids.values()))}})
             async for doc in cursor:
-                analyses.append({
-                    "id": str(doc.get("_id")),
-                    "analysis_timestamp": self.convert_datetime_to_string(doc.get("analysis_timestamp")),
-                    "processing_time_ms": doc.get("processing_time_ms", 0),
-                    "techniques_count": doc.get("techniques_count", 0),
-                    "logs_preview": "Preview unavailable"
-                })
+                docs[str(doc["_id"])] = doc
+        for analysis_id in object_ids:
+            if analysis_id not in docs:
+                # Not flushed by the background writer yet
+                doc = await analysis_result_writer.get_unflushed(analysis_id)
+                if doc and doc.get("user_id") == user_id:
+                    docs[analysis_id] = doc
+        
+        if self._decrypt_pool is None:
+            self._decrypt_pool = ThreadPoolExecutor(
+                max_workers=Config.ANALYSIS_DECRYPT_WORKERS, thread_name_prefix="analysis-decrypt"
+            )
+        loop = asyncio.get_running_loop()
+        pending = {
+            analysis_id: loop.run_in_executor(self._decrypt_pool, self._decrypt_document, doc, user_id)
+            for analysis_id, doc in docs.items()
+        }
+        try:
+            for analysis_id in analysis_ids:
+                analysis_id = str(analysis_id)
+                if analysis_id not in pending:
+                    yield analysis_id, None
+                    continue
+                yield analysis_id, self._format_result(docs[analysis_id], await pending[analysis_id])
+        finally:
+            # Consumer went away: drop decrypts that haven't started
+            for future in pending.values():
+                future.cancel()
+    
+    async def find_duplicate_analysis(self, user_id: str, request, window_seconds: int) -> Optional[Dict[str, Any]]:
+        """
+        Find a stored analysis of identical logs and parameters within the window.
+        
+        Args:
+            user_id: User identifier
+            request: LogAnalysisRequest being submitted
+            window_seconds: How far back a previous analysis may be reused
             
+        Returns:
+            Decrypted analysis with its ID, or None if there is no usable match
+        """
+        since_date = datetime.utcnow() - timedelta(seconds=window_seconds)
+        doc = await self.collection.find_one(
+            {
+                "user_id": user_id,
+                "logs_hmac": encryption_service.fingerprint_logs(request.logs, user_id),
+                "enhance_with_ai": request.enhance_with_ai,
+                "max_results": request.max_results,
+                "analysis_timestamp": {"$gte": since_date}
+            },
+            sort=[("analysis_timestamp", -1)]
+        )
+        if not doc:
+            return None
+        
+        decrypted_data = await asyncio.to_thread(self._decrypt_document, doc, user_id)
+        if not decrypted_data.get("summary"):
+            # Undecryptable (e.g. rotated key): treat as a miss and re-analyze
+            return None
+        
+        return {
+            "analysis_id": str(doc["_id"]),
+            "summary": decrypted_data["summary"],
+            "matched_techniques": decrypted_data.get("techniques") or [],
+            "enhanced_analysis": decrypted_data.get("enhanced_analysis"),
+            "iocs": decrypted_data.get("iocs"),
+            "analysis_timestamp": doc.get("analysis_timestamp")
+        }
+    
+    async def get_user_analytics(self, user_id: str, days: int = 30) -> Dict[str, Any]:
+        """User analytics from the materialized rollups (see services.analytics_rollups)."""
+        return await analytics_rollups.get_user_analytics(user_id, days)
+    
+    async def get_user_analysis_history(self, user_id: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get user analysis history (metadata only)."""
+        try:
+            analyses, _ = await self.get_user_analysis_history_page(user_id, limit, offset=offset)
             return analyses
         except Exception as e:
             logger.error(f"Failed to get history: {e}")
             return []
+    
+    async def get_user_analysis_history_page(self, user_id: str, limit: int = 50, offset: int = 0,
+                                             cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of a user's analysis history (metadata only), newest first.
+        
+        Args:
+            user_id: User identifier
+            limit: Page size
+            offset: Items to skip; only used without a cursor
+            cursor: Continuation token from the previous page
+            
+        Returns:
+            Tuple of (history items, continuation token or None on the last page)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = keyset_query({"user_id": user_id}, "analysis_timestamp", cursor)
+        find = self.collection.find(
+            query,
+            {"analysis_timestamp": 1, "processing_time_ms": 1, "techniques_count": 1}
+        ).sort(keyset_sort("analysis_timestamp"))
+        if offset and not cursor:
+            find = find.skip(offset)
+        docs = await find.limit(limit + 1).to_list(limit + 1)
+        next_cursor = page_cursor(docs, "analysis_timestamp", limit)
+        
+        analyses = [
+            {
+                "id": str(doc.get("_id")),
+                "analysis_timestamp": self.convert_datetime_to_string(doc.get("analysis_timestamp")),
+                "processing_time_ms": doc.get("processing_time_ms", 0),
+                "techniques_count": doc.get("techniques_count", 0),
+                "logs_preview": "Preview unavailable"
+            }
+            for doc in docs
+        ]
+        return analyses, next_cursor
+
+    def _reencrypt_document(self, doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Format 2 fields for a legacy document, or None if any of its fields
+        can't be decrypted (blocking). The old ciphertexts are removed once the
+        envelope is written, so nothing may be lost in the conversion.
+        """
+        user_id = doc["user_id"]
+        try:
+            decrypted = encryption_service.decrypt_analysis_results(
+                {
+                    "summary": doc.get("encrypted_summary"),
+                    "techniques": doc.get("encrypted_techniques"),
+                    "enhanced_analysis": doc.get("encrypted_enhanced_analysis"),
+                    "iocs": doc.get("encrypted_iocs")
+                },
+                user_id,
+                strict=True
+            )
+        except Exception:
+            return None
+        envelope, key_id = encryption_service.seal_analysis_results(
+            summary=decrypted["summary"],
+            techniques=decrypted["techniques"],
+            enhanced_analysis=decrypted["enhanced_analysis"],
+            user_id=user_id,
+            iocs=decrypted["iocs"]
+        )
+        return {
+            "encrypted_payload": Binary(envelope),
+            "encryption_version": ENVELOPE_VERSION,
+            "encryption_key_id": key_id
+        }
+    
+    async def migrate_encryption_format(self, batch_size: int = 200, user_id: Optional[str] = None,
+                                        dry_run: bool = False) -> Dict[str, int]:
+        """
+        Re-encrypt legacy (per-field Fernet) analyses into the binary envelope.
+        
+        Documents are walked in ``_id`` order one batch at a time and updated
+        with a bulk write that only matches documents still in the old format,
+        so the migration can be interrupted and rerun, and runs alongside the
+        API.
+        
+        Args:
+            batch_size: Documents re-encrypted per bulk write
+            user_id: Only migrate this user's analyses
+            dry_run: Decrypt and re-encrypt but don't write
+            
+        Returns:
+            Dict[str, int]: Counts of scanned, migrated and failed (undecryptable) documents
+        """
+        query: Dict[str, Any] = {"encryption_version": {"$ne": ENVELOPE_VERSION}}
+        if user_id:
+            query["user_id"] = user_id
+        counts = {"scanned": 0, "migrated": 0, "failed": 0}
+        last_id = None
+        
+        while True:
+            batch_query = dict(query, _id={"$gt": last_id}) if last_id is not None else query
+            batch = await self.collection.find(batch_query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            counts["scanned"] += len(batch)
+            
+            updates = await asyncio.gather(*(asyncio.to_thread(self._reencrypt_document, doc) for doc in batch))
+            operations = []
+            for doc, fields in zip(batch, updates):
+                if fields is None:
+                    counts["failed"] += 1
+                    logger.warning(f"Analysis {doc['_id']} could not be decrypted, left in the old format")
+                    continue
+                operations.append(UpdateOne(
+                    {"_id": doc["_id"], "encryption_version": {"$ne": ENVELOPE_VERSION}},
+                    {
+                        "$set": fields,
+                        "$unset": {
+                            "encrypted_summary": "",
+                            "encrypted_techniques": "",
+                            "encrypted_enhanced_analysis": "",
+                            "encrypted_iocs": ""
+                        }
+                    }
+                ))
+            
+            if operations and not dry_run:
+                result = await self.collection.bulk_write(operations, ordered=False)
+                counts["migrated"] += result.modified_count
+            else:
+                counts["migrated"] += len(operations)
+            logger.info(f"Encryption migration progress: {counts}")
+        
+        return counts
 
     # ===== MONITORING SESSIONS =====
     async def create_monitoring_session(self, username: str, log_path: str, interval_seconds: int = 300, ai_agent_enabled: bool = True) -> str:
@@ -198,28 +485,56 @@ class AnalysisStorageService:
     async def get_active_sessions(self, username: str) -> List[Dict[str, Any]]:
         """Get active monitoring sessions for user."""
         try:
-            cursor = self.sessions_collection.find({
-                "username": username,
-                "status": "active"
-            }).sort("created_at", -1)
-            
-            sessions = []
-            async for doc in cursor:
-                sessions.append({
-                    "session_id": doc.get("session_id"),
-                    "log_path": doc.get("log_path"),
-                    "interval_seconds": doc.get("interval_seconds", 300),
-                    "ai_agent_enabled": doc.get("ai_agent_enabled", True),
-                    "status": doc.get("status"),
-                    "created_at": self.convert_datetime_to_string(doc.get("created_at")),
-                    "last_checked": self.convert_datetime_to_string(doc.get("last_checked"))
-                })
-            
+            sessions, _ = await self.get_sessions_page(username, active_only=True, limit=0)
             return sessions
         except Exception as e:
             logger.error(f"Failed to get active sessions: {e}")
             return []
     
+    async def get_sessions_page(self, username: str, active_only: bool = True, limit: int = 50, offset: int = 0,
+                                cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of a user's monitoring sessions, newest first.
+        
+        Args:
+            username: Owner of the sessions
+            active_only: Only list active sessions
+            limit: Page size; 0 returns all remaining sessions
+            offset: Items to skip; only used without a cursor
+            cursor: Continuation token from the previous page
+            
+        Returns:
+            Tuple of (sessions, continuation token or None on the last page)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = {"username": username}
+        if active_only:
+            query["status"] = "active"
+        find = self.sessions_collection.find(keyset_query(query, "created_at", cursor)).sort(keyset_sort("created_at"))
+        if offset and not cursor:
+            find = find.skip(offset)
+        if limit:
+            docs = await find.limit(limit + 1).to_list(limit + 1)
+            next_cursor = page_cursor(docs, "created_at", limit)
+        else:
+            docs, next_cursor = await find.to_list(None), None
+        
+        sessions = [
+            {
+                "session_id": doc.get("session_id"),
+                "log_path": doc.get("log_path"),
+                "interval_seconds": doc.get("interval_seconds", 300),
+                "ai_agent_enabled": doc.get("ai_agent_enabled", True),
+                "status": doc.get("status"),
+                "created_at": self.convert_datetime_to_string(doc.get("created_at")),
+                "last_checked": self.convert_datetime_to_string(doc.get("last_checked"))
+            }
+            for doc in docs
+        ]
+        return sessions, next_cursor
+    
     async def get_monitoring_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get specific monitoring session."""
         try:
@@ -243,28 +558,59 @@ class AnalysisStorageService:
             return None
 
     async def get_analysis_stats(self, days: int = 30) -> Dict[str, Any]:
-        """Get analysis statistics."""
+        """Get analysis statistics, including per-stage timing percentiles."""
         try:
             since_date = datetime.utcnow() - timedelta(days=days)
+            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
             
             total_analyses = await self.collection.count_documents({
                 "analysis_timestamp": {"$gte": since_date}
             })
             
+            analyses_today = await self.collection.count_documents({
+                "analysis_timestamp": {"$gte": today}
+            })
+            
+            unique_users = len(await self.collection.distinct("user_id", {
+                "analysis_timestamp": {"$gte": since_date}
+            }))
+            
             active_sessions = await self.sessions_collection.count_documents({
                 "status": "active"
             })
             
+            # Percentiles are computed over the most recent analyses in the period
+            cursor = self.collection.find(
+                {"analysis_timestamp": {"$gte": since_date}},
+                {"processing_time_ms": 1, "timings": 1, "_id": 0}
+            ).sort("analysis_timestamp", -1).limit(self.TIMING_SAMPLE_LIMIT)
+            
+            processing_times = []
+            timing_samples = []
+            async for doc in cursor:
+                if doc.get("processing_time_ms"):
+                    processing_times.append(doc["processing_time_ms"])
+                if doc.get("timings"):
+                    timing_samples.append(doc["timings"])
+            
             return {
                 "total_analyses": total_analyses,
+                "analyses_today": analyses_today,
+                "unique_users": unique_users,
                 "active_sessions": active_sessions,
+                "average_processing_time": round(sum(processing_times) / len(processing_times), 3) if processing_times else 0.0,
+                "stage_timings": aggregate_stage_timings(timing_samples),
                 "period_days": days
             }
         except Exception as e:
             logger.error(f"Failed to get analysis stats: {e}")
             return {
                 "total_analyses": 0,
+                "analyses_today": 0,
+                "unique_users": 0,
                 "active_sessions": 0,
+                "average_processing_time": 0.0,
+                "stage_timings": {},
                 "period_days": days
             }
 
@@ -287,4 +633,88 @@ class AnalysisStorageService:
             logger.error(f"Failed to delete analysis {analysis_id}: {e}")
             return False
 
+    async def cleanup_old_analyses(self, user_id: str, days: int, batch_size: Optional[int] = None,
+                                   pause_ms: Optional[int] = None) -> int:
+        """
+        Delete a user's analyses older than ``days`` in bounded batches.
+        
+        Each batch looks up at most ``batch_size`` IDs through the
+        (user_id, analysis_timestamp) index and deletes exactly those, then
+        pauses, so no single delete runs long or floods replication. Progress
+        is kept in ``cleanup_progress[user_id]`` and logged per batch.
+        
+        Args:
+            user_id: User whose analyses are deleted
+            days: Age in days beyond which analyses are deleted
+            batch_size: Documents per delete
+            pause_ms: Pause between batches
+            
+        Returns:
+            int: Number of deleted analyses
+        """
+        batch_size = max(1, batch_size or Config.ANALYSIS_CLEANUP_BATCH_SIZE)
+        pause = (Config.ANALYSIS_CLEANUP_PAUSE_MS if pause_ms is None else pause_ms) / 1000.0
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        progress = self.cleanup_progress[user_id] = {
+            "running": True,
+            "user_id": user_id,
+            "days": days,
+            "cutoff": cutoff.isoformat(),
+            "deleted_count": 0,
+            "batches": 0,
+            "started_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "error": None
+        }
+        try:
+            while True:
+                ids = [
+                    doc["_id"] async for doc in self.collection.find(
+                        {"user_id": user_id, "analysis_timestamp": {"$lt": cutoff}}, {"_id": 1}
+                    ).limit(batch_size)
+                ]
+                if not ids:
+                    break
+                result = await self.collection.delete_many({"_id": {"$in": ids}, "user_id": user_id})
+                progress["deleted_count"] += result.deleted_count
+                progress["batches"] += 1
+                logger.info(f"Analysis cleanup for user {user_id}: deleted {progress['deleted_count']} "
+                            f"older than {days} days ({progress['batches']} batches)")
+                if len(ids) < batch_size:
+                    break
+                await asyncio.sleep(pause)
+        except Exception as e:
+            progress["error"] = str(e)
+            logger.error(f"Analysis cleanup for user {user_id} failed after {progress['deleted_count']} deletions: {e}")
+            raise
+        finally:
+            progress["running"] = False
+            progress["finished_at"] = datetime.utcnow().isoformat()
+        
+        return progress["deleted_count"]
+    
+    @staticmethod
+    def _cleanup_done(task: asyncio.Task) -> None:
+        # The failure is already logged and in the progress; retrieve it so
+        # asyncio does not report it as never retrieved
+        if not task.cancelled():
+            task.exception()
+    
+    def start_cleanup(self, user_id: str, days: int) -> Dict[str, Any]:
+        """
+        Run cleanup_old_analyses for a user in the background unless one is running.
+        
+        Returns:
+            Dict[str, Any]: Progress of the user's running (or just started) cleanup
+        """
+        task = self._cleanup_tasks.get(user_id)
+        if task is None or task.done():
+            task = self._cleanup_tasks[user_id] = asyncio.create_task(self.cleanup_old_analyses(user_id, days))
+            task.add_done_callback(self._cleanup_done)
+            # Let the task record its progress before reporting it
+            self.cleanup_progress[user_id] = {
+                "running": True, "user_id": user_id, "days": days, "deleted_count": 0, "batches": 0
+            }
+        return dict(self.cleanup_progress[user_id])
+
 analysis_storage_service = AnalysisStorageService()
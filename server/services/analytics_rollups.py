@@ -0,0 +1,198 @@
+"""
+Materialized per-user analytics rollups.
+
+Every stored analysis increments two documents in ``analysis_rollups``: the
+user's lifetime rollup and the rollup of the analysis' UTC day. The analysis'
+increments (its "delta") are prepared along with its encrypted document and
+applied once the document is written: the result writer records the deltas
+of each flushed batch with a single bulk write. Both rollups hold
+counts and processing time sums; technique frequencies are keyed by
+EncryptionService.technique_key, a keyed HMAC of the technique ID, so the
+aggregates stay plaintext without revealing which techniques a user matched.
+The lifetime rollup also maps each key to its technique ID and name,
+encrypted with the user key, and only the top entries are decrypted on read.
+
+User analytics are then read from at most ``days + 1`` small documents
+instead of decrypting every stored analysis. Rollups record activity: deleting
+an analysis or expiring it from history does not decrement them.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from db import database
+from core import logger
+from services.encryption_service import encryption_service
+
+
+# Field of a document built for storage that carries its rollup delta; the
+# result writer removes it before the insert
+ROLLUP_DELTA_FIELD = "_rollup_delta"
+
+
+def _technique_fields(technique: Any) -> Dict[str, Any]:
+    if hasattr(technique, "model_dump"):
+        technique = technique.model_dump()
+    return technique if isinstance(technique, dict) else {}
+
+
+class AnalyticsRollupStore:
+    """Per-user lifetime and daily analytics counters."""
+
+    # Longest timeline a single read returns
+    MAX_TIMELINE_DAYS = 366
+    TOP_TECHNIQUES = 10
+
+    def __init__(self):
+        self.collection = database.get_collection("analysis_rollups")
+        self._metrics = {
+            "recorded": 0,
+            "batches": 0,
+            "failures": 0,
+            "reads": 0
+        }
+
+    def build_delta(self, user_id: str, response) -> Dict[str, Any]:
+        """
+        Rollup increments of one analysis (blocking: encrypts the technique labels).
+
+        The delta is BSON-serializable so it can be spilled with its document.
+        """
+        timestamp = getattr(response, "analysis_timestamp", None)
+        if not isinstance(timestamp, datetime):
+            timestamp = datetime.utcnow()
+        counts: Dict[str, int] = {}
+        labels: Dict[str, str] = {}
+        for technique in list(getattr(response, "matched_techniques", None) or []):
+            fields = _technique_fields(technique)
+            technique_id = fields.get("technique_id")
+            if not technique_id:
+                continue
+            key = encryption_service.technique_key(technique_id, user_id)
+            counts[key] = counts.get(key, 0) + 1
+            if key not in labels:
+                labels[key], _ = encryption_service.encrypt_data(
+                    {"technique_id": technique_id, "name": fields.get("name")}, user_id
+                )
+        return {
+            "user_id": user_id,
+            "day": datetime(timestamp.year, timestamp.month, timestamp.day),
+            "processing_time_ms": float(getattr(response, "processing_time_ms", 0) or 0),
+            "techniques": counts,
+            "labels": labels
+        }
+
+    @staticmethod
+    def _build_updates(deltas: List[Dict[str, Any]]) -> List[UpdateOne]:
+        """Upserts for a batch of deltas, merged per rollup document."""
+        merged: Dict[Tuple[str, str, Optional[datetime]], Dict[str, Any]] = {}
+        for delta in deltas:
+            for period, day in (("all", None), ("day", delta["day"])):
+                rollup = merged.setdefault((delta["user_id"], period, day), {
+                    "increments": {"analyses": 0, "processing_time_ms": 0.0, "techniques_matched": 0},
+                    "labels": {}
+                })
+                increments = rollup["increments"]
+                increments["analyses"] += 1
+                increments["processing_time_ms"] += delta["processing_time_ms"]
+                for key, count in delta["techniques"].items():
+                    increments["techniques_matched"] += count
+                    increments[f"techniques.{key}"] = increments.get(f"techniques.{key}", 0) + count
+                if period == "all":
+                    rollup["labels"].update(delta["labels"])
+
+        now = datetime.utcnow()
+        return [
+            UpdateOne(
+                {"user_id": user_id, "period": period, "day": day},
+                {"$inc": rollup["increments"],
+                 "$set": {"updated_at": now, **{f"labels.{key}": label for key, label in rollup["labels"].items()}}},
+                upsert=True
+            )
+            for (user_id, period, day), rollup in merged.items()
+        ]
+
+    async def record(self, deltas: List[Dict[str, Any]]) -> None:
+        """
+        Add the deltas of stored analyses to their users' rollups.
+
+        Failures are logged and counted, not raised: the analyses themselves
+        are already stored.
+        """
+        if not deltas:
+            return
+        try:
+            await self.collection.bulk_write(self._build_updates(deltas), ordered=False)
+            self._metrics["recorded"] += len(deltas)
+            self._metrics["batches"] += 1
+        except Exception as e:
+            self._metrics["failures"] += len(deltas)
+            logger.error(f"Failed to update analytics rollups for {len(deltas)} analyses: {e}")
+
+    def _decrypt_labels(self, labels: Dict[str, str], keys: List[str], user_id: str) -> Dict[str, Dict[str, Any]]:
+        decrypted = {}
+        for key in keys:
+            if labels.get(key):
+                decrypted[key] = encryption_service.decrypt_data(labels[key], user_id, None) or {}
+        return decrypted
+
+    async def get_user_analytics(self, user_id: str, days: int = 30) -> Dict[str, Any]:
+        """
+        Analytics for a user from the rollups.
+
+        Args:
+            user_id: User identifier
+            days: Length of the daily timeline, ending today
+
+        Returns:
+            Dict with the UserAnalyticsStats fields: lifetime totals and most
+            common techniques, and one timeline entry per day with activity
+        """
+        self._metrics["reads"] += 1
+        days = max(1, min(days, self.MAX_TIMELINE_DAYS))
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        since = today - timedelta(days=days - 1)
+
+        lifetime = await self.collection.find_one({"user_id": user_id, "period": "all", "day": None}) or {}
+        daily = await self.collection.find(
+            {"user_id": user_id, "period": "day", "day": {"$gte": since}},
+            {"day": 1, "analyses": 1, "processing_time_ms": 1, "techniques_matched": 1, "_id": 0}
+        ).sort("day", 1).to_list(days)
+
+        techniques = lifetime.get("techniques") or {}
+        top = sorted(techniques, key=techniques.get, reverse=True)[:self.TOP_TECHNIQUES]
+        labels = await asyncio.to_thread(self._decrypt_labels, lifetime.get("labels") or {}, top, user_id)
+
+        total = lifetime.get("analyses", 0)
+        return {
+            "total_analyses": total,
+            "avg_processing_time": round(lifetime.get("processing_time_ms", 0.0) / total, 3) if total else 0.0,
+            "most_common_techniques": [
+                {
+                    "technique_id": labels.get(key, {}).get("technique_id"),
+                    "name": labels.get(key, {}).get("name"),
+                    "count": techniques[key]
+                }
+                for key in top
+            ],
+            "analysis_timeline": [
+                {
+                    "date": doc["day"].date().isoformat(),
+                    "analyses": doc.get("analyses", 0),
+                    "avg_processing_time": round(doc.get("processing_time_ms", 0.0) / doc["analyses"], 3)
+                    if doc.get("analyses") else 0.0,
+                    "techniques_matched": doc.get("techniques_matched", 0)
+                }
+                for doc in daily
+            ]
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Rollup update and read counters."""
+        return dict(self._metrics)
+
+
+analytics_rollups = AnalyticsRollupStore()
@@ -1,8 +1,10 @@
+import asyncio
 import boto3
 import json
 import numpy as np
 from typing import List, Dict, Any, Optional
 from core import Config, logger
+from .single_flight import SingleFlight, make_key
 
 class AWSBedrockService:
     """Service for AWS Bedrock Titan text embedding model."""
@@ -11,12 +13,23 @@ class AWSBedrockService:
         """Initialize AWS Bedrock client and configure Titan embedding model."""
         try:
             # Initialize Bedrock client
-            self.client = boto3.client(
-                'bedrock-runtime',
-                region_name=Config.AWS_REGION,
-                aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY
-            )
+            if Config.LLM_STANDIN_URL:
+                # The stand-in ignores signatures, but botocore still needs credentials to sign with
+                self.client = boto3.client(
+                    'bedrock-runtime',
+                    region_name=Config.AWS_REGION,
+                    endpoint_url=Config.LLM_STANDIN_URL,
+                    aws_access_key_id=Config.AWS_ACCESS_KEY_ID or "standin",
+                    aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY or "standin"
+                )
+                logger.warning(f"AWS Bedrock service using LLM stand-in at {Config.LLM_STANDIN_URL}")
+            else:
+                self.client = boto3.client(
+                    'bedrock-runtime',
+                    region_name=Config.AWS_REGION,
+                    aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY
+                )
             
             # Titan Text Embeddings V2 model ID
             self.model_id = "amazon.titan-embed-text-v2:0"
@@ -25,6 +38,9 @@ class AWSBedrockService:
             # Titan Text Express model for conversational responses
             self.text_model_id = "amazon.titan-text-lite-v1"
             
+            self._embedding_flight = SingleFlight("get_embeddings")
+            self._search_flight = SingleFlight("search_mitre_techniques")
+            
             logger.info("AWS Bedrock service initialized successfully")
             
         except Exception as e:
@@ -99,10 +115,24 @@ class AWSBedrockService:
         embeddings = self.get_embeddings([text], input_type)
         return embeddings[0] if embeddings else [0.0] * self.embedding_dimension
     
+    async def get_single_embedding_async(self, text: str, input_type: str = "search_query") -> List[float]:
+        """
+        Get embedding for a single text off the event loop.
+        
+        Identical concurrent requests (same normalized text and input type)
+        share one Titan call.
+        """
+        return await self._embedding_flight.do(
+            make_key("embedding", text, input_type),
+            lambda: asyncio.to_thread(self.get_single_embedding, text, input_type)
+        )
+    
     async def search_mitre_techniques(self, query: str, chromadb_service, n_results: int = 5) -> List[Dict[str, Any]]:
         """
         Search MITRE techniques using AWS Titan embeddings for better context retrieval.
         
+        Identical concurrent searches share one embedding call and vector query.
+        
         Args:
             query (str): Search query
             chromadb_service: ChromaDB service instance
@@ -111,12 +141,22 @@ class AWSBedrockService:
         Returns:
             List[Dict]: Enhanced search results with better context
         """
+        techniques = await self._search_flight.do(
+            make_key("search", query, n_results, id(chromadb_service)),
+            lambda: self._search_mitre_techniques(query, chromadb_service, n_results)
+        )
+        # Callers may mutate their results; don't hand out the shared list
+        return [dict(technique) for technique in techniques]
+    
+    async def _search_mitre_techniques(self, query: str, chromadb_service, n_results: int) -> List[Dict[str, Any]]:
+        """Search MITRE techniques without request coalescing."""
         try:
             # Get query embedding using Titan
-            query_embedding = self.get_single_embedding(query, "search_query")
+            query_embedding = await self.get_single_embedding_async(query, "search_query")
             
             # Perform similarity search in ChromaDB using the embedding
-            results = chromadb_service.collection.query(
+            results = await asyncio.to_thread(
+                chromadb_service.collection.query,
                 query_embeddings=[query_embedding],
                 n_results=n_results
             )
@@ -366,6 +406,13 @@ Response:"""
             logger.error(f"Exception type: {type(e).__name__}")
             return self._generate_fallback_response(query)
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """Runtime metrics for request coalescing."""
+        return {
+            "embedding_coalescing": self._embedding_flight.get_metrics(),
+            "search_coalescing": self._search_flight.get_metrics()
+        }
+    
     def _generate_fallback_response(self, query: str) -> str:
         """Generate a fallback response when Titan text generation fails."""
         return f"I understand you're asking about '{query}' in the context of cybersecurity and MITRE ATT&CK. While I'm currently unable to generate a detailed response, I can tell you that the MITRE ATT&CK framework is an excellent resource for understanding adversary behaviors. I recommend exploring the official MITRE ATT&CK website or using the search functionality in our analysis tools to get specific information about techniques, tactics, and procedures relevant to your query."
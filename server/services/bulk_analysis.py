@@ -0,0 +1,245 @@
+"""
+Bulk analysis: many log items in one request, results streamed as they finish.
+
+Items arrive as newline-delimited JSON (one ``LogAnalysisRequest`` object per
+line, plus an optional ``id``) or as uploaded files. NDJSON is parsed line by
+line from the body stream while results are already streaming back, and items
+are scheduled with bounded concurrency. Each item yields its own result or
+error line; a final summary line reports aggregate throughput.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+import anyio
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from model.logs_model import LogAnalysisRequest, LogAnalysisResponse
+from core import logger
+
+ItemAnalyzer = Callable[[LogAnalysisRequest], Awaitable[LogAnalysisResponse]]
+
+
+class BulkItem:
+    """One parsed bulk item, or the reason it could not be parsed."""
+
+    __slots__ = ("index", "item_id", "request", "error", "size")
+
+    def __init__(self, index: int, item_id: Optional[str] = None, request: Optional[LogAnalysisRequest] = None,
+                 error: Optional[str] = None, size: int = 0):
+        self.index = index
+        self.item_id = item_id
+        self.request = request
+        self.error = error
+        self.size = size
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'item'}: {e['msg']}" for e in error.errors()
+    )
+
+
+def build_item(index: int, data: Any, defaults: Dict[str, Any], size: int,
+               item_id: Optional[str] = None) -> BulkItem:
+    """Validate one decoded item against LogAnalysisRequest."""
+    if not isinstance(data, dict):
+        return BulkItem(index, item_id, error="item must be a JSON object", size=size)
+    item_id = item_id or (str(data["id"]) if data.get("id") is not None else None)
+    fields = {**defaults, **{k: v for k, v in data.items() if k != "id"}}
+    try:
+        return BulkItem(index, item_id, request=LogAnalysisRequest(**fields), size=size)
+    except ValidationError as e:
+        return BulkItem(index, item_id, error=_validation_message(e), size=size)
+
+
+async def iter_ndjson_items(chunks: AsyncIterator[bytes], defaults: Dict[str, Any], max_items: int,
+                            max_line_bytes: int) -> AsyncIterator[BulkItem]:
+    """
+    Parse an NDJSON byte stream into bulk items without buffering the whole body.
+
+    Blank lines are ignored. Lines longer than ``max_line_bytes`` are skipped
+    (reported as item errors) rather than buffered.
+
+    Args:
+        chunks: Raw request body chunks
+        defaults: Field defaults applied to every item (enhance_with_ai, max_results, request_type)
+        max_items: Maximum number of items accepted; the rest of the body is ignored
+        max_line_bytes: Maximum size of a single NDJSON line
+    """
+    buffer = bytearray()
+    index = 0
+    oversized = False
+
+    def parse(line: bytes) -> BulkItem:
+        try:
+            data = json.loads(line)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            return BulkItem(index, error=f"invalid JSON: {e}", size=len(line))
+        return build_item(index, data, defaults, len(line))
+
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        while True:
+            newline = buffer.find(b"\n")
+            if newline < 0:
+                if len(buffer) > max_line_bytes:
+                    # Drop the partial line and everything up to its newline
+                    oversized = True
+                    buffer.clear()
+                break
+            too_long = oversized or newline > max_line_bytes
+            line = b"" if too_long else bytes(buffer[:newline]).strip()
+            del buffer[:newline + 1]
+            if too_long:
+                oversized = False
+                yield BulkItem(index, error=f"item exceeds {max_line_bytes} bytes")
+                index += 1
+            elif line:
+                yield parse(line)
+                index += 1
+            if index >= max_items:
+                logger.warning(f"Bulk analysis truncated at {max_items} items")
+                return
+
+    if oversized or len(buffer) > max_line_bytes:
+        yield BulkItem(index, error=f"item exceeds {max_line_bytes} bytes")
+    elif buffer.strip():
+        yield parse(bytes(buffer).strip())
+
+
+async def run_bulk_analysis(items: AsyncIterator[BulkItem], analyze: ItemAnalyzer,
+                            concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Analyze bulk items with bounded concurrency, yielding results as they complete.
+
+    At most ``concurrency`` items are in flight; the input is only read further
+    once a slot frees up, and finished items are yielded while the next input
+    item is still awaited. Yields one ``{"type": "result", ...}`` record per
+    item (in completion order) and a final ``{"type": "summary", ...}`` record.
+    """
+    started = time.perf_counter()
+    stats = {"items": 0, "completed": 0, "failed": 0, "dedup_hits": 0, "input_bytes": 0}
+    pending: Set[asyncio.Task] = set()
+
+    async def analyze_item(item: BulkItem) -> Dict[str, Any]:
+        item_started = time.perf_counter()
+        try:
+            response = await analyze(item.request)
+        except Exception as e:
+            return _item_record(item, error=getattr(e, "detail", None) or str(e) or type(e).__name__,
+                                elapsed=time.perf_counter() - item_started)
+        return _item_record(item, response=response, elapsed=time.perf_counter() - item_started)
+
+    def account(record: Dict[str, Any]) -> Dict[str, Any]:
+        if record["status"] == "completed":
+            stats["completed"] += 1
+            if record["result"].get("dedup_hit"):
+                stats["dedup_hits"] += 1
+        else:
+            stats["failed"] += 1
+        return record
+
+    iterator = items.__aiter__()
+    next_item: Optional[asyncio.Future] = None
+    exhausted = False
+    try:
+        while not exhausted or pending:
+            # Read ahead only while a slot is free, so the input is consumed at
+            # the pace of the analyses; results are yielded while waiting for it
+            if not exhausted and next_item is None and len(pending) < concurrency:
+                next_item = asyncio.ensure_future(iterator.__anext__())
+            waiting = (pending | {next_item}) if next_item is not None else pending
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for task in done - {next_item}:
+                pending.discard(task)
+                yield account(task.result())
+            if next_item not in done:
+                continue
+
+            read, next_item = next_item, None
+            try:
+                item = read.result()
+            except StopAsyncIteration:
+                exhausted = True
+                continue
+            stats["items"] += 1
+            stats["input_bytes"] += item.size
+            if item.error:
+                yield account(_item_record(item, error=item.error))
+            else:
+                pending.add(asyncio.create_task(analyze_item(item)))
+    finally:
+        # Client went away: stop waiting on items that are still running
+        for task in pending:
+            task.cancel()
+        if next_item is not None:
+            next_item.cancel()
+
+    elapsed = time.perf_counter() - started
+    yield {
+        "type": "summary",
+        **stats,
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "items_per_second": round(stats["items"] / elapsed, 2) if elapsed else 0.0,
+        "input_mb_per_second": round(stats["input_bytes"] / elapsed / 1e6, 3) if elapsed else 0.0
+    }
+
+
+async def until_exhausted(items: AsyncIterator[BulkItem], body_read: asyncio.Event) -> AsyncIterator[BulkItem]:
+    """Pass items through and set ``body_read`` once the request body is no longer read."""
+    try:
+        async for item in items:
+            yield item
+    finally:
+        body_read.set()
+
+
+class BulkStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for a handler that is still reading the request body.
+
+    Below ASGI spec 2.4 (uvicorn's HTTP protocols report 2.3) Starlette watches
+    for client disconnects by calling ``receive()`` alongside the response,
+    which would swallow the body chunks the items are parsed from. Here the
+    disconnect watcher only starts once ``body_read`` is set.
+    """
+
+    def __init__(self, content, body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async with anyio.create_task_group() as task_group:
+
+            async def watch_disconnect() -> None:
+                await self.body_read.wait()
+                await self.listen_for_disconnect(receive)
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(watch_disconnect)
+            await self.stream_response(send)
+            task_group.cancel_scope.cancel()
+
+        if self.background is not None:
+            await self.background()
+
+
+def _item_record(item: BulkItem, response: Optional[LogAnalysisResponse] = None,
+                 error: Optional[str] = None, elapsed: float = 0.0) -> Dict[str, Any]:
+    record = {
+        "type": "result",
+        "index": item.index,
+        "id": item.item_id,
+        "status": "completed" if response is not None else "failed",
+        "elapsed_ms": round(elapsed * 1000, 3)
+    }
+    if response is not None:
+        record["result"] = response.model_dump(mode="json")
+    else:
+        record["error"] = error
+    return record
@@ -1,10 +1,12 @@
 import re
-import uuid
-import json
 from string import punctuation
+from typing import Iterable, Iterator
 
-# This is a simplified regex from our previous discussion
-LOG_PATTERN = re.compile(r'^(?P<timestamp>.*?)\s+(?P<hostname>\S+)\s+(?P<process_name>\w+).*?:\s+(?P<message>.*)')
+from services.log_parser import Record, log_parser
+
+# Punctuation removed by clean_text; characters that matter in logs are kept
+_CLEAN_TABLE = str.maketrans('', '', punctuation.replace("-", "").replace("_", "").replace(":", ""))
+_WHITESPACE = re.compile(r'\s+')
 
 def clean_text(text: str) -> str:
     """
@@ -13,47 +15,16 @@ def clean_text(text: str) -> str:
     - Removes specific punctuation.
     - Normalizes whitespace.
     """
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Define punctuation to remove, but keep characters that might be important in logs
-    custom_punctuation = punctuation.replace("-", "").replace("_", "").replace(":", "")
-    text = text.translate(str.maketrans('', '', custom_punctuation))
-    
-    # Remove extra whitespace and strip leading/trailing spaces
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
-
-def process_logs(raw_logs: list[str]) -> list[dict]:
-    structured_logs = []
-    for log_line in raw_logs:
-        match = LOG_PATTERN.match(log_line.strip())
-        if match:
-            log_data = match.groupdict()
-            
-            # Apply the cleaning function to the messy log message
-            raw_message = log_data.get("message", "").strip()
-            cleaned_message = clean_text(raw_message)
+    text = text.lower().translate(_CLEAN_TABLE)
+    return _WHITESPACE.sub(' ', text).strip()
 
-            structured_log = {
-                "log_id": str(uuid.uuid4()),
-                "timestamp": log_data.get("timestamp"),
-                "hostname": log_data.get("hostname"),
-                "process_name": log_data.get("process_name"),
-                "raw_message": raw_message,
-                "cleaned_message_for_ai": cleaned_message # <-- This goes to the AI
-            }
-            structured_logs.append(structured_log)
-        else:
-            # Handle logs that don't match the regex pattern
-            raw_message = log_line.strip()
-            structured_logs.append({
-                "log_id": str(uuid.uuid4()),
-                "raw_message": raw_message,
-                "cleaned_message_for_ai": clean_text(raw_message),
-                "parsing_status": "unstructured"
-            })
-            
-    return structured_logs
+def process_logs(raw_logs: Iterable[str], source: str = "default") -> Iterator[Record]:
+    """
+    Parse log lines into structured records, lazily.
 
+    The format (syslog, JSON lines, CEF/LEEF, access log, auditd) is detected
+    once per source and cached; see services.log_parser. Lines that match no
+    format are yielded as ``{"format": "unstructured", "message": line}``.
+    Use ``clean_text(record["message"])`` where normalized text is needed.
+    """
+    return log_parser.parse_lines(raw_logs, source)
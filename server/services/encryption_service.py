@@ -1,29 +1,157 @@
 """
 Encryption service for sensitive analysis data.
 Provides AES-256 encryption with key derivation and secure key management.
+
+Per-user keys are derived with PBKDF2 (100,000 iterations, tens of ms of CPU)
+and kept in a bounded, TTL-expiring in-memory cache, so only the first
+operation for a user in a while pays for the derivation. Callers on the event
+loop run encryption and decryption with ``asyncio.to_thread``.
+
+Analysis results are stored as a versioned binary envelope (format 2): a
+random per-record data key, wrapped with AES-GCM under the user key, and one
+AES-GCM ciphertext of the compact JSON payload::
+
+    version (1) | wrap nonce (12) | wrapped data key (48) | nonce (12) | ciphertext + tag
+
+The header (everything before the payload nonce) and the user ID are bound
+in as associated data, so an envelope can't be moved to another user or have
+its data key swapped. Format 1 documents hold separate base64 Fernet tokens
+per field; both are readable.
 """
 
 import os
 import json
 import hashlib
+import hmac
 import base64
-from typing import Dict, Any, Optional, Tuple
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional, Tuple
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from datetime import datetime
 import secrets
 
 from core.config import settings
-from core import logger
+from core import Config, logger
+from services.single_flight import normalize_text
+
+# Storage format of encrypted analysis results
+LEGACY_ENVELOPE_VERSION = 1
+ENVELOPE_VERSION = 2
+_NONCE_SIZE = 12
+_WRAPPED_KEY_SIZE = 32 + 16
+_ENVELOPE_HEADER_SIZE = 1 + _NONCE_SIZE + _WRAPPED_KEY_SIZE
+
+class DerivedKeyCache:
+    """
+    Bounded, TTL-expiring, thread-safe cache of derived user keys.
+    
+    Keys are held only in process memory. Concurrent misses for the same user
+    (e.g. worker threads decrypting a history page) wait for one derivation
+    instead of each running PBKDF2.
+    """
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[bytes, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._derivation_locks: Dict[str, threading.Lock] = {}
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "derive_seconds": 0.0
+        }
+    
+    def _lookup(self, user_id: str) -> Optional[Tuple[bytes, str]]:
+        # Caller holds self._lock
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            del self._entries[user_id]
+            self._metrics["evictions"] += 1
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[0], entry[1]
+    
+    def get_or_derive(self, user_id: str, derive: Callable[[str], Tuple[bytes, str]]) -> Tuple[bytes, str]:
+        """Cached (key, key_id) for a user, deriving it on a miss."""
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return self._derive(user_id, derive)
+        
+        with self._lock:
+            cached = self._lookup(user_id)
+            if cached is not None:
+                self._metrics["hits"] += 1
+                return cached
+            derivation_lock = self._derivation_locks.setdefault(user_id, threading.Lock())
+        
+        with derivation_lock:
+            try:
+                with self._lock:
+                    cached = self._lookup(user_id)
+                    if cached is not None:
+                        # Derived by a concurrent caller while this one waited
+                        self._metrics["hits"] += 1
+                        return cached
+                key, key_id = self._derive(user_id, derive)
+                with self._lock:
+                    self._entries[user_id] = (key, key_id, time.monotonic() + self.ttl_seconds)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+                        self._metrics["evictions"] += 1
+            finally:
+                # Also when derive raises, or the lock would stay for good
+                with self._lock:
+                    if self._derivation_locks.get(user_id) is derivation_lock:
+                        del self._derivation_locks[user_id]
+        return key, key_id
+    
+    def _derive(self, user_id: str, derive: Callable[[str], Tuple[bytes, str]]) -> Tuple[bytes, str]:
+        started = time.perf_counter()
+        result = derive(user_id)
+        with self._lock:
+            self._metrics["misses"] += 1
+            self._metrics["derive_seconds"] += time.perf_counter() - started
+        return result
+    
+    def clear(self) -> None:
+        """Drop all cached keys (e.g. after a master key change)."""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters, size and time spent deriving keys."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["size"] = len(self._entries)
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / lookups, 4) if lookups else 0.0
+        metrics["derive_ms"] = round(metrics.pop("derive_seconds") * 1000, 3)
+        metrics["capacity"] = self.max_size
+        metrics["ttl_seconds"] = self.ttl_seconds
+        return metrics
 
 class EncryptionService:
     """Service for encrypting and decrypting sensitive analysis data."""
     
-    def __init__(self):
+    def __init__(self, key_cache_size: Optional[int] = None, key_cache_ttl_seconds: Optional[float] = None):
         self.master_key = settings.ENCRYPTION_MASTER_KEY.encode()
         self.salt_length = 32
         self.key_iteration_count = 100000
+        # Separate key for content fingerprints so they can't be confused with cipher keys
+        self._fingerprint_key = hmac.new(self.master_key, b"forensiq-log-fingerprint", hashlib.sha256).digest()
+        self.key_cache = DerivedKeyCache(
+            Config.ENCRYPTION_KEY_CACHE_SIZE if key_cache_size is None else key_cache_size,
+            Config.ENCRYPTION_KEY_CACHE_TTL_SECONDS if key_cache_ttl_seconds is None else key_cache_ttl_seconds
+        )
     
     def _derive_key(self, password: bytes, salt: bytes) -> bytes:
         """Derive encryption key from password and salt using PBKDF2."""
@@ -36,7 +164,11 @@ class EncryptionService:
         return base64.urlsafe_b64encode(kdf.derive(password))
     
     def _generate_user_key(self, user_id: str) -> Tuple[bytes, str]:
-        """Generate a unique encryption key for a user."""
+        """Unique encryption key for a user, from the key cache when possible."""
+        return self.key_cache.get_or_derive(user_id, self._derive_user_key)
+    
+    def _derive_user_key(self, user_id: str) -> Tuple[bytes, str]:
+        """Derive a user's encryption key (blocking PBKDF2; use _generate_user_key)."""
         # Create a deterministic but secure salt for the user
         user_salt = hashlib.sha256(f"{user_id}_{settings.SECRET_KEY}".encode()).digest()
         
@@ -124,6 +256,24 @@ class EncryptionService:
         """Create a hash of data for integrity verification."""
         return hashlib.sha256(data.encode('utf-8')).hexdigest()
     
+    def fingerprint_logs(self, logs: str, user_id: str) -> str:
+        """
+        Keyed HMAC-SHA256 of normalized log content, scoped to a user.
+        
+        Unlike a plain hash, the fingerprint can't be used to confirm guesses
+        about log content without the server key.
+        """
+        message = f"{user_id}\x1f{normalize_text(logs)}".encode('utf-8')
+        return hmac.new(self._fingerprint_key, message, hashlib.sha256).hexdigest()
+    
+    def technique_key(self, technique_id: str, user_id: str) -> str:
+        """
+        Keyed, user-scoped token for a technique ID, for counting techniques
+        in plaintext aggregates without revealing which ones a user matched.
+        """
+        message = f"technique\x1f{user_id}\x1f{technique_id}".encode('utf-8')
+        return hmac.new(self._fingerprint_key, message, hashlib.sha256).hexdigest()[:24]
+    
     def encrypt_logs(self, logs: str, user_id: str) -> Tuple[str, str, str]:
         """
         Encrypt logs and create hash for deduplication.
@@ -131,7 +281,7 @@ class EncryptionService:
         Returns:
             Tuple of (encrypted_logs, logs_hash, key_id)
         """
-        logs_hash = self.hash_data(logs)
+        logs_hash = self.fingerprint_logs(logs, user_id)
         encrypted_logs, key_id = self.encrypt_data(logs, user_id)
         return encrypted_logs, logs_hash, key_id
     
@@ -139,7 +289,8 @@ class EncryptionService:
                                summary: str,
                                techniques: list,
                                enhanced_analysis: Optional[str],
-                               user_id: str) -> Tuple[Dict[str, str], str]:
+                               user_id: str,
+                               iocs: Optional[Dict[str, list]] = None) -> Tuple[Dict[str, str], str]:
         """
         Encrypt all analysis results.
         
@@ -162,12 +313,22 @@ class EncryptionService:
         if enhanced_analysis:
             encrypted_data['enhanced_analysis'] = cipher.encrypt(enhanced_analysis.encode('utf-8')).decode('ascii')
         
+        # Encrypt extracted indicators (as JSON) if provided
+        if iocs:
+            encrypted_data['iocs'] = cipher.encrypt(json.dumps(iocs).encode('utf-8')).decode('ascii')
+        
         return encrypted_data, key_id
 
     def decrypt_analysis_results(self,
                                  encrypted_data: Dict[str, str],
-                                 user_id: str) -> Dict[str, Any]:
-        """Decrypt all analysis results."""
+                                 user_id: str,
+                                 strict: bool = False) -> Dict[str, Any]:
+        """
+        Decrypt all analysis results.
+        
+        A field that fails to decrypt is returned empty, unless ``strict`` is
+        set, in which case the error is raised.
+        """
         try:
             key, _ = self._generate_user_key(user_id)
             cipher = Fernet(key)
@@ -179,6 +340,8 @@ class EncryptionService:
                 try:
                     decrypted_data['summary'] = cipher.decrypt(encrypted_data['summary'].encode('ascii')).decode('utf-8')
                 except Exception:
+                    if strict:
+                        raise
                     decrypted_data['summary'] = ""
             else:
                 decrypted_data['summary'] = ""
@@ -189,6 +352,8 @@ class EncryptionService:
                     decrypted_techniques_json = cipher.decrypt(encrypted_data['techniques'].encode('ascii')).decode('utf-8')
                     decrypted_data['techniques'] = json.loads(decrypted_techniques_json)
                 except Exception:
+                    if strict:
+                        raise
                     decrypted_data['techniques'] = []
             else:
                 decrypted_data['techniques'] = []
@@ -198,18 +363,98 @@ class EncryptionService:
                 try:
                     decrypted_data['enhanced_analysis'] = cipher.decrypt(encrypted_data['enhanced_analysis'].encode('ascii')).decode('utf-8')
                 except Exception:
+                    if strict:
+                        raise
                     decrypted_data['enhanced_analysis'] = None
             else:
                 decrypted_data['enhanced_analysis'] = None
+            
+            # Decrypt indicators if present
+            if encrypted_data.get('iocs'):
+                try:
+                    decrypted_data['iocs'] = json.loads(cipher.decrypt(encrypted_data['iocs'].encode('ascii')).decode('utf-8'))
+                except Exception:
+                    if strict:
+                        raise
+                    decrypted_data['iocs'] = None
+            else:
+                decrypted_data['iocs'] = None
                 
             return decrypted_data
         
         except Exception as e:
-            logger.error(f"Failed to decrypt analysis results for user {user_id}: {str(e)}")
+            logger.error(f"Failed to decrypt analysis results for user {user_id}: {str(e) or type(e).__name__}")
+            if strict:
+                raise
+            return {
+                'summary': "",
+                'techniques': [],
+                'enhanced_analysis': None,
+                'iocs': None
+            }
+
+    def seal_analysis_results(self,
+                              summary: str,
+                              techniques: list,
+                              enhanced_analysis: Optional[str],
+                              user_id: str,
+                              iocs: Optional[Dict[str, list]] = None) -> Tuple[bytes, str]:
+        """
+        Encrypt all analysis results into one format 2 envelope.
+        
+        Returns:
+            Tuple of (envelope_bytes, key_id)
+        """
+        payload = {"summary": summary, "techniques": techniques}
+        if enhanced_analysis:
+            payload["enhanced_analysis"] = enhanced_analysis
+        if iocs:
+            payload["iocs"] = iocs
+        plaintext = json.dumps(payload, default=str, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+        
+        key, key_id = self._generate_user_key(user_id)
+        wrap_aad = bytes((ENVELOPE_VERSION,)) + user_id.encode('utf-8')
+        data_key = AESGCM.generate_key(bit_length=256)
+        wrap_nonce = secrets.token_bytes(_NONCE_SIZE)
+        wrapped_key = AESGCM(base64.urlsafe_b64decode(key)).encrypt(wrap_nonce, data_key, wrap_aad)
+        
+        header = bytes((ENVELOPE_VERSION,)) + wrap_nonce + wrapped_key
+        nonce = secrets.token_bytes(_NONCE_SIZE)
+        ciphertext = AESGCM(data_key).encrypt(nonce, plaintext, header + user_id.encode('utf-8'))
+        return header + nonce + ciphertext, key_id
+    
+    def open_analysis_results(self, envelope: bytes, user_id: str) -> Dict[str, Any]:
+        """
+        Decrypt a format 2 envelope; same result shape as decrypt_analysis_results.
+        """
+        try:
+            envelope = bytes(envelope)
+            if len(envelope) <= _ENVELOPE_HEADER_SIZE + _NONCE_SIZE or envelope[0] != ENVELOPE_VERSION:
+                raise ValueError("not a format 2 envelope")
+            key, _ = self._generate_user_key(user_id)
+            header = envelope[:_ENVELOPE_HEADER_SIZE]
+            wrap_nonce, wrapped_key = header[1:1 + _NONCE_SIZE], header[1 + _NONCE_SIZE:]
+            data_key = AESGCM(base64.urlsafe_b64decode(key)).decrypt(
+                wrap_nonce, wrapped_key, header[:1] + user_id.encode('utf-8')
+            )
+            nonce = envelope[_ENVELOPE_HEADER_SIZE:_ENVELOPE_HEADER_SIZE + _NONCE_SIZE]
+            plaintext = AESGCM(data_key).decrypt(
+                nonce, envelope[_ENVELOPE_HEADER_SIZE + _NONCE_SIZE:], header + user_id.encode('utf-8')
+            )
+            payload = json.loads(plaintext)
+            return {
+                'summary': payload.get('summary') or "",
+                'techniques': payload.get('techniques') or [],
+                'enhanced_analysis': payload.get('enhanced_analysis'),
+                'iocs': payload.get('iocs')
+            }
+        except Exception as e:
+            logger.error(f"Failed to open analysis envelope for user {user_id}: {str(e) or type(e).__name__}")
             return {
                 'summary': "",
                 'techniques': [],
-                'enhanced_analysis': None
+                'enhanced_analysis': None,
+                'iocs': None
             }
 
 # Global service instance
@@ -0,0 +1,169 @@
+"""
+Micro-batching of threat analysis enhancement requests.
+
+Concurrent enhance_threat_analysis calls arriving within a short window are
+packed into one multi-item Gemini prompt that carries the shared instructions
+once, and the response is split back to the individual callers.
+"""
+
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import logger
+
+ITEM_PATTERN = re.compile(r"<<<ITEM (\d+)>>>(.*?)<<<END ITEM \1>>>", re.DOTALL)
+
+
+class EnhancementBatcher:
+    """Collects pending enhancement requests and flushes them as one LLM call."""
+
+    def __init__(self, gemini_service, window_ms: int = 50, max_batch_size: int = 16):
+        self.gemini_service = gemini_service
+        self.window_seconds = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._pending: List[Tuple[str, list, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self._metrics = {
+            "requests": 0,
+            "batches": 0,
+            "batched_items": 0,
+            "max_batch_size": 0,
+            "llm_calls": 0,
+            "llm_calls_saved": 0,
+            "prompt_chars_saved": 0,
+            "parse_failures": 0,
+            "fallback_items": 0
+        }
+
+    async def submit(self, summary: str, attack_techniques: list) -> str:
+        """Queue one enhancement request and wait for its share of the batch result."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((summary, attack_techniques, future))
+        self._metrics["requests"] += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            # Full batch: flush now instead of waiting out the window
+            batch, self._pending = self._pending, []
+            if self._flush_task is not None:
+                self._flush_task.cancel()
+                self._flush_task = None
+            self._spawn(self._flush(batch))
+        elif self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_after_window())
+
+        return await future
+
+    def _spawn(self, coro) -> asyncio.Task:
+        # Hold a reference so the event loop doesn't garbage-collect running flushes
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window_seconds)
+        batch, self._pending = self._pending, []
+        self._flush_task = None
+        await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, list, asyncio.Future]]) -> None:
+        # Callers that were cancelled while waiting don't need an answer
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+
+        self._metrics["batches"] += 1
+        self._metrics["batched_items"] += len(batch)
+        self._metrics["max_batch_size"] = max(self._metrics["max_batch_size"], len(batch))
+
+        if len(batch) == 1:
+            await self._resolve_individually(batch, fallback=False)
+            return
+
+        results: Dict[int, str] = {}
+        try:
+            self._metrics["llm_calls"] += 1
+            response = await self.gemini_service._generate(self._build_batch_prompt(batch))
+            if response and response.text:
+                results = self._parse_batch_response(response.text, len(batch))
+        except Exception as e:
+            logger.warning(f"Batched enhancement of {len(batch)} items failed: {str(e)}")
+
+        missing = []
+        for index, (summary, techniques, future) in enumerate(batch, start=1):
+            if index in results:
+                if not future.done():
+                    future.set_result(results[index])
+            else:
+                missing.append((summary, techniques, future))
+
+        if missing:
+            self._metrics["parse_failures"] += 1
+            logger.warning(f"Falling back to individual enhancement for {len(missing)}/{len(batch)} items")
+            await self._resolve_individually(missing, fallback=True)
+
+        answered = len(batch) - len(missing)
+        if answered > 1:
+            self._metrics["llm_calls_saved"] += answered - 1
+            self._metrics["prompt_chars_saved"] += (answered - 1) * len(self.gemini_service.ENHANCEMENT_INSTRUCTIONS)
+        logger.info(f"Enhanced {answered}/{len(batch)} analyses in one batched call")
+
+    async def _resolve_individually(self, items: List[Tuple[str, list, asyncio.Future]], fallback: bool) -> None:
+        self._metrics["llm_calls"] += len(items)
+        if fallback:
+            self._metrics["fallback_items"] += len(items)
+
+        async def resolve(summary: str, techniques: list, future: asyncio.Future) -> None:
+            try:
+                result = await self.gemini_service._enhance_threat_analysis_single(summary, techniques)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+        await asyncio.gather(*(resolve(*item) for item in items))
+
+    def _build_batch_prompt(self, batch: List[Tuple[str, list, asyncio.Future]]) -> str:
+        items_text = "\n\n".join(
+            f"=== ITEM {index} ===\n"
+            f"LOG SUMMARY:\n{summary}\n\n"
+            f"MATCHING ATT&CK TECHNIQUES:\n{self.gemini_service._format_techniques(techniques)}"
+            for index, (summary, techniques, _) in enumerate(batch, start=1)
+        )
+        return f"""
+            You will receive {len(batch)} independent items. Each item is a log summary with its matching
+            MITRE ATT&CK techniques. For EACH item, independently provide a comprehensive threat analysis.
+
+            {self.gemini_service.ENHANCEMENT_INSTRUCTIONS}
+
+            Output format (mandatory): wrap each item's analysis exactly as
+            <<<ITEM n>>>
+            ...analysis for item n...
+            <<<END ITEM n>>>
+            using the item's number, once per item, in order, with nothing outside the markers.
+
+            {items_text}
+
+            ENHANCED ANALYSES:
+            """
+
+    @staticmethod
+    def _parse_batch_response(text: str, expected: int) -> Dict[int, str]:
+        results = {}
+        for match in ITEM_PATTERN.finditer(text):
+            index = int(match.group(1))
+            content = match.group(2).strip()
+            if 1 <= index <= expected and content and index not in results:
+                results[index] = content
+        return results
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Batch size and savings counters."""
+        metrics = dict(self._metrics)
+        batches = metrics["batches"]
+        metrics["avg_batch_size"] = round(metrics["batched_items"] / batches, 2) if batches else 0.0
+        metrics["pending"] = len(self._pending)
+        return metrics
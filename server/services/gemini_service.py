@@ -1,35 +1,61 @@
+import asyncio
 import google.generativeai as genai
-from typing import Optional
+from typing import Optional, List
 from core import Config, logger
+from .log_chunking import split_log_chunks
+from .enhancement_batcher import EnhancementBatcher
+from .single_flight import SingleFlight, make_key
 
 class GeminiService:
     """Service for interacting with Google's Gemini AI for log summarization."""
     
+    # Maximum number of partial summaries merged by a single reduce call
+    SUMMARY_REDUCE_FAN_IN = 8
+    
     def __init__(self):
         if not Config.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
-        genai.configure(api_key=Config.GEMINI_API_KEY)
+        if Config.LLM_STANDIN_URL:
+            # Route generate_content to the local stand-in over the REST transport
+            genai.configure(
+                api_key=Config.GEMINI_API_KEY,
+                transport="rest",
+                client_options={"api_endpoint": Config.LLM_STANDIN_URL}
+            )
+            logger.warning(f"Gemini AI service using LLM stand-in at {Config.LLM_STANDIN_URL}")
+        else:
+            genai.configure(api_key=Config.GEMINI_API_KEY)
         self.model = genai.GenerativeModel('gemini-2.5-flash')
+        
+        self._summarize_flight = SingleFlight("summarize_logs")
+        
+        self.enhancement_batcher = None
+        if Config.ENHANCEMENT_BATCHING_ENABLED:
+            self.enhancement_batcher = EnhancementBatcher(
+                self,
+                window_ms=Config.ENHANCEMENT_BATCH_WINDOW_MS,
+                max_batch_size=Config.ENHANCEMENT_BATCH_MAX_SIZE
+            )
         logger.info("Gemini AI service initialized")
     
-    async def summarize_logs(self, logs: str) -> str:
-        """
-        Summarize system logs using Gemini AI.
-        
-        Args:
-            logs (str): Raw system logs to summarize
-            
-        Returns:
-            str: Summarized and structured log analysis
-        """
-        try:
-            # Truncate logs if they're too long
-            if len(logs) > Config.MAX_LOG_LENGTH:
-                logs = logs[:Config.MAX_LOG_LENGTH] + "... (truncated)"
-                logger.warning(f"Log input truncated to {Config.MAX_LOG_LENGTH} characters")
-            
-            prompt = f"""
+    async def _generate(self, prompt: str):
+        """Run a blocking generate_content call off the event loop."""
+        return await asyncio.to_thread(self.model.generate_content, prompt)
+    
+    @staticmethod
+    def _build_summary_prompt(logs: str, context: Optional[str] = None) -> str:
+        """Build the structured summarization prompt for a block of logs."""
+        context_section = ""
+        if context:
+            context_section = f"""
+            The logs below are only the new activity of an ongoing monitoring session. Update the running
+            assessment with it: keep earlier findings that still matter and say what changed.
+
+            RUNNING ASSESSMENT:
+            {context}
+            """
+        return f"""
             You are a cybersecurity expert analyzing system logs. Please provide a structured summary of the following logs focusing on:
 
             1. **Security Events**: Any potential security incidents, failed logins, unauthorized access attempts
@@ -41,13 +67,74 @@ class GeminiService:
 
             Format your response as a clear, structured analysis that can be used for threat detection.
 
+            Repeated lines may be collapsed into templates written as "[xCOUNT first..last] template {{n: example values}}",
+            where <*> marks the n-th variable field; treat COUNT as the number of occurrences.
+            {context_section}
             SYSTEM LOGS:
             {logs}
 
             SUMMARY:    
             """
+    
+    @staticmethod
+    def _build_reduce_prompt(partial_summaries: List[str]) -> str:
+        """Build the prompt that merges partial segment summaries into one."""
+        joined = "\n\n".join(partial_summaries)
+        return f"""
+            You are a cybersecurity expert. The following are summaries of consecutive segments of the same system log.
+            Merge them into a single structured summary of the whole log, focusing on:
+
+            1. **Security Events**: Any potential security incidents, failed logins, unauthorized access attempts
+            2. **System Activities**: Key system operations, service starts/stops, configuration changes
+            3. **Network Activities**: Network connections, data transfers, unusual traffic patterns
+            4. **Error Patterns**: Recurring errors, system failures, anomalies
+            5. **Timeline**: Key events in chronological order across all segments
+            6. **Potential Threats**: Any indicators of compromise or suspicious activities
+
+            Deduplicate repeated findings, keep concrete indicators (IPs, users, hosts, processes) and
+            note activity that spans several segments.
+
+            SEGMENT SUMMARIES:
+            {joined}
+
+            SUMMARY:
+            """
+    
+    async def summarize_logs(self, logs: str, context: Optional[str] = None) -> str:
+        """
+        Summarize system logs using Gemini AI.
+        
+        Logs longer than Config.MAX_LOG_LENGTH are summarized in chunked
+        (map-reduce) mode when Config.SUMMARY_CHUNKING_ENABLED is set, and
+        truncated otherwise. Identical concurrent requests share one call.
+        
+        Args:
+            logs (str): Raw system logs to summarize
+            context (str): Running assessment of earlier windows of a monitoring
+                session; the logs are then only the session's new activity
             
-            response = self.model.generate_content(prompt)
+        Returns:
+            str: Summarized and structured log analysis
+        """
+        return await self._summarize_flight.do(
+            make_key("summarize", logs, context or ""),
+            lambda: self._summarize_logs(logs, context)
+        )
+    
+    async def _summarize_logs(self, logs: str, context: Optional[str] = None) -> str:
+        """Summarize logs without request coalescing."""
+        try:
+            if len(logs) > Config.MAX_LOG_LENGTH:
+                if Config.SUMMARY_CHUNKING_ENABLED:
+                    return await self._summarize_logs_chunked(logs, context)
+                
+                # Truncate logs if they're too long
+                logs = logs[:Config.MAX_LOG_LENGTH] + "... (truncated)"
+                logger.warning(f"Log input truncated to {Config.MAX_LOG_LENGTH} characters")
+            
+            prompt = self._build_summary_prompt(logs, context)
+            
+            response = await self._generate(prompt)
             
             if response and response.text:
                 logger.info("Successfully generated log summary")
@@ -60,10 +147,112 @@ class GeminiService:
             logger.error(f"Error in log summarization: {str(e)}")
             return f"Error generating summary: {str(e)}"
     
+    async def _summarize_logs_chunked(self, logs: str, context: Optional[str] = None) -> str:
+        """
+        Summarize large logs by summarizing line-aligned chunks concurrently
+        (map) and merging the partial summaries (reduce).
+        
+        Args:
+            logs (str): Raw system logs, larger than Config.MAX_LOG_LENGTH
+            context (str): Running session assessment, merged in as the first
+                partial summary
+            
+        Returns:
+            str: Merged summary of the whole input
+        """
+        chunks = split_log_chunks(logs, Config.SUMMARY_CHUNK_TOKENS)
+        total = len(chunks)
+        semaphore = asyncio.Semaphore(max(1, Config.SUMMARY_MAX_CONCURRENCY))
+        logger.info(
+            f"Summarizing {len(logs)} characters in {total} chunks "
+            f"(~{Config.SUMMARY_CHUNK_TOKENS} tokens each, concurrency {Config.SUMMARY_MAX_CONCURRENCY})"
+        )
+        
+        async def summarize_chunk(chunk: str) -> str:
+            async with semaphore:
+                response = await self._generate(self._build_summary_prompt(chunk))
+            if not response or not response.text:
+                raise ValueError("empty response from AI service")
+            return response.text.strip()
+        
+        results = await asyncio.gather(
+            *(summarize_chunk(chunk) for chunk in chunks),
+            return_exceptions=True
+        )
+        
+        partials = []
+        failed = 0
+        for index, result in enumerate(results, start=1):
+            if isinstance(result, BaseException):
+                failed += 1
+                logger.warning(f"Failed to summarize log chunk {index}/{total}: {str(result)}")
+            else:
+                partials.append(f"[Segment {index}/{total}]\n{result}")
+        
+        if not partials:
+            return "Error generating summary: all log chunks failed to summarize"
+        if context:
+            partials.insert(0, f"[Earlier windows of this monitoring session]\n{context}")
+        
+        summary = await self._reduce_summaries(partials, semaphore)
+        if failed:
+            summary += f"\n\nNote: {failed} of {total} log segments could not be summarized."
+        
+        logger.info(f"Successfully generated chunked log summary from {total} chunks")
+        return summary
+    
+    async def _reduce_summaries(self, partials: List[str], semaphore: asyncio.Semaphore) -> str:
+        """
+        Merge partial summaries, reducing in groups of SUMMARY_REDUCE_FAN_IN so that
+        very large inputs take a logarithmic number of sequential reduce rounds.
+        """
+        while len(partials) > 1:
+            groups = [
+                partials[i:i + self.SUMMARY_REDUCE_FAN_IN]
+                for i in range(0, len(partials), self.SUMMARY_REDUCE_FAN_IN)
+            ]
+            
+            async def reduce_group(group: List[str]) -> str:
+                if len(group) == 1:
+                    return group[0]
+                try:
+                    async with semaphore:
+                        response = await self._generate(self._build_reduce_prompt(group))
+                    if response and response.text:
+                        return response.text.strip()
+                    logger.warning("Empty response while merging partial summaries")
+                except Exception as e:
+                    logger.warning(f"Failed to merge partial summaries: {str(e)}")
+                # Fall back to the unmerged partials rather than losing them
+                return "\n\n".join(group)
+            
+            partials = list(await asyncio.gather(*(reduce_group(group) for group in groups)))
+        
+        return partials[0]
+    
+    # Instructions shared by single and batched enhancement prompts
+    ENHANCEMENT_INSTRUCTIONS = """Please provide:
+            1. **Threat Assessment**: Overall threat level and confidence
+            2. **Attack Vector Analysis**: How the techniques relate to observed activities
+            3. **Potential Impact**: What could happen if this is a real attack
+            4. **Recommended Actions**: Immediate steps for investigation and mitigation
+            5. **IOCs to Monitor**: Specific indicators to watch for"""
+    
+    @staticmethod
+    def _format_techniques(attack_techniques: list) -> str:
+        """Format matched techniques as a compact bullet list for prompts."""
+        return "\n".join([
+            f"- {tech.get('name', 'Unknown')}: {tech.get('description', 'No description')[:200]}..."
+            for tech in attack_techniques
+        ])
+    
     async def enhance_threat_analysis(self, summary: str, attack_techniques: list) -> str:
         """
         Enhance the threat analysis by correlating with MITRE ATT&CK techniques.
         
+        When Config.ENHANCEMENT_BATCHING_ENABLED is set, concurrent calls are
+        micro-batched into a single multi-item prompt.
+        
         Args:
             summary (str): Log summary
             attack_techniques (list): Matched MITRE ATT&CK techniques
@@ -71,11 +260,14 @@ class GeminiService:
         Returns:
             str: Enhanced analysis with threat intelligence
         """
+        if self.enhancement_batcher:
+            return await self.enhancement_batcher.submit(summary, attack_techniques)
+        return await self._enhance_threat_analysis_single(summary, attack_techniques)
+    
+    async def _enhance_threat_analysis_single(self, summary: str, attack_techniques: list) -> str:
+        """Enhance a single analysis with its own Gemini call."""
         try:
-            techniques_text = "\n".join([
-                f"- {tech.get('name', 'Unknown')}: {tech.get('description', 'No description')[:200]}..."
-                for tech in attack_techniques
-            ])
+            techniques_text = self._format_techniques(attack_techniques)
             
             prompt = f"""
             Based on the following log summary and matching MITRE ATT&CK techniques, provide a comprehensive threat analysis:
@@ -86,17 +278,12 @@ class GeminiService:
             MATCHING ATT&CK TECHNIQUES:
             {techniques_text}
 
-            Please provide:
-            1. **Threat Assessment**: Overall threat level and confidence
-            2. **Attack Vector Analysis**: How the techniques relate to observed activities
-            3. **Potential Impact**: What could happen if this is a real attack
-            4. **Recommended Actions**: Immediate steps for investigation and mitigation
-            5. **IOCs to Monitor**: Specific indicators to watch for
+            {self.ENHANCEMENT_INSTRUCTIONS}
 
             ENHANCED ANALYSIS:
             """
             
-            response = self.model.generate_content(prompt)
+            response = await self._generate(prompt)
             
             if response and response.text:
                 logger.info("Successfully generated enhanced threat analysis")
@@ -109,6 +296,13 @@ class GeminiService:
             logger.error(f"Error in threat analysis enhancement: {str(e)}")
             return f"Error enhancing analysis: {str(e)}"
     
+    def get_metrics(self) -> dict:
+        """Runtime metrics for the Gemini service and its helpers."""
+        metrics = {"summarize_coalescing": self._summarize_flight.get_metrics()}
+        if self.enhancement_batcher:
+            metrics["enhancement_batching"] = self.enhancement_batcher.get_metrics()
+        return metrics
+    
     async def generate_conversational_response(self, query: str, context: str) -> str:
         """
         Generate a conversational response about MITRE ATT&CK using context.
@@ -0,0 +1,242 @@
+"""
+MongoDB index bootstrap and query plan verification.
+
+All indexes the API relies on are declared here and created at startup with
+``create_indexes``, which is a no-op for indexes that already exist with the
+same specification. ``explain_hot_queries`` runs ``explain()`` on the queries
+behind history, dedup, stats, analytics, monitoring sessions, auth and job
+polling and flags any whose winning plan contains a COLLSCAN, i.e. a query
+that will get slower as the collection grows.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from db import database
+from core import Config, logger
+
+# The auth and users routers address the users as ``database.user_collection``,
+# i.e. the collection named "user_collection"
+USERS_COLLECTION = "user_collection"
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "analysis_results": [
+        # History: a user's analyses, newest first (keyset pages on timestamp, _id)
+        IndexModel([("user_id", ASCENDING), ("analysis_timestamp", DESCENDING), ("_id", DESCENDING)],
+                   name="user_recent"),
+        # Dedup lookups: newest analysis of identical logs for a user
+        IndexModel([("user_id", ASCENDING), ("logs_hmac", ASCENDING), ("analysis_timestamp", DESCENDING)],
+                   name="user_logs_hmac_recent"),
+        # Stats: counts and timing samples over a period; also enforces retention
+        IndexModel([("analysis_timestamp", DESCENDING)], name="recent",
+                   **({"expireAfterSeconds": Config.ANALYSIS_RETENTION_DAYS * 86400}
+                      if Config.ANALYSIS_RETENTION_DAYS > 0 else {}))
+    ],
+    "monitoring_sessions": [
+        IndexModel([("session_id", ASCENDING)], unique=True, name="session_id"),
+        # Session listings, all or active only, newest first
+        IndexModel([("username", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_recent"),
+        IndexModel([("username", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_status_recent"),
+        IndexModel([("status", ASCENDING)], name="status")
+    ],
+    USERS_COLLECTION: [
+        # Not unique: registration only rejects duplicate emails
+        IndexModel([("username", ASCENDING)], name="username"),
+        IndexModel([("email", ASCENDING)], unique=True, name="email")
+    ],
+    "analysis_jobs": [
+        IndexModel([("job_id", ASCENDING)], unique=True, name="job_id"),
+        # Recovery of queued and orphaned running jobs, oldest first
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created")
+    ],
+    "analysis_rollups": [
+        # One lifetime (day null) and one document per day for each user
+        IndexModel([("user_id", ASCENDING), ("period", ASCENDING), ("day", ASCENDING)], unique=True,
+                   name="user_period_day")
+    ],
+    "analysis_session_state": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)], unique=True, name="user_session"),
+        # Idle sessions expire at their expires_at
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="session_expiry")
+    ]
+}
+
+
+def _hot_queries() -> List[Dict[str, Any]]:
+    """Representative shapes of the frequent queries; values are placeholders."""
+    since = datetime.utcnow() - timedelta(days=30)
+    return [
+        {"name": "analysis_history", "collection": "analysis_results",
+         "filter": {"user_id": "u"}, "sort": [("analysis_timestamp", DESCENDING), ("_id", DESCENDING)], "limit": 51},
+        {"name": "analysis_by_id", "collection": "analysis_results",
+         "filter": {"user_id": "u", "_id": ObjectId()}},
+        {"name": "analysis_dedup", "collection": "analysis_results",
+         "filter": {"user_id": "u", "logs_hmac": "h", "enhance_with_ai": True, "max_results": 5,
+                    "analysis_timestamp": {"$gte": since}},
+         "sort": [("analysis_timestamp", DESCENDING)], "limit": 1},
+        {"name": "analysis_stats", "collection": "analysis_results",
+         "filter": {"analysis_timestamp": {"$gte": since}},
+         "sort": [("analysis_timestamp", DESCENDING)], "limit": 5000},
+        {"name": "monitoring_session", "collection": "monitoring_sessions",
+         "filter": {"session_id": "s"}},
+        {"name": "active_sessions", "collection": "monitoring_sessions",
+         "filter": {"username": "u", "status": "active"}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)]},
+        {"name": "user_sessions", "collection": "monitoring_sessions",
+         "filter": {"username": "u"}, "sort": [("created_at", DESCENDING), ("_id", DESCENDING)], "limit": 51},
+        {"name": "active_session_count", "collection": "monitoring_sessions",
+         "filter": {"status": "active"}},
+        {"name": "user_by_username", "collection": USERS_COLLECTION,
+         "filter": {"username": "u"}},
+        {"name": "user_by_email", "collection": USERS_COLLECTION,
+         "filter": {"email": "u@example.com"}},
+        {"name": "analysis_job_status", "collection": "analysis_jobs",
+         "filter": {"job_id": "j", "user_id": "u"}},
+        {"name": "analysis_job_recovery", "collection": "analysis_jobs",
+         "filter": {"$or": [{"status": "queued"}, {"status": "running", "heartbeat_at": {"$lt": since}},
+                            {"status": "running", "heartbeat_at": None, "started_at": {"$lt": since}}],
+                    "job_id": {"$nin": ["j"]}},
+         "sort": [("created_at", ASCENDING)]},
+        {"name": "analytics_timeline", "collection": "analysis_rollups",
+         "filter": {"user_id": "u", "period": "day", "day": {"$gte": since}}, "sort": [("day", ASCENDING)]},
+        {"name": "analysis_session_state", "collection": "analysis_session_state",
+         "filter": {"user_id": "u", "session_id": "s"}}
+    ]
+
+
+def plan_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stages and indexes of an explain() result's winning plan.
+
+    Handles both classic plans and slot-based engine plans, whose classic
+    shape sits under ``winningPlan.queryPlan``.
+    """
+    stages: List[str] = []
+    indexes: Set[str] = set()
+
+    def walk(stage: Dict[str, Any]) -> None:
+        if "queryPlan" in stage:
+            stage = stage["queryPlan"]
+        if stage.get("stage"):
+            stages.append(stage["stage"])
+        if stage.get("indexName"):
+            indexes.add(stage["indexName"])
+        for child in [stage.get("inputStage")] + list(stage.get("inputStages") or []):
+            if child:
+                walk(child)
+
+    walk(explain.get("queryPlanner", {}).get("winningPlan", {}))
+    return {"stages": stages, "indexes": sorted(indexes), "collscan": "COLLSCAN" in stages}
+
+
+class IndexManager:
+    """Creates the declared indexes and checks the hot queries use them."""
+
+    def __init__(self, indexes: Optional[Dict[str, List[IndexModel]]] = None):
+        self.indexes = indexes or INDEXES
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._metrics = {
+            "created": {},
+            "failures": 0,
+            "ensure_ms": 0.0
+        }
+
+    async def ensure_indexes(self) -> Dict[str, List[str]]:
+        """
+        Create every declared index; existing ones are left as they are.
+
+        A failure on one collection (e.g. a unique index over duplicate
+        documents) is logged and does not stop the others.
+
+        Returns:
+            Dict[str, List[str]]: Index names confirmed per collection
+        """
+        started = time.perf_counter()
+        created = {}
+        for name, models in self.indexes.items():
+            try:
+                await self._sync_ttl(name, models)
+                created[name] = await database.get_collection(name).create_indexes(models)
+            except Exception as e:
+                self._metrics["failures"] += 1
+                logger.error(f"Failed to create indexes on {name}: {str(e)}")
+        self._metrics["created"] = created
+        self._metrics["ensure_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(f"Ensured MongoDB indexes on {len(created)} collections")
+        return created
+
+    async def _sync_ttl(self, name: str, models: List[IndexModel]) -> None:
+        """
+        Apply changed TTLs to existing indexes with collMod.
+
+        create_indexes rejects an existing index whose expireAfterSeconds
+        differs, so a changed retention setting is applied in place. A TTL
+        can't be removed this way: the index has to be dropped for that.
+        """
+        existing = await database.get_collection(name).index_information()
+        for model in models:
+            spec = model.document
+            current = existing.get(spec["name"])
+            if current is None or current.get("expireAfterSeconds") == spec.get("expireAfterSeconds"):
+                continue
+            if "expireAfterSeconds" not in spec:
+                logger.warning(f"Index {spec['name']} on {name} still expires documents after "
+                               f"{current['expireAfterSeconds']}s; drop it to disable expiry")
+                # Keep the existing TTL so create_indexes does not conflict
+                spec["expireAfterSeconds"] = current["expireAfterSeconds"]
+                continue
+            await database.command(
+                "collMod", name, index={"name": spec["name"], "expireAfterSeconds": spec["expireAfterSeconds"]}
+            )
+            logger.info(f"Set TTL of index {spec['name']} on {name} to {spec['expireAfterSeconds']}s")
+
+    async def explain_hot_queries(self) -> Dict[str, Any]:
+        """
+        Run explain() on the hot queries and flag collection scans.
+
+        Returns:
+            Dict with a per-query plan summary under "queries" and the names
+            of queries planned as a COLLSCAN under "collscans" (and those
+            explain() failed on under "errors")
+        """
+        queries = {}
+        for query in _hot_queries():
+            collection = database.get_collection(query["collection"])
+            try:
+                cursor = collection.find(query["filter"])
+                if query.get("sort"):
+                    cursor = cursor.sort(query["sort"])
+                if query.get("limit"):
+                    cursor = cursor.limit(query["limit"])
+                queries[query["name"]] = {"collection": query["collection"], **plan_summary(await cursor.explain())}
+            except Exception as e:
+                queries[query["name"]] = {"collection": query["collection"], "error": str(e)}
+
+        collscans = [name for name, summary in queries.items() if summary.get("collscan")]
+        for name in collscans:
+            logger.warning(f"Query '{name}' on {queries[name]['collection']} is planned as a COLLSCAN")
+        errors = [name for name, summary in queries.items() if "error" in summary]
+        if errors:
+            logger.warning(f"Could not explain queries {errors}: {queries[errors[0]]['error']}")
+        self.last_report = {
+            "checked_at": datetime.utcnow().isoformat(),
+            "queries": queries,
+            "collscans": collscans,
+            "errors": errors
+        }
+        return self.last_report
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Indexes ensured at startup and the last query plan check."""
+        metrics = dict(self._metrics)
+        if self.last_report is not None:
+            metrics["collscans"] = self.last_report["collscans"]
+            metrics["plan_checked_at"] = self.last_report["checked_at"]
+        return metrics
+
+index_manager = IndexManager()
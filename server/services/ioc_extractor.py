@@ -0,0 +1,348 @@
+"""
+Indicator of compromise (IOC) extraction.
+
+Extracts IPv4/IPv6 addresses, domains, URLs, emails, MD5/SHA1/SHA256 hashes,
+file paths and Windows registry keys from log text in a single pass.
+
+The text is split into tokens and deduplicated with C-level string
+operations; only distinct tokens containing an indicator character
+(``. : / \\ @``) or shaped like a hex digest are classified, each with one
+precompiled anchored pattern chosen by those characters. Candidates are
+validated (IP ranges via ``ipaddress``, domain TLDs against a known list,
+hash shapes). Windows paths containing spaces are matched whole before the
+text is split. A regex alternation scanned over the raw text was measured at
+under 2 MB/s in CPython; see benchmark_ioc_extractor.py.
+``IOCExtractor.feed`` accepts the text in pieces, so streamed uploads are
+scanned block by block without keeping the raw file.
+"""
+
+import ipaddress
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from core import Config
+
+# Result keys, in output order
+IOC_TYPES = (
+    "ipv4", "ipv6", "domains", "urls", "emails", "md5", "sha1", "sha256", "file_paths", "registry_keys"
+)
+
+# Generic and commonly seen country-code TLDs. Country codes that collide with
+# file extensions seen in logs (.sh, .py, .pl, .md, .so, .rs, .ps, ...) are
+# deliberately left out; hosts of URLs are accepted regardless of TLD.
+KNOWN_TLDS = frozenset("""
+    com net org edu gov mil int info biz name pro mobi app dev io ai co me tv cc xyz online site top club
+    shop store tech cloud live news blog link click space website host win bid loan work party review
+    trade date download stream racing cricket science ru cn uk us de fr nl eu jp kr in br au ca it es
+    ch se no fi dk pl be at cz hu ro ua by kz tr ir il sa ae pk bd vn th id my sg hk tw ph nz za ng
+    eg ar mx cl pe ve gr pt ie lt lv ee su tk ml ga cf gq ws to onion local internal corp lan arpa
+""".split())
+
+# Characters that separate tokens besides whitespace. '=' is handled per
+# token (key=value) because URLs contain it.
+_DELIMITERS = str.maketrans({char: " " for char in "\"'`<>()[]{},;|"})
+
+# Punctuation picked up from prose, e.g. "see http://x.test/a)." or "from 10.0.0.1."
+TRAILING_PUNCTUATION = ".,;!?)]}>'\""
+
+# Tokens worth classifying contain one of these (or are hash-length)
+_CANDIDATE_CHARS = re.compile(r"[.:/\\@=]")
+_HASH_LENGTHS = {32: "md5", 40: "sha1", 64: "sha256"}
+
+_LABEL = r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?"
+
+URL_PATTERN = re.compile(r"(?:https?|ftp|sftp|wss?)://[^\s\"'<>`]+", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(rf"[A-Za-z0-9._%+-]+@((?:{_LABEL}\.)+[A-Za-z]{{2,63}})")
+REGISTRY_PATTERN = re.compile(
+    r"(?:HKEY_(?:LOCAL_MACHINE|CURRENT_USER|CLASSES_ROOT|USERS|CURRENT_CONFIG)|HK(?:LM|CU|CR|U|CC))\\.+",
+    re.IGNORECASE
+)
+_WINDOWS_PATH_PREFIX = r"(?:[A-Za-z]:|\\\\[\w.$-]+)\\"
+WINDOWS_PATH_PATTERN = re.compile(rf"{_WINDOWS_PATH_PREFIX}[^/:*?\"<>|]*")
+# Windows paths may contain spaces ("C:\Program Files (x86)\App\a.exe"), which
+# splitting on whitespace would cut. A quoted path runs to the closing quote; an
+# unquoted one takes directory names up to each backslash, spaces included, and
+# ends at the first whitespace of the last component. A directory name with
+# spaces must not start with a dotted word, so "C:\a.exe by CORP\alice" stops
+# at the file name.
+_PATH_CHARS = r"[^\\/:*?\"<>|\s]"
+WINDOWS_SPACED_PATH_PATTERN = re.compile(
+    rf"\"({_WINDOWS_PATH_PREFIX}[^\"\r\n:*?<>|]*)\""
+    rf"|({_WINDOWS_PATH_PREFIX}"
+    rf"(?:(?:[^\\/:*?\"<>|\s.]+(?: [^\\/:*?\"<>|\r\n]*)?|{_PATH_CHARS}+)\\)*{_PATH_CHARS}*)"
+)
+UNIX_PATH_PATTERN = re.compile(r"(?:~|\.{1,2})/(?:[\w.@+-]+/)*[\w.@+-]+|/(?:[\w.@+-]+/)+[\w.@+-]+")
+IPV4_PATTERN = re.compile(r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}")
+IPV6_PATTERN = re.compile(r"[0-9A-Fa-f:]+(?:%\w+)?|[0-9A-Fa-f:]+:\d{1,3}(?:\.\d{1,3}){3}")
+DOMAIN_PATTERN = re.compile(rf"(?:{_LABEL}\.)+[A-Za-z]{{2,63}}")
+HEX_PATTERN = re.compile(r"[0-9A-Fa-f]+")
+
+
+def _is_hex_digest(value: str) -> bool:
+    # Reject runs of one or two characters and pure decimal numbers
+    return len(set(value)) > 2 and not value.isdigit()
+
+
+def _windows_path_starts(text: str) -> Iterator[int]:
+    # Offsets of "X:\" and "\\" in order, found with str.find: a regex scan
+    # for the drive letter would try a match at every letter of the text
+    drive = text.find(":\\")
+    unc = text.find("\\\\")
+    while drive != -1 or unc != -1:
+        if unc == -1 or (drive != -1 and drive - 1 < unc):
+            if drive:
+                yield drive - 1
+            drive = text.find(":\\", drive + 2)
+        else:
+            yield unc
+            unc = text.find("\\\\", unc + 2)
+
+
+def _may_contain_space(text: str, begin: int) -> bool:
+    # Cheap test mirroring WINDOWS_SPACED_PATH_PATTERN: an unquoted path can only
+    # hold a space if a backslash follows the first space on its line and the
+    # name before that space has no dot
+    line_end = text.find("\n", begin)
+    if line_end == -1:
+        line_end = len(text)
+    space = text.find(" ", begin, line_end)
+    if space == -1 or text.find("\\", space, line_end) == -1:
+        return False
+    return "." not in text[text.rfind("\\", begin, space) + 1:space]
+
+
+class IOCExtractor:
+    """
+    Accumulates deduplicated indicators from one log source.
+
+    At most ``max_per_type`` distinct values are kept per indicator type; the
+    rest are only counted, so memory stays bounded on large uploads.
+    """
+
+    # Bound on the cache of already classified tokens
+    SEEN_TOKENS_LIMIT = 100_000
+
+    def __init__(self, max_per_type: Optional[int] = None):
+        self.max_per_type = max_per_type or Config.IOC_MAX_PER_TYPE
+        self._found: Dict[str, Dict[str, None]] = {ioc_type: {} for ioc_type in IOC_TYPES}
+        # Tokens already classified, so values repeated across blocks are skipped cheaply
+        self._seen: Dict[str, None] = {}
+        self.dropped = 0
+        self.rejected = 0
+        self.input_chars = 0
+        self.scan_seconds = 0.0
+
+    def feed(self, text: str) -> None:
+        """Scan one piece of log text; pieces should end on token (ideally line) boundaries."""
+        started = time.perf_counter()
+        self.input_chars += len(text)
+        seen = self._seen
+        candidate = _CANDIDATE_CHARS.search
+        if ":\\" in text or "\\\\" in text:
+            text = self._take_spaced_paths(text)
+        for token in dict.fromkeys(text.translate(_DELIMITERS).split()):
+            if token in seen:
+                continue
+            if len(seen) < self.SEEN_TOKENS_LIMIT:
+                seen[token] = None
+            if len(token) in _HASH_LENGTHS or candidate(token):
+                self._classify(token)
+        self.scan_seconds += time.perf_counter() - started
+
+    def _take_spaced_paths(self, text: str) -> str:
+        # Paths with spaces are added whole and blanked out before tokenizing;
+        # others are left to the token pass
+        pieces = []
+        end = 0
+        for begin in _windows_path_starts(text):
+            if begin < end:
+                continue
+            match = None
+            if begin and text[begin - 1] == '"':
+                match = WINDOWS_SPACED_PATH_PATTERN.match(text, begin - 1)
+            elif not _may_contain_space(text, begin):
+                continue
+            match = match or WINDOWS_SPACED_PATH_PATTERN.match(text, begin)
+            if not match:
+                continue
+            quoted, path = match.groups()
+            path = quoted or path.rstrip(TRAILING_PUNCTUATION)
+            if " " not in path:
+                continue
+            self._add("file_paths", path.rstrip())
+            pieces.append(text[end:match.start()])
+            end = match.end()
+        if not pieces:
+            return text
+        pieces.append(text[end:])
+        return " ".join(pieces)
+
+    def _classify(self, token: str) -> None:
+        token = token.rstrip(TRAILING_PUNCTUATION)
+        if "://" in token:
+            match = URL_PATTERN.search(token)
+            if match:
+                self._add_url(match.group().rstrip(TRAILING_PUNCTUATION))
+                return
+        if "=" in token:
+            # key=value pairs (SRC=203.0.113.5, Image=C:\...)
+            token = token.rpartition("=")[2]
+
+        if "@" in token:
+            match = EMAIL_PATTERN.fullmatch(token)
+            if match and match.group(1).rsplit(".", 1)[1].lower() in KNOWN_TLDS:
+                self._add("emails", token.lower())
+            return
+        if "\\" in token:
+            if REGISTRY_PATTERN.fullmatch(token):
+                self._add("registry_keys", token)
+            elif WINDOWS_PATH_PATTERN.fullmatch(token):
+                self._add("file_paths", token)
+            return
+        if "/" in token:
+            if UNIX_PATH_PATTERN.fullmatch(token):
+                self._add("file_paths", token)
+                return
+            # CIDR notation (10.0.0.0/8)
+            token = token.partition("/")[0]
+
+        if ":" in token:
+            colons = token.count(":")
+            if colons >= 2:
+                # Full form has 7 colons, compressed form has "::"; times like 10:22:31 have neither
+                if (colons == 7 or "::" in token) and IPV6_PATTERN.fullmatch(token):
+                    self._add_ip(token.partition("%")[0])
+                return
+            left, _, right = token.partition(":")
+            # host:port, or label:value (MD5:..., src:10.0.0.1)
+            token = left if not right or right.isdigit() else right
+
+        if "." in token:
+            if IPV4_PATTERN.fullmatch(token):
+                if self._is_full("ipv4", token):
+                    return
+                self._add_ip(token)
+            elif DOMAIN_PATTERN.fullmatch(token):
+                self._add_domain(token)
+        elif len(token) in _HASH_LENGTHS and HEX_PATTERN.fullmatch(token):
+            if _is_hex_digest(token):
+                self._add(_HASH_LENGTHS[len(token)], token.lower())
+            else:
+                self.rejected += 1
+
+    def _is_full(self, ioc_type: str, value: str) -> bool:
+        # Lets callers skip validation of values that would be dropped anyway
+        if len(self._found[ioc_type]) >= self.max_per_type and value not in self._found[ioc_type]:
+            self.dropped += 1
+            return True
+        return False
+
+    def _add(self, ioc_type: str, value: str) -> None:
+        found = self._found[ioc_type]
+        if value in found:
+            return
+        if len(found) >= self.max_per_type:
+            self.dropped += 1
+            return
+        found[value] = None
+
+    def _add_ip(self, value: str) -> None:
+        try:
+            address = ipaddress.ip_address(value)
+        except ValueError:
+            # Octets above 255, malformed IPv6
+            self.rejected += 1
+            return
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        # 0.0.0.0, multicast and broadcast/reserved ranges are never attributable hosts
+        if address.is_unspecified or address.is_multicast or address.is_reserved:
+            self.rejected += 1
+            return
+        self._add("ipv4" if address.version == 4 else "ipv6", address.compressed)
+
+    def _add_domain(self, value: str, trusted: bool = False) -> None:
+        domain = value.lower().rstrip(".")
+        if "." not in domain or (not trusted and domain.rsplit(".", 1)[1] not in KNOWN_TLDS):
+            self.rejected += 1
+            return
+        self._add("domains", domain)
+
+    def _add_url(self, url: str) -> None:
+        self._add("urls", url)
+        host = re.split(r"[/?#]", url.split("://", 1)[1], 1)[0].rpartition("@")[2]
+        if host.startswith("["):
+            self._add_ip(host[1:].partition("]")[0])
+            return
+        if host.count(":") == 1:
+            host = host.partition(":")[0]
+        if IPV4_PATTERN.fullmatch(host):
+            self._add_ip(host)
+        elif DOMAIN_PATTERN.fullmatch(host):
+            # The scheme already marks it as a host, so any TLD is accepted
+            self._add_domain(host, trusted=True)
+
+    def results(self) -> Dict[str, List[str]]:
+        """Distinct indicators per type, in order of first appearance (empty types omitted)."""
+        return {ioc_type: list(values) for ioc_type, values in self._found.items() if values}
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts and throughput for this extractor."""
+        return {
+            "total": sum(len(values) for values in self._found.values()),
+            "dropped": self.dropped,
+            "rejected_candidates": self.rejected,
+            "input_chars": self.input_chars,
+            "scan_ms": round(self.scan_seconds * 1000, 3)
+        }
+
+
+class IOCExtractionStats:
+    """Aggregate extraction counters for the /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics = {
+            "extractions": 0,
+            "input_chars": 0,
+            "iocs": 0,
+            "scan_seconds": 0.0
+        }
+
+    def record(self, extractor: IOCExtractor) -> None:
+        self._metrics["extractions"] += 1
+        self._metrics["input_chars"] += extractor.input_chars
+        self._metrics["iocs"] += extractor.stats()["total"]
+        self._metrics["scan_seconds"] += extractor.scan_seconds
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Extraction counts and scan throughput."""
+        metrics = dict(self._metrics)
+        seconds = metrics.pop("scan_seconds")
+        metrics["throughput_mb_s"] = round(metrics["input_chars"] / seconds / 1e6, 2) if seconds else 0.0
+        return metrics
+
+
+ioc_extraction_stats = IOCExtractionStats()
+
+
+def extract_iocs(logs: str, max_per_type: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    Extract deduplicated indicators from a block of log text.
+
+    Args:
+        logs (str): Raw log text
+        max_per_type (int): Maximum distinct values kept per indicator type
+
+    Returns:
+        Dict[str, List[str]]: Indicator type -> distinct values (empty types omitted)
+    """
+    extractor = IOCExtractor(max_per_type=max_per_type)
+    extractor.feed(logs)
+    ioc_extraction_stats.record(extractor)
+    return extractor.results()
+
+
+def extract_iocs_from_log(log_message: str) -> Dict[str, List[str]]:
+    """Indicators in a single log message (used by the orchestrator pipeline)."""
+    return extract_iocs(log_message)
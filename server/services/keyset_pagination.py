@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination over (timestamp, _id).
+
+Listings sort newest first on a timestamp with ``_id`` as the tie-breaker, and
+the next page starts strictly after the last item of the previous one. With
+an index on the filter fields followed by (timestamp, _id) every page is an
+index range scan, however deep the client pages, unlike ``skip(offset)``,
+which walks past every skipped document.
+
+Continuation tokens are opaque to clients: the URL-safe base64 of the last
+item's sort key.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Response header carrying the token for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp: datetime, document_id: ObjectId) -> str:
+    """Continuation token for the page after the item with this sort key."""
+    key = json.dumps({"t": timestamp.isoformat(), "i": str(document_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """
+    Sort key encoded in a continuation token.
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return datetime.fromisoformat(key["t"]), ObjectId(key["i"])
+    except (ValueError, TypeError, KeyError, InvalidId) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def keyset_sort(field: str) -> List[Tuple[str, int]]:
+    """Newest-first sort on the timestamp field with _id as tie-breaker."""
+    return [(field, -1), ("_id", -1)]
+
+
+def keyset_query(query: Dict[str, Any], field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    Restrict a query to the items after the cursor in keyset_sort order.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return query
+    timestamp, document_id = decode_cursor(cursor)
+    return {
+        "$and": [
+            query,
+            {"$or": [
+                {field: {"$lt": timestamp}},
+                {field: timestamp, "_id": {"$lt": document_id}}
+            ]}
+        ]
+    }
+
+
+def page_cursor(documents: List[Dict[str, Any]], field: str, limit: int) -> Optional[str]:
+    """
+    Token for the page after ``documents``, fetched with ``limit + 1``.
+
+    Trims the look-ahead document in place; returns None on the last page.
+    """
+    if len(documents) <= limit:
+        return None
+    del documents[limit:]
+    last = documents[-1]
+    return encode_cursor(last[field], last["_id"]) if last.get(field) else None
@@ -0,0 +1,55 @@
+"""
+Helpers for splitting large log inputs into token-budgeted chunks.
+"""
+
+from typing import List
+
+# Rough characters-per-token ratio for English/log text with Gemini tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for chunk budgeting (no tokenizer round trip)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_log_chunks(logs: str, max_tokens: int) -> List[str]:
+    """
+    Split logs on line boundaries into chunks of at most ``max_tokens`` tokens.
+
+    Lines longer than the budget on their own are hard-split so that no chunk
+    ever exceeds the budget.
+
+    Args:
+        logs (str): Raw log text
+        max_tokens (int): Token budget per chunk
+
+    Returns:
+        List[str]: Non-empty log chunks in original order
+    """
+    max_chars = max(1, max_tokens) * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    for line in logs.splitlines(keepends=True):
+        # Oversized single line: flush what we have and hard-split it
+        if len(line) > max_chars:
+            if current:
+                chunks.append("".join(current))
+                current, current_len = [], 0
+            for i in range(0, len(line), max_chars):
+                chunks.append(line[i:i + max_chars])
+            continue
+
+        if current_len + len(line) > max_chars and current:
+            chunks.append("".join(current))
+            current, current_len = [], 0
+
+        current.append(line)
+        current_len += len(line)
+
+    if current:
+        chunks.append("".join(current))
+
+    return [chunk for chunk in chunks if chunk.strip()]
@@ -0,0 +1,347 @@
+"""
+Streaming multi-format log parser.
+
+Parses lines into compact records from RFC 5424 and RFC 3164 syslog, JSON
+lines, CEF and LEEF (bare or behind a syslog header), Apache/Nginx access logs
+and auditd ``key=value`` records. The format is detected on the first line of
+each source and cached; later lines try the cached format first and only fall
+back to detection when it stops matching, so a homogeneous source costs one
+anchored regex match per line.
+
+Records are plain dicts holding only the fields that were present:
+``format``, ``line``, ``timestamp``, ``host``, ``app``, ``pid``,
+``severity``, ``message`` and ``fields`` (format-specific key/values).
+Timestamps are kept as they appear in the source.
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+Record = Dict[str, Any]
+
+SYSLOG_SEVERITIES = ("emergency", "alert", "critical", "error", "warning", "notice", "info", "debug")
+
+_SYSLOG_TIMESTAMP = r"(?:[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d|\d{4}-\d\d-\d\dT\S+)"
+
+RFC5424_PATTERN = re.compile(
+    r"<(\d{1,3})>(\d{1,2}) (\S+) (\S+) (\S+) (\S+) (\S+) (-|(?:\[[^\]\\]*(?:\\.[^\]\\]*)*\])+)(?: (.*))?"
+)
+RFC3164_PATTERN = re.compile(
+    rf"(?:<(\d{{1,3}})>)?({_SYSLOG_TIMESTAMP}) (\S+) (?:([^\s:\[]+)(?:\[(\d+)\])?: ?)?(.*)"
+)
+# Syslog header in front of CEF/LEEF payloads
+SYSLOG_PREFIX_PATTERN = re.compile(rf"(?:<\d{{1,3}}>)?(?:\d )?({_SYSLOG_TIMESTAMP}) (\S+)")
+# Quoted string with backslash escapes, written as an unrolled loop (much
+# faster in re than an alternation per character)
+_QUOTED = r'"([^"\\]*(?:\\.[^"\\]*)*)"'
+ACCESS_LOG_PATTERN = re.compile(
+    rf'(\S+) (\S+) (\S+) \[([^\]]+)\] {_QUOTED} (\d{{3}}) (\d+|-)(?: {_QUOTED} {_QUOTED})?'
+)
+AUDIT_PATTERN = re.compile(r"type=(\S+) msg=audit\((\d+(?:\.\d+)?):(\d+)\): ?(.*)")
+AUDIT_FIELD_PATTERN = re.compile(r"""([\w-]+)=("[^"]*"|'[^']*'|\S*)""")
+# Start of each CEF extension key; values (which may contain spaces) run to the next key
+CEF_KEY_PATTERN = re.compile(r"(?:^|\s)(\w+)=")
+_UNESCAPED_PIPE = re.compile(r"(?<!\\)\|")
+# LEEF 2.0 delimiter given as a hex code point ("x09", "0x5E"); other values are literal
+LEEF_HEX_DELIMITER = re.compile(r"0?x([0-9a-f]{1,4})", re.IGNORECASE)
+
+# Well-known JSON keys mapped onto the common record fields
+JSON_KEYS = {
+    "timestamp": ("timestamp", "@timestamp", "time", "ts", "datetime"),
+    "host": ("host", "hostname", "host.name"),
+    "app": ("app", "service", "logger", "program", "source"),
+    "severity": ("level", "severity", "log.level", "levelname"),
+    "message": ("message", "msg", "log", "event")
+}
+
+
+def _nil(value: str) -> Optional[str]:
+    return None if value == "-" else value
+
+
+def _compact(record: Record) -> Record:
+    return {key: value for key, value in record.items() if value is not None and value != {}}
+
+
+def _syslog_severity(pri: Optional[str]) -> Optional[str]:
+    return SYSLOG_SEVERITIES[int(pri) % 8] if pri else None
+
+
+def parse_rfc5424(line: str) -> Optional[Record]:
+    match = RFC5424_PATTERN.match(line)
+    if not match:
+        return None
+    pri, _, timestamp, host, app, procid, msgid, structured, message = match.groups()
+    fields = {}
+    if msgid != "-":
+        fields["msgid"] = msgid
+    if structured != "-":
+        fields["structured_data"] = structured
+    return _compact({
+        "format": "rfc5424",
+        "timestamp": _nil(timestamp),
+        "host": _nil(host),
+        "app": _nil(app),
+        "pid": _nil(procid),
+        "severity": _syslog_severity(pri),
+        "message": (message or "").lstrip("\ufeff"),
+        "fields": fields
+    })
+
+
+def parse_rfc3164(line: str) -> Optional[Record]:
+    match = RFC3164_PATTERN.match(line)
+    if not match:
+        return None
+    pri, timestamp, host, app, pid, message = match.groups()
+    return _compact({
+        "format": "rfc3164",
+        "timestamp": timestamp,
+        "host": host,
+        "app": app,
+        "pid": pid,
+        "severity": _syslog_severity(pri),
+        "message": message
+    })
+
+
+def parse_json(line: str) -> Optional[Record]:
+    if not line.startswith("{"):
+        return None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    record: Record = {"format": "json"}
+    for field, keys in JSON_KEYS.items():
+        for key in keys:
+            value = data.pop(key, None)
+            if value is not None:
+                record[field] = value if isinstance(value, str) else json.dumps(value) if field == "message" else value
+                break
+    if data:
+        record["fields"] = data
+    return record
+
+
+def parse_access_log(line: str) -> Optional[Record]:
+    match = ACCESS_LOG_PATTERN.match(line)
+    if not match:
+        return None
+    client, ident, user, timestamp, request, status, size, referer, user_agent = match.groups()
+    method, _, rest = request.partition(" ")
+    path = rest.rpartition(" ")[0] if rest.count(" ") else rest
+    return _compact({
+        "format": "access",
+        "timestamp": timestamp,
+        "message": request,
+        "fields": _compact({
+            "client": client,
+            "user": _nil(user),
+            "method": method or None,
+            "path": path or None,
+            "status": int(status),
+            "bytes": int(size) if size != "-" else None,
+            "referer": _nil(referer) if referer else None,
+            "user_agent": _nil(user_agent) if user_agent else None
+        })
+    })
+
+
+def parse_auditd(line: str) -> Optional[Record]:
+    if not line.startswith("type="):
+        return None
+    match = AUDIT_PATTERN.match(line)
+    if not match:
+        return None
+    record_type, timestamp, serial, rest = match.groups()
+    fields = {"type": record_type, "serial": serial}
+    for key, value in AUDIT_FIELD_PATTERN.findall(rest):
+        fields[key] = value[1:-1] if value[:1] in ("'", '"') else value
+    return {
+        "format": "auditd",
+        "timestamp": timestamp,
+        "message": rest,
+        "fields": fields
+    }
+
+
+def _prefix_header(prefix: str) -> Dict[str, str]:
+    match = SYSLOG_PREFIX_PATTERN.match(prefix.strip())
+    return {"timestamp": match.group(1), "host": match.group(2)} if match else {}
+
+
+def parse_cef(line: str) -> Optional[Record]:
+    start = line.find("CEF:")
+    if start < 0:
+        return None
+    parts = _UNESCAPED_PIPE.split(line[start + 4:], 7)
+    if len(parts) < 8:
+        return None
+    _, vendor, product, version, signature_id, name, severity, extension = parts
+    extensions = {}
+    keys = list(CEF_KEY_PATTERN.finditer(extension))
+    for index, key in enumerate(keys):
+        end = keys[index + 1].start() if index + 1 < len(keys) else len(extension)
+        extensions[key.group(1)] = extension[key.end():end].strip()
+    header = _prefix_header(line[:start])
+    return _compact({
+        "format": "cef",
+        "timestamp": extensions.pop("rt", None) or header.get("timestamp"),
+        "host": extensions.pop("dvchost", None) or header.get("host"),
+        "app": f"{vendor} {product}".strip() or None,
+        "severity": severity or None,
+        "message": name,
+        "fields": {"device_version": version, "signature_id": signature_id, **extensions}
+    })
+
+
+def parse_leef(line: str) -> Optional[Record]:
+    start = line.find("LEEF:")
+    if start < 0:
+        return None
+    body = line[start + 5:]
+    version_2 = body.startswith("2")
+    parts = body.split("|", 6 if version_2 else 5)
+    if len(parts) < (7 if version_2 else 6):
+        return None
+    _, vendor, product, version, event_id = parts[:5]
+    delimiter = "\t"
+    if version_2:
+        delimiter = parts[5] or "\t"
+        hex_code = LEEF_HEX_DELIMITER.fullmatch(delimiter)
+        if hex_code:
+            delimiter = chr(int(hex_code.group(1), 16))
+        if not delimiter.strip("\x00"):
+            return None
+    attributes = {}
+    for pair in parts[-1].split(delimiter):
+        key, sep, value = pair.partition("=")
+        if sep and key:
+            attributes[key.strip()] = value
+    header = _prefix_header(line[:start])
+    return _compact({
+        "format": "leef",
+        "timestamp": attributes.pop("devTime", None) or header.get("timestamp"),
+        "host": header.get("host"),
+        "app": f"{vendor} {product}".strip() or None,
+        "severity": attributes.pop("sev", None),
+        "message": event_id,
+        "fields": {"device_version": version, **attributes}
+    })
+
+
+# Detection order: the most specific markers first, syslog last among the
+# timestamped formats because CEF/LEEF often arrive behind a syslog header
+PARSERS: Dict[str, Callable[[str], Optional[Record]]] = {
+    "cef": parse_cef,
+    "leef": parse_leef,
+    "json": parse_json,
+    "auditd": parse_auditd,
+    "rfc5424": parse_rfc5424,
+    "access": parse_access_log,
+    "rfc3164": parse_rfc3164
+}
+
+
+def _parse_unstructured(line: str) -> Record:
+    return {"format": "unstructured", "message": line}
+
+
+class LogParser:
+    """Parses log lines, caching the detected format per source."""
+
+    def __init__(self, max_sources: int = 1024):
+        self.max_sources = max_sources
+        self._formats: Dict[str, str] = {}
+        self._metrics: Dict[str, Any] = {
+            "lines": 0,
+            "detections": 0,
+            "unstructured": 0,
+            "by_format": {}
+        }
+
+    def detect_format(self, line: str) -> Optional[str]:
+        """Name of the first format that parses the line, or None."""
+        for name, parser in PARSERS.items():
+            if parser(line) is not None:
+                return name
+        return None
+
+    def parse_line(self, line: str, source: str = "default") -> Record:
+        """Parse one line, trying the source's cached format first."""
+        cached = self._formats.get(source)
+        record = PARSERS[cached](line) if cached else None
+        if record is None:
+            self._metrics["detections"] += 1
+            for name, parser in PARSERS.items():
+                if name == cached:
+                    continue
+                record = parser(line)
+                if record is not None:
+                    if source in self._formats or len(self._formats) < self.max_sources:
+                        self._formats[source] = name
+                    break
+            else:
+                record = _parse_unstructured(line)
+                self._metrics["unstructured"] += 1
+        by_format = self._metrics["by_format"]
+        by_format[record["format"]] = by_format.get(record["format"], 0) + 1
+        return record
+
+    def parse_lines(self, lines: Iterable[str], source: str = "default") -> Iterator[Record]:
+        """
+        Lazily parse an iterable of lines (e.g. an open file) into records.
+
+        Args:
+            lines: Log lines; trailing newlines are stripped and blank lines skipped
+            source: Identifier of the log source (file name, host, stream)
+                whose detected format is cached
+
+        Yields:
+            Record: One compact record per non-blank line, with its 1-based
+            line number in ``line``
+        """
+        for number, line in enumerate(lines, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                continue
+            self._metrics["lines"] += 1
+            record = self.parse_line(line, source)
+            record["line"] = number
+            yield record
+
+    def source_format(self, source: str) -> Optional[str]:
+        """Format currently cached for a source."""
+        return self._formats.get(source)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Parsed line counts per format and detection (cache miss) count."""
+        metrics = dict(self._metrics)
+        metrics["by_format"] = dict(metrics["by_format"])
+        metrics["sources"] = len(self._formats)
+        return metrics
+
+
+log_parser = LogParser()
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Lines of a text block without materializing a list of them."""
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def parse_text(text: str, source: str = "default") -> List[Record]:
+    """Parse a block of log text into records."""
+    return list(log_parser.parse_lines(iter_lines(text), source))
@@ -0,0 +1,288 @@
+"""
+Drain-style log template mining.
+
+Repetitive log lines (auth failures, cron runs, connection churn) usually
+differ only in a PID, address or port. The miner streams lines through a
+fixed-depth prefix tree, groups them into templates where the variable parts
+are replaced by ``<*>``, and keeps per-template counts, a few example values
+for each variable and the first/last timestamps seen. The rendered result is
+a much smaller, lossy-but-faithful stand-in for the raw log text.
+
+Reference: He et al., "Drain: An Online Log Parsing Approach with Fixed Depth
+Tree" (ICWS 2017).
+
+The CLI ships a copy as aiagent/log_template_miner.py; refresh it with
+aiagent/sync_shared_modules.py after changing this module.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+WILDCARD = "<*>"
+COMPACTED_HEADER = "# log templates:"
+
+# Leading timestamps, tried in order (ISO 8601, syslog, US date)
+TIMESTAMP_PATTERNS = [
+    re.compile(r"^\[?(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\]?\s*"),
+    re.compile(r"^\[?([A-Z][a-z]{2} +\d{1,2} \d{2}:\d{2}:\d{2})\]?\s*"),
+    re.compile(r"^\[?(\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2})\]?\s*"),
+]
+
+# Whole tokens that are always variables
+VARIABLE_TOKEN = re.compile(
+    r"^(?:"
+    r"\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?"                      # IPv4[:port]
+    r"|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}"  # UUID
+    r"|0x[0-9a-fA-F]+"                                        # hex literal
+    r"|[0-9a-fA-F]{16,}"                                      # hashes, session ids
+    r"|[-+]?\d+(?:\.\d+)?[a-zA-Z%]{0,3}"                      # numbers, sizes, durations
+    r")[,;:.]?$"
+)
+# Variable fragments inside otherwise constant tokens: sshd[1234]: / pid=42 / port=22
+INLINE_VARIABLE = re.compile(r"(?<=\[)\d+(?=\])|(?<==)[^\s,;)\]]+")
+
+
+def _has_digit(token: str) -> bool:
+    return any(ch.isdigit() for ch in token)
+
+
+class LogCluster:
+    """One mined template with its occurrence statistics."""
+
+    __slots__ = ("cluster_id", "template", "count", "first_timestamp", "last_timestamp",
+                 "first_line", "examples", "distinct")
+
+    def __init__(self, cluster_id: int, template: List[str], line: str, timestamp: Optional[str]):
+        self.cluster_id = cluster_id
+        self.template = template
+        self.count = 0
+        self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.first_line = line
+        self.examples: Dict[int, List[str]] = {}
+        self.distinct: Dict[int, set] = {}
+
+    def template_text(self) -> str:
+        return " ".join(self.template)
+
+
+class LogTemplateMiner:
+    """
+    Streaming Drain miner.
+
+    The tree is root -> token count -> first ``depth - 2`` tokens -> leaf list
+    of clusters. A line joins the most similar cluster in its leaf when at
+    least ``similarity`` of the constant template tokens match, otherwise it
+    starts a new cluster. Where both tokens are digit-free (``Failed`` vs
+    ``Accepted``, user names) they must match exactly, since they tell two
+    events apart; a mismatch there starts a new cluster. Memory is bounded by ``max_clusters``; lines beyond
+    that go to an overflow counter rather than growing the tree.
+    """
+
+    MAX_EXAMPLES = 3
+    MAX_TRACKED_DISTINCT = 64
+
+    def __init__(self, depth: int = 4, similarity: float = 0.4, max_children: int = 100,
+                 max_clusters: int = 5000):
+        self.depth = max(3, depth)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self._root: Dict[Any, Any] = {}
+        self.clusters: List[LogCluster] = []
+        self.input_lines = 0
+        self.input_chars = 0
+        self.overflow_lines = 0
+
+    def add_lines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.add_line(line)
+
+    def add_line(self, line: str) -> Optional[LogCluster]:
+        """Mine one raw log line; returns the cluster it was assigned to."""
+        line = line.rstrip("\r\n")
+        self.input_chars += len(line) + 1
+        stripped = line.strip()
+        if not stripped:
+            return None
+        self.input_lines += 1
+
+        timestamp, body = self._split_timestamp(stripped)
+        raw_tokens = body.split()
+        tokens = [self._mask_token(token) for token in raw_tokens]
+
+        leaf = self._leaf_for(tokens)
+        cluster = self._best_match(leaf, tokens)
+        if cluster is None:
+            if len(self.clusters) >= self.max_clusters:
+                self.overflow_lines += 1
+                return None
+            cluster = LogCluster(len(self.clusters), list(tokens), stripped, timestamp)
+            leaf.append(cluster)
+            self.clusters.append(cluster)
+        else:
+            self._merge(cluster, tokens)
+
+        cluster.count += 1
+        if timestamp:
+            cluster.first_timestamp = cluster.first_timestamp or timestamp
+            cluster.last_timestamp = timestamp
+        self._record_variables(cluster, raw_tokens)
+        return cluster
+
+    @staticmethod
+    def _split_timestamp(line: str) -> Tuple[Optional[str], str]:
+        for pattern in TIMESTAMP_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                return match.group(1), line[match.end():]
+        return None, line
+
+    @staticmethod
+    def _mask_token(token: str) -> str:
+        if VARIABLE_TOKEN.match(token):
+            return WILDCARD
+        return INLINE_VARIABLE.sub(WILDCARD, token)
+
+    def _leaf_for(self, tokens: List[str]) -> List[LogCluster]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            key = WILDCARD if _has_digit(token) else token
+            child = node.get(key)
+            if child is None:
+                if len(node) >= self.max_children:
+                    key = WILDCARD
+                child = node.setdefault(key, {})
+            node = child
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf: List[LogCluster], tokens: List[str]) -> Optional[LogCluster]:
+        best, best_score, best_params = None, -1.0, -1
+        for cluster in leaf:
+            matched = params = 0
+            for template_token, token in zip(cluster.template, tokens):
+                if template_token == WILDCARD:
+                    params += 1
+                elif template_token == token:
+                    matched += 1
+                elif not _has_digit(template_token) and not _has_digit(token):
+                    break
+            else:
+                constant = len(tokens) - params
+                score = matched / constant if constant else 1.0
+                if score > best_score or (score == best_score and params > best_params):
+                    best, best_score, best_params = cluster, score, params
+        if best is not None and best_score >= self.similarity:
+            return best
+        return None
+
+    def _merge(self, cluster: LogCluster, tokens: List[str]) -> None:
+        for index, (template_token, token) in enumerate(zip(cluster.template, tokens)):
+            if template_token != token and template_token != WILDCARD:
+                # Position turned variable: keep the value it used to hold as an example
+                cluster.template[index] = WILDCARD
+                cluster.examples.pop(index, None)
+                cluster.distinct.pop(index, None)
+                self._remember(cluster, index, template_token)
+
+    def _record_variables(self, cluster: LogCluster, raw_tokens: List[str]) -> None:
+        for index, template_token in enumerate(cluster.template):
+            if WILDCARD in template_token and index < len(raw_tokens):
+                self._remember(cluster, index, self._variable_value(template_token, raw_tokens[index]))
+
+    @staticmethod
+    def _variable_value(template_token: str, raw_token: str) -> str:
+        if template_token == WILDCARD:
+            return raw_token
+        # Inline variable such as sshd[<*>]: -> report only the variable part
+        prefix, _, suffix = template_token.partition(WILDCARD)
+        if raw_token.startswith(prefix) and raw_token.endswith(suffix) and len(raw_token) > len(prefix) + len(suffix):
+            return raw_token[len(prefix):len(raw_token) - len(suffix)]
+        return raw_token
+
+    def _remember(self, cluster: LogCluster, index: int, value: str) -> None:
+        distinct = cluster.distinct.setdefault(index, set())
+        if value in distinct or len(distinct) >= self.MAX_TRACKED_DISTINCT:
+            return
+        distinct.add(value)
+        examples = cluster.examples.setdefault(index, [])
+        if len(examples) < self.MAX_EXAMPLES:
+            examples.append(value)
+
+    def render(self) -> str:
+        """
+        Render the mined templates in order of first appearance.
+
+        Templates seen once are emitted as their original line; repeated ones
+        as ``[xCOUNT first..last] template {var: examples}``.
+        """
+        lines = [f"{COMPACTED_HEADER} {self.input_lines} lines -> {len(self.clusters)} templates "
+                 f"([xCOUNT first..last] template {{variable examples}})"]
+        for cluster in self.clusters:
+            if cluster.count == 1:
+                lines.append(cluster.first_line)
+                continue
+
+            if cluster.first_timestamp and cluster.first_timestamp != cluster.last_timestamp:
+                span = f" {cluster.first_timestamp}..{cluster.last_timestamp}"
+            elif cluster.first_timestamp:
+                span = f" {cluster.first_timestamp}"
+            else:
+                span = ""
+
+            variables = []
+            for position, index in enumerate(sorted(cluster.examples), start=1):
+                distinct = cluster.distinct[index]
+                suffix = ""
+                if len(distinct) >= self.MAX_TRACKED_DISTINCT:
+                    suffix = f" ({len(distinct)}+ distinct)"
+                elif len(distinct) > len(cluster.examples[index]):
+                    suffix = f" (+{len(distinct) - len(cluster.examples[index])} more)"
+                variables.append(f"{position}: {', '.join(cluster.examples[index])}{suffix}")
+            variable_text = f" {{{'; '.join(variables)}}}" if variables else ""
+
+            lines.append(f"[x{cluster.count}{span}] {cluster.template_text()}{variable_text}")
+
+        if self.overflow_lines:
+            lines.append(f"[x{self.overflow_lines}] (lines beyond the template limit omitted)")
+        return "\n".join(lines)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Line, template and overflow counters for the lines mined so far."""
+        return {
+            "input_lines": self.input_lines,
+            "templates": len(self.clusters),
+            "input_chars": self.input_chars,
+            "overflow_lines": self.overflow_lines
+        }
+
+
+def compact_logs(logs: str, depth: int = 4, similarity: float = 0.4) -> Tuple[str, Dict[str, Any]]:
+    """
+    Collapse raw logs into mined templates.
+
+    Args:
+        logs (str): Raw log text
+        depth (int): Prefix tree depth
+        similarity (float): Minimum fraction of matching constant tokens to join a template
+
+    Returns:
+        Tuple[str, Dict[str, Any]]: Text to send downstream and compression stats.
+        The original logs are returned (``applied`` False) when mining would
+        not make them smaller or they are already compacted.
+    """
+    if logs.lstrip().startswith(COMPACTED_HEADER):
+        stats = {"input_chars": len(logs)}
+        output = logs
+    else:
+        miner = LogTemplateMiner(depth=depth, similarity=similarity)
+        miner.add_lines(logs.splitlines())
+        compacted = miner.render()
+        stats = miner.get_stats()
+        stats["input_chars"] = len(logs)
+        output = compacted if len(compacted) < len(logs) else logs
+
+    stats["applied"] = output is not logs
+    stats["output_chars"] = len(output)
+    stats["compression_ratio"] = round(len(logs) / len(output), 2) if output else 1.0
+    return output, stats
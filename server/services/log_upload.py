@@ -0,0 +1,212 @@
+"""
+Streaming ingestion of large, optionally compressed log uploads.
+
+The request body is decompressed (gzip or zstd), decoded and split into lines
+chunk by chunk. Lines are mined into templates as they arrive and, when the
+prefilter is enabled, scanned block by block so the suspicious lines can be
+mined separately; indicators of compromise are extracted from each block
+as well. Only the bounded template state is kept, never the raw
+file, so memory does not grow with the upload size. Lines longer than
+UPLOAD_MAX_LINE_CHARS (or input without newlines) are truncated to that
+length rather than buffered whole.
+"""
+
+import asyncio
+import codecs
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from core import Config
+from core.compression import DecompressionError, make_decoder
+from services.ioc_extractor import IOCExtractor, ioc_extraction_stats
+from services.log_template_miner import LogTemplateMiner
+from services.security_prefilter import security_prefilter
+
+# Gap markers the prefilter inserts between kept lines
+OMITTED_MARKER = re.compile(r"^\.\.\. \(\d+ lines omitted\)$")
+
+
+class UploadError(ValueError):
+    """Raised for uploads that cannot be ingested; ``status_code`` is the HTTP status to return."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LogUploadIngestor:
+    """
+    Incrementally decompresses and mines an uploaded log stream.
+
+    ``feed`` is CPU-bound and is meant to run in a worker thread.
+    """
+
+    def __init__(self, encoding: str = "identity", max_bytes: Optional[int] = None,
+                 block_lines: Optional[int] = None, max_line_chars: Optional[int] = None):
+        self.encoding = (encoding or "identity").strip().lower()
+        try:
+            self._decoder = make_decoder(self.encoding)
+        except ValueError as e:
+            raise UploadError(str(e), 415)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.max_bytes = max_bytes or Config.UPLOAD_MAX_BYTES
+        self.block_lines = max(1, block_lines or Config.UPLOAD_BLOCK_LINES)
+        self.max_line_chars = max(1, max_line_chars or Config.UPLOAD_MAX_LINE_CHARS)
+
+        depth, similarity = Config.LOG_TEMPLATE_DEPTH, Config.LOG_TEMPLATE_SIMILARITY
+        self._all_lines = LogTemplateMiner(depth=depth, similarity=similarity)
+        self._suspicious_lines = LogTemplateMiner(depth=depth, similarity=similarity)
+        self._iocs = IOCExtractor() if Config.IOC_EXTRACTION_ENABLED else None
+        self._partial = ""
+        # Set after a truncated line was flushed, until its newline arrives
+        self._skipping_line = False
+        self._block: List[str] = []
+
+        self.compressed_bytes = 0
+        self.uncompressed_bytes = 0
+        self.suspicious_blocks = 0
+        self.truncated_lines = 0
+        self.parse_seconds = 0.0
+
+    def feed(self, data: bytes) -> None:
+        """Ingest one chunk of the raw request body."""
+        started = time.perf_counter()
+        self.compressed_bytes += len(data)
+        # Each decompressed piece is ingested (and size-checked) before the next is produced
+        self._ingest_decoded(self._decoder.decode(data))
+        self.parse_seconds += time.perf_counter() - started
+
+    def finish(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        Flush the stream and render the mined templates.
+
+        Returns:
+            Tuple[str, Dict[str, Any]]: Compacted logs for the analysis pipeline
+            and upload statistics
+        """
+        started = time.perf_counter()
+        self._ingest_decoded(self._decoder.flush())
+        self._ingest_text(self._text_decoder.decode(b"", final=True))
+        if self._partial:
+            self._block.append(self._partial)
+            self._partial = ""
+        self._process_block()
+
+        # Analyze the suspicious lines when there are any; otherwise the whole
+        # file's templates (the pipeline's prefilter then decides what to do)
+        miner = self._suspicious_lines if self._suspicious_lines.input_lines else self._all_lines
+        logs = miner.render() if miner.input_lines else ""
+        self.parse_seconds += time.perf_counter() - started
+
+        stats = {
+            "encoding": self.encoding,
+            "compressed_bytes": self.compressed_bytes,
+            "uncompressed_bytes": self.uncompressed_bytes,
+            "compression_ratio": round(self.uncompressed_bytes / self.compressed_bytes, 2) if self.compressed_bytes else 1.0,
+            "lines": self._all_lines.input_lines,
+            "templates": len(self._all_lines.clusters),
+            "suspicious_lines": self._suspicious_lines.input_lines,
+            "suspicious_blocks": self.suspicious_blocks,
+            "truncated_lines": self.truncated_lines,
+            "output_chars": len(logs),
+            "iocs": self._iocs.stats()["total"] if self._iocs else 0,
+            "parse_ms": round(self.parse_seconds * 1000, 3),
+            "parse_mb_per_second": round(self.uncompressed_bytes / self.parse_seconds / 1e6, 2) if self.parse_seconds else 0.0
+        }
+        return logs, stats
+
+    def iocs(self) -> Optional[Dict[str, List[str]]]:
+        """Indicators extracted from the whole upload, or None when extraction is disabled."""
+        if self._iocs is None:
+            return None
+        ioc_extraction_stats.record(self._iocs)
+        return self._iocs.results()
+
+    def _ingest_decoded(self, outputs: Iterator[bytes]) -> None:
+        try:
+            for output in outputs:
+                self._ingest_bytes(output)
+        except DecompressionError as e:
+            raise UploadError(str(e))
+
+    def _ingest_bytes(self, data: bytes) -> None:
+        if not data:
+            return
+        self.uncompressed_bytes += len(data)
+        if self.uncompressed_bytes > self.max_bytes:
+            raise UploadError(f"Upload exceeds {self.max_bytes} bytes uncompressed", 413)
+        self._ingest_text(self._text_decoder.decode(data))
+
+    def _ingest_text(self, text: str) -> None:
+        if not text:
+            return
+        lines = text.split("\n")
+        tail = lines.pop()
+        if lines:
+            if self._skipping_line:
+                # Rest of a line that was already flushed truncated
+                lines.pop(0)
+                self._skipping_line = False
+            else:
+                lines[0] = self._partial + lines[0]
+            self._partial = ""
+            for line in lines:
+                self._add_line(line)
+        if self._skipping_line:
+            return
+        self._partial += tail
+        if len(self._partial) > self.max_line_chars:
+            self._add_line(self._partial)
+            self._partial = ""
+            self._skipping_line = True
+
+    def _add_line(self, line: str) -> None:
+        if len(line) > self.max_line_chars:
+            line = line[:self.max_line_chars]
+            self.truncated_lines += 1
+        self._block.append(line)
+        if len(self._block) >= self.block_lines:
+            self._process_block()
+
+    def _process_block(self) -> None:
+        if not self._block:
+            return
+        block, self._block = self._block, []
+        self._all_lines.add_lines(block)
+        if self._iocs is None and not Config.PREFILTER_ENABLED:
+            return
+
+        text = "\n".join(block)
+        if self._iocs is not None:
+            self._iocs.feed(text)
+        if not Config.PREFILTER_ENABLED:
+            return
+
+        result = security_prefilter.scan(text)
+        if result["verdict"] == "suspicious":
+            self.suspicious_blocks += 1
+            self._suspicious_lines.add_lines(
+                line for line in result["filtered_logs"].split("\n") if not OMITTED_MARKER.match(line)
+            )
+
+
+async def ingest_log_stream(chunks: AsyncIterator[bytes], ingestor: LogUploadIngestor,
+                            batch_bytes: int = 1024 * 1024) -> Tuple[str, Dict[str, Any]]:
+    """
+    Feed a request body stream through an ingestor off the event loop.
+
+    Chunks are grouped into ``batch_bytes`` batches so each worker-thread hop
+    does a meaningful amount of decompression and mining.
+    """
+    pending: List[bytes] = []
+    pending_size = 0
+    async for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= batch_bytes:
+            await asyncio.to_thread(ingestor.feed, b"".join(pending))
+            pending, pending_size = [], 0
+    if pending:
+        await asyncio.to_thread(ingestor.feed, b"".join(pending))
+    return await asyncio.to_thread(ingestor.finish)
@@ -0,0 +1,162 @@
+"""
+Priority lanes for analysis jobs.
+
+Jobs are classified into lanes by severity and request type:
+
+- ``urgent``: the client's severity score (e.g. AIAgent's) or the monitoring
+  session's current severity is at least Config.ANALYSIS_URGENT_SEVERITY
+- ``interactive``: a user waiting on /analyze
+- ``monitoring``: periodic windows of a monitoring session
+- ``backfill``: bulk and historical analyses
+
+Lanes are served by weighted fair queuing: every lane carries a virtual time
+that advances by ``1 / weight`` per dispatched job, and the non-empty lane
+with the smallest virtual time goes next, so with weights 8:4:2:1 a busy
+backfill lane still gets one slot in fifteen. A lane that was idle rejoins at
+the current virtual time instead of cashing in credit it built up while
+empty. Starvation protection: a job that waited longer than
+``max_wait_seconds`` is dispatched next regardless of its lane.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from core import Config
+from core.metrics import percentiles
+
+# Lanes in tie-break order
+LANES = ("urgent", "interactive", "monitoring", "backfill")
+REQUEST_TYPE_LANES = {"interactive": "interactive", "monitoring": "monitoring", "backfill": "backfill"}
+DEFAULT_LANE_WEIGHTS = {"urgent": 8.0, "interactive": 4.0, "monitoring": 2.0, "backfill": 1.0}
+
+# Kill chain phases that raise a technique's severity (same weighting as the CLI's AIAgent)
+CRITICAL_PHASES = frozenset(("execution", "persistence", "privilege-escalation", "exfiltration"))
+
+
+def parse_lane_weights(spec: str) -> Dict[str, float]:
+    """
+    Parse ``"lane:weight,..."``; lanes not listed keep their default weight.
+
+    Raises:
+        ValueError: On unknown lanes or non-positive weights
+    """
+    weights = dict(DEFAULT_LANE_WEIGHTS)
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        lane, _, weight = entry.partition(":")
+        lane = lane.strip().lower()
+        if lane not in weights:
+            raise ValueError(f"Unknown analysis lane '{lane}'")
+        weights[lane] = float(weight)
+        if weights[lane] <= 0:
+            raise ValueError(f"Weight of analysis lane '{lane}' must be positive")
+    return weights
+
+
+def technique_severity(techniques) -> float:
+    """Severity score (0-1) of matched techniques: the highest relevance, x1.5 for critical phases."""
+    scores = [
+        min(technique.get("relevance_score", 0.0) * (1.5 if CRITICAL_PHASES.intersection(
+            technique.get("kill_chain_phases", [])) else 1.0), 1.0)
+        for technique in techniques
+    ]
+    return max(scores, default=0.0)
+
+
+def classify_lane(request, session_severity: Optional[float] = None) -> str:
+    """
+    Lane for an analysis request.
+
+    Args:
+        request: LogAnalysisRequest
+        session_severity: Current severity score of the request's monitoring
+            session, if known
+
+    Returns:
+        str: One of LANES
+    """
+    severity = max(request.severity_score or 0.0, session_severity or 0.0)
+    if severity >= Config.ANALYSIS_URGENT_SEVERITY:
+        return "urgent"
+    if request.request_type:
+        return REQUEST_TYPE_LANES[request.request_type]
+    return "monitoring" if request.session_id else "interactive"
+
+
+class LaneScheduler:
+    """Weighted fair queue of job IDs over the analysis lanes."""
+
+    # Recent queue waits kept per lane for the percentiles in get_metrics
+    WAIT_SAMPLES = 1000
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, max_wait_seconds: Optional[float] = None):
+        self.weights = weights or parse_lane_weights(Config.ANALYSIS_LANE_WEIGHTS)
+        self.max_wait_seconds = max_wait_seconds or Config.ANALYSIS_LANE_MAX_WAIT_SECONDS
+        self._lanes: Dict[str, Deque[Tuple[str, float]]] = {lane: deque() for lane in LANES}
+        self._virtual_time = {lane: 0.0 for lane in LANES}
+        self._clock = 0.0
+        self._available = asyncio.Semaphore(0)
+        self._waits: Dict[str, Deque[float]] = {lane: deque(maxlen=self.WAIT_SAMPLES) for lane in LANES}
+        self._metrics = {lane: {"enqueued": 0, "dispatched": 0, "promoted": 0} for lane in LANES}
+
+    def qsize(self, lane: Optional[str] = None) -> int:
+        """Queued jobs in one lane, or in all of them."""
+        if lane is not None:
+            return len(self._lanes[lane])
+        return sum(len(entries) for entries in self._lanes.values())
+
+    def put_nowait(self, job_id: str, lane: str) -> None:
+        entries = self._lanes[lane]
+        if not entries:
+            # Rejoin at the current virtual time: no credit for time spent idle
+            self._virtual_time[lane] = max(self._virtual_time[lane], self._clock)
+        entries.append((job_id, time.monotonic()))
+        self._metrics[lane]["enqueued"] += 1
+        self._available.release()
+
+    async def get(self) -> Tuple[str, str, float]:
+        """
+        Wait for the next job.
+
+        Returns:
+            Tuple[str, str, float]: Job ID, lane and seconds it waited in the queue
+        """
+        await self._available.acquire()
+        now = time.monotonic()
+        lane = self._overdue_lane(now)
+        if lane is not None:
+            self._metrics[lane]["promoted"] += 1
+        else:
+            lane = min(
+                (lane for lane in LANES if self._lanes[lane]),
+                key=lambda lane: self._virtual_time[lane]
+            )
+        job_id, enqueued = self._lanes[lane].popleft()
+        self._clock = self._virtual_time[lane]
+        self._virtual_time[lane] += 1.0 / self.weights[lane]
+
+        wait = now - enqueued
+        self._waits[lane].append(wait)
+        self._metrics[lane]["dispatched"] += 1
+        return job_id, lane, wait
+
+    def _overdue_lane(self, now: float) -> Optional[str]:
+        oldest_lane, oldest = None, now - self.max_wait_seconds
+        for lane in LANES:
+            entries = self._lanes[lane]
+            if entries and entries[0][1] <= oldest:
+                oldest_lane, oldest = lane, entries[0][1]
+        return oldest_lane
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-lane weight, depth, counters and queue wait percentiles (ms)."""
+        metrics = {}
+        for lane in LANES:
+            metrics[lane] = {
+                "weight": self.weights[lane],
+                "queued": len(self._lanes[lane]),
+                **self._metrics[lane],
+                "queue_wait_ms": percentiles(wait * 1000 for wait in self._waits[lane])
+            }
+        return metrics
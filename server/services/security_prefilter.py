@@ -0,0 +1,217 @@
+"""
+Local security-signal prefilter.
+
+Runs one compiled multi-keyword regex (a trie-factored alternation) over the
+incoming logs, scores fixed-size windows of lines by the weight of the
+keywords they contain and keeps only the suspicious lines (plus surrounding
+context) for the LLM.
+Windows without enough signal can be answered with a cheap "no findings"
+result instead of a Gemini summarization and a vector search.
+"""
+
+import bisect
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from core import Config
+
+# keyword -> weight; matched case-insensitively on word boundaries
+DEFAULT_KEYWORDS: Dict[str, int] = {
+    # Strong indicators of compromise or attacker tooling
+    "mimikatz": 5, "lsass": 5, "reverse shell": 5, "/etc/shadow": 5, "privilege escalation": 5,
+    "ransomware": 5, "malware": 5, "exploit": 5, "backdoor": 5, "rootkit": 5, "psexec": 5,
+    "powershell -enc": 5, "encodedcommand": 5, "certutil": 5, "nc -e": 5, "base64 -d": 5,
+    # Authentication and access-control failures, persistence and account changes
+    "failed password": 3, "authentication failure": 3, "invalid user": 3, "brute force": 3,
+    "unauthorized": 3, "permission denied": 3, "access denied": 3, "intrusion": 3,
+    "attack": 3, "suspicious": 3, "malicious": 3, "breach": 3, "useradd": 3, "usermod": 3,
+    "chmod 777": 3, "crontab": 3, "ufw block": 3, "possible break-in": 3, "segfault": 3,
+    # Successful privileged access (interactive root sessions only: cron opens
+    # root sessions all the time), sudo commands and downloads piped into a shell
+    "accepted password for root": 3, "accepted publickey for root": 3,
+    "accepted keyboard-interactive/pam for root": 3,
+    "sshd:session): session opened for user root": 3, "login:session): session opened for user root": 3,
+    "su:session): session opened for user root": 3, "su-l:session): session opened for user root": 3,
+    "command=": 2, "| sh": 5, "|sh": 5, "| bash": 5, "|bash": 5,
+    # Weak signals that only matter in bulk
+    "failed": 1, "failure": 1, "denied": 1, "refused": 1, "blocked": 1, "dropped": 1,
+    "error": 1, "sudo": 1, "su:": 1, "login": 1, "curl": 1, "wget": 1,
+}
+
+
+def parse_keywords(spec: str) -> Dict[str, int]:
+    """
+    Parse a ``keyword[:weight],...`` list (weight defaults to 1).
+
+    Example: ``"failed password:3,mimikatz:5,error"``
+    """
+    keywords = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        keyword, sep, weight = item.rpartition(":")
+        if sep and weight.strip().isdigit() and keyword.strip():
+            keywords[keyword.strip().lower()] = int(weight)
+        else:
+            keywords[item.lower()] = 1
+    return keywords
+
+
+def build_keyword_pattern(keywords: Iterable[str], ignore_case: bool = False) -> "re.Pattern":
+    """
+    Compile all keywords into one regex.
+
+    The alternation is factored into a character trie (``fail(?:ed|ure)``)
+    because the re module tries alternatives one by one; sharing prefixes keeps
+    the per-position cost close to a single literal match. Word boundaries
+    only apply at keyword edges that are word characters, so ``command=``
+    matches ``COMMAND=ls`` and ``|sh`` matches ``x.sh|sh``. The leading
+    boundary is checked after the first character (``c(?<!\w.)``) rather than
+    before it, which keeps the regex's first-character scan.
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def to_regex(node: Dict[str, Any], root: bool = False) -> str:
+        branches = []
+        for char, child in sorted(node.items()):
+            if not char:
+                continue
+            head = re.escape(char)
+            if root and (char.isalnum() or char == "_"):
+                head += r"(?<!\w.)"
+            branches.append(head + to_regex(child))
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return re.compile(rf"(?:{to_regex(trie, root=True)})(?:(?!\w)|(?<=\W))", re.IGNORECASE if ignore_case else 0)
+
+
+class SecurityPrefilter:
+    """Scores log windows with a single combined keyword regex."""
+
+    def __init__(self, keywords: Optional[Dict[str, int]] = None, window_lines: Optional[int] = None,
+                 context_lines: Optional[int] = None, min_score: Optional[int] = None):
+        if keywords is None:
+            keywords = parse_keywords(Config.PREFILTER_KEYWORDS) if Config.PREFILTER_KEYWORDS else DEFAULT_KEYWORDS
+        self.keywords = {k.lower(): w for k, w in keywords.items()}
+        self.pattern = build_keyword_pattern(self.keywords)
+        self._pattern_ignore_case = build_keyword_pattern(self.keywords, ignore_case=True)
+        self.window_lines = max(1, window_lines or Config.PREFILTER_WINDOW_LINES)
+        self.context_lines = Config.PREFILTER_CONTEXT_LINES if context_lines is None else max(0, context_lines)
+        self.min_score = Config.PREFILTER_MIN_SCORE if min_score is None else min_score
+        self._metrics = {
+            "scans": 0,
+            "no_findings": 0,
+            "input_chars": 0,
+            "kept_chars": 0,
+            "scan_seconds": 0.0
+        }
+
+    def scan(self, logs: str) -> Dict[str, Any]:
+        """
+        Score the logs and extract the suspicious lines with context.
+
+        Args:
+            logs (str): Raw log text
+
+        Returns:
+            Dict[str, Any]: ``verdict`` ("suspicious" or "no_findings"),
+            ``filtered_logs`` and scoring statistics
+        """
+        started = time.perf_counter()
+        lines = logs.split("\n")
+
+        # Offsets of each line start, so a single finditer over the whole text
+        # can be mapped back to line numbers without per-line regex calls
+        line_starts = [0]
+        for line in lines[:-1]:
+            line_starts.append(line_starts[-1] + len(line) + 1)
+        if lines and not lines[-1]:
+            lines.pop()
+
+        # Matching lowercased text is much faster than re.IGNORECASE; fall back to
+        # it only when lowercasing would shift offsets (a few non-ASCII letters)
+        text = logs.lower()
+        pattern = self.pattern
+        if len(text) != len(logs):
+            text, pattern = logs, self._pattern_ignore_case
+
+        line_scores: Dict[int, int] = {}
+        hits: Counter = Counter()
+        for match in pattern.finditer(text):
+            keyword = match.group(0).lower()
+            line_number = bisect.bisect_right(line_starts, match.start()) - 1
+            line_scores[line_number] = line_scores.get(line_number, 0) + self.keywords.get(keyword, 1)
+            hits[keyword] += 1
+
+        window_scores: Dict[int, int] = {}
+        for line_number, score in line_scores.items():
+            window = line_number // self.window_lines
+            window_scores[window] = window_scores.get(window, 0) + score
+        suspicious_windows = {w for w, score in window_scores.items() if score >= self.min_score}
+
+        keep = set()
+        for line_number in line_scores:
+            if line_number // self.window_lines in suspicious_windows:
+                keep.update(range(max(0, line_number - self.context_lines),
+                                  min(len(lines), line_number + self.context_lines + 1)))
+
+        filtered_logs = self._render(lines, sorted(keep))
+        elapsed = time.perf_counter() - started
+        verdict = "suspicious" if suspicious_windows else "no_findings"
+
+        self._metrics["scans"] += 1
+        self._metrics["input_chars"] += len(logs)
+        self._metrics["kept_chars"] += len(filtered_logs)
+        self._metrics["scan_seconds"] += elapsed
+        if verdict == "no_findings":
+            self._metrics["no_findings"] += 1
+
+        return {
+            "verdict": verdict,
+            "filtered_logs": filtered_logs,
+            "score": max(window_scores.values(), default=0),
+            "total_lines": len(lines),
+            "matched_lines": len(line_scores),
+            "kept_lines": len(keep),
+            "windows": (len(lines) + self.window_lines - 1) // self.window_lines,
+            "suspicious_windows": len(suspicious_windows),
+            "top_keywords": dict(hits.most_common(10)),
+            "scan_ms": round(elapsed * 1000, 3)
+        }
+
+    @staticmethod
+    def _render(lines: List[str], kept: List[int]) -> str:
+        output = []
+        previous = -1
+        for line_number in kept:
+            if line_number > previous + 1:
+                output.append(f"... ({line_number - previous - 1} lines omitted)")
+            output.append(lines[line_number])
+            previous = line_number
+        if kept and previous < len(lines) - 1:
+            output.append(f"... ({len(lines) - previous - 1} lines omitted)")
+        return "\n".join(output)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Scan counts, no-findings rate and match throughput."""
+        metrics = dict(self._metrics)
+        seconds = metrics.pop("scan_seconds")
+        metrics["throughput_mb_s"] = round(metrics["input_chars"] / seconds / 1e6, 2) if seconds else 0.0
+        metrics["keywords"] = len(self.keywords)
+        return metrics
+
+
+security_prefilter = SecurityPrefilter()
@@ -0,0 +1,88 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+The first caller for a key starts the work; concurrent callers with the same
+key await the same result instead of repeating an expensive LLM or embedding
+call. Keys are only shared while the work is in flight - nothing is cached.
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+
+from core import logger
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for coalescing keys: line endings, trailing spaces, outer blank lines."""
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def make_key(*parts: Any) -> str:
+    """Build a compact coalescing key from normalized request parts."""
+    joined = "\x1f".join(normalize_text(p) if isinstance(p, str) else repr(p) for p in parts)
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key onto one shared task."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self._metrics = {
+            "calls": 0,
+            "executions": 0,
+            "coalesced_waiters": 0,
+            "abandoned": 0
+        }
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``work()`` for ``key`` unless an identical call is already in flight.
+
+        The work runs in its own task, so cancelling any one caller (including
+        the one that started it) never cancels the result for the others. The
+        task is only cancelled once every caller waiting on it has gone away.
+        """
+        self._metrics["calls"] += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            self._metrics["executions"] += 1
+            flight = _Flight(asyncio.create_task(work()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._finish(key, flight))
+        else:
+            self._metrics["coalesced_waiters"] += 1
+            logger.debug(f"[{self.name}] coalesced request onto in-flight call")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # Last interested caller went away: stop the shared work
+            if flight.waiters == 1 and not flight.task.done():
+                self._metrics["abandoned"] += 1
+                self._finish(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Counters for calls, real executions and coalesced waiters."""
+        metrics = dict(self._metrics)
+        metrics["inflight"] = len(self._flights)
+        return metrics
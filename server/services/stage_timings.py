@@ -0,0 +1,60 @@
+"""
+Per-stage timing spans for the analysis path.
+
+Stages recorded (milliseconds): auth_lookup, queue_wait, preprocess,
+summarize, search, enhance, encrypt and store.
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Optional
+
+from core.metrics import percentiles
+
+
+class StageTimer:
+    """Records wall-clock spans into a shared ``{stage: ms}`` dict."""
+
+    def __init__(self, timings: Optional[Dict[str, float]] = None):
+        self.timings = timings if timings is not None else {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        # Stages that run more than once (e.g. retried) accumulate
+        self.timings[name] = round(self.timings.get(name, 0.0) + elapsed_ms, 3)
+
+
+def aggregate_stage_timings(samples: Iterable[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Turn a sequence of ``{stage: ms}`` dicts into per-stage percentiles."""
+    by_stage: Dict[str, list] = {}
+    for timings in samples:
+        for stage, elapsed_ms in (timings or {}).items():
+            if isinstance(elapsed_ms, (int, float)):
+                by_stage.setdefault(stage, []).append(elapsed_ms)
+    return {stage: percentiles(values) for stage, values in sorted(by_stage.items())}
+
+
+class StageTimingStats:
+    """Rolling window of recent per-stage timings for the /metrics endpoint."""
+
+    def __init__(self, window: int = 1000):
+        self._samples: Deque[Dict[str, float]] = deque(maxlen=window)
+
+    def record(self, timings: Optional[Dict[str, float]]) -> None:
+        if timings:
+            self._samples.append(dict(timings))
+
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage percentiles over the most recent analyses."""
+        return aggregate_stage_timings(self._samples)
+
+
+stage_timing_stats = StageTimingStats()